@@ -1,3 +1,4 @@
+from depot.catalog import invalidate_catalogs
 from depot.models import Depot, Item, Organization
 from django.contrib import admin
 from modeltranslation.admin import TranslationAdmin, TranslationTabularInline
@@ -42,14 +43,23 @@ class DepotAdmin(TranslationAdmin):
             message = '%s depots were' % num_changed
         return '%s successfully %s' % (message, change)
 
+    def update_active(self, queryset, active):
+        # The changelist may be filtered by the active flag, so the depots
+        # are read before the update, which would exclude them afterwards
+        depot_ids = list(queryset.values_list('id', flat=True))
+        num_changed = Depot.objects.filter(pk__in=depot_ids).update(active=active)
+        # Bulk updates bypass the signals updating the catalog versions
+        invalidate_catalogs(depot_ids)
+        return num_changed
+
     def make_archived(self, request, queryset):
-        depots_archived = queryset.update(active=False)
+        depots_archived = self.update_active(queryset, False)
         self.message_user(request, self.format_message(depots_archived, 'archived'))
 
     make_archived.short_description = 'Archive selected depots'
 
     def make_restored(self, request, queryset):
-        depots_restored = queryset.update(active=True)
+        depots_restored = self.update_active(queryset, True)
         self.message_user(request, self.format_message(depots_restored, 'restored'))
 
     make_restored.short_description = 'Restore selected depots'
@@ -62,7 +72,7 @@ class DepotAdmin(TranslationAdmin):
         if request.user.is_superuser:
             return qs
 
-        return qs.filter(Depot.filter_by_user(request.user)).distinct()
+        return qs.filter(Depot.filter_by_user(request.user))
 
     def has_add_permission(self, request):
         return request.user.is_superuser or request.user.organization_set.exists()
@@ -99,6 +109,6 @@ class DepotAdmin(TranslationAdmin):
         if not request.user.is_superuser and 'organization' in form.base_fields:
             form.base_fields['organization'].queryset = Organization.objects.filter(
                 Organization.filter_by_user(request.user)
-            ).distinct()
+            )
 
         return form
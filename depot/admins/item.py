@@ -1,3 +1,4 @@
+from depot.catalog import invalidate_catalogs
 from depot.models import Depot, Item
 from django.contrib import admin
 from modeltranslation.admin import TranslationAdmin
@@ -27,20 +28,31 @@ class ItemAdmin(TranslationAdmin):
             message = '%s items were' % num_changed
         return '%s successfully %s' % (message, change)
 
+    def update_visibility(self, queryset, visibility):
+        # The changelist may be filtered by the visibility, so the items
+        # are read before the update, which would exclude them afterwards
+        rows = list(queryset.values_list('pk', 'depot_id'))
+        num_changed = Item.objects.filter(
+            pk__in=[pk for pk, _ in rows]
+        ).update(visibility=visibility)
+        # Bulk updates bypass the signals updating the catalog versions
+        invalidate_catalogs(depot_id for _, depot_id in rows)
+        return num_changed
+
     def make_public(self, request, queryset):
-        items_made_public = queryset.update(visibility=Item.VISIBILITY_PUBLIC)
+        items_made_public = self.update_visibility(queryset, Item.VISIBILITY_PUBLIC)
         self.message_user(request, self.format_message(items_made_public, 'made public'))
 
     make_public.short_description = 'Mark selected items as public'
 
     def make_internal(self, request, queryset):
-        items_made_internal = queryset.update(visibility=Item.VISIBILITY_INTERNAL)
+        items_made_internal = self.update_visibility(queryset, Item.VISIBILITY_INTERNAL)
         self.message_user(request, self.format_message(items_made_internal, 'made internal'))
 
     make_internal.short_description = 'Mark selected items as internal'
 
     def make_deleted(self, request, queryset):
-        items_deleted = queryset.update(visibility=Item.VISIBILITY_DELETED)
+        items_deleted = self.update_visibility(queryset, Item.VISIBILITY_DELETED)
         self.message_user(request, self.format_message(items_deleted, 'deleted'))
 
     make_deleted.short_description = 'Mark selected items as deleted'
@@ -53,7 +65,7 @@ class ItemAdmin(TranslationAdmin):
         if request.user.is_superuser:
             return qs
 
-        return qs.filter(Item.filter_by_user(request.user)).distinct()
+        return qs.filter(Item.filter_by_user(request.user))
 
     def has_add_permission(self, request):
         return (request.user.is_superuser
@@ -85,6 +97,6 @@ class ItemAdmin(TranslationAdmin):
         if not request.user.is_superuser and 'depot' in form.base_fields:
             form.base_fields['depot'].queryset = Depot.objects.filter(
                 Depot.filter_by_user(request.user)
-            ).distinct()
+            )
 
         return form
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class DepotConfig(AppConfig):
     name = 'depot'
+
+    def ready(self):
+        from depot import signals  # noqa: F401
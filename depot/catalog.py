@@ -0,0 +1,83 @@
+import time
+from django.core.cache import cache
+from django.db import transaction
+
+INDEX_VERSION_KEY = 'catalog:index'
+
+
+def catalog_version_key(depot_id):
+    return 'catalog:depot:%d' % depot_id
+
+
+def get_version(key):
+    """
+    Return the current version stored under the given key
+
+    A missing version is initialized with the current time so that
+    stamps from before an eviction are never matched again.
+    """
+
+    version = cache.get(key)
+
+    if version is None:
+        cache.add(key, int(time.time() * 1000000), None)
+        version = cache.get(key)
+
+    return version
+
+
+def increase_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        get_version(key)
+
+
+def get_catalog_version(depot_id):
+    """
+    Return the current catalog version of the given depot
+
+    The version changes with the depot itself, its managers and its
+    items, so it identifies everything shown about the depot apart from
+    the availability.
+    """
+
+    return get_version(catalog_version_key(depot_id))
+
+
+def get_index_version():
+    """
+    Return the version of the depot index, which changes with any catalog
+    """
+
+    return get_version(INDEX_VERSION_KEY)
+
+
+def increase_catalog_versions(depot_ids):
+    for depot_id in depot_ids:
+        increase_version(catalog_version_key(depot_id))
+
+    increase_version(INDEX_VERSION_KEY)
+
+
+def invalidate_catalogs(depot_ids):
+    """
+    Increase the catalog version of the given depots and of the index
+
+    The versions are increased again once the current transaction is
+    committed, since a concurrent request may render the catalogs from
+    the rows committed so far and cache them under the new versions.
+    """
+
+    depot_ids = set(depot_ids)
+    increase_catalog_versions(depot_ids)
+    transaction.on_commit(lambda: increase_catalog_versions(depot_ids))
+
+
+def invalidate_index():
+    """
+    Increase the version of the index, now and after the current transaction
+    """
+
+    increase_version(INDEX_VERSION_KEY)
+    transaction.on_commit(lambda: increase_version(INDEX_VERSION_KEY))
@@ -1,7 +1,10 @@
 import re
+from datetime import datetime, timedelta
 from django.core.exceptions import PermissionDenied
 from django.shortcuts import get_object_or_404
 from depot.models import Depot
+from depot.permissions import get_permissions
+from rental.search import AvailabilitySearch
 
 
 def get_depot_if_allowed(depot_id, user):
@@ -15,7 +18,7 @@ def get_depot_if_allowed(depot_id, user):
 
     depot = get_object_or_404(Depot, pk=depot_id)
 
-    if not depot.organization.managed_by(user) and not depot.active:
+    if not depot.active and not get_permissions(user).manages_organization(depot.organization_id):
         raise PermissionDenied('Depot is not active')
 
     return depot
@@ -38,3 +41,41 @@ def extract_item_quantities(data):
             item_quantities[int(m.group(1))] = int(quantity)
 
     return item_quantities
+
+
+def get_chart_time_frame(start_date, return_date):
+    """
+    Extend the time frame to whole days with an additional day on each side
+
+    The rental form shows the availability of the items in this time frame.
+    """
+
+    return (
+        datetime.combine(start_date.date() - timedelta(days=1), datetime.min.time()),
+        datetime.combine(return_date.date() + timedelta(days=1), datetime.min.time())
+    )
+
+
+def suggest_time_frames(depot, user, item_quantities, start_date, return_date, days=7):
+    """
+    Suggest time frames of the same duration close to the requested one
+
+    Start dates in the past are never suggested. If the cart contains
+    items the user cannot rent from this depot, no time frame fits.
+    """
+
+    items = list(depot.visible_items(user).filter(id__in=item_quantities.keys()))
+
+    if len(items) != len(item_quantities):
+        return []
+
+    search = AvailabilitySearch(
+        max(start_date - timedelta(days=days), datetime.now()),
+        start_date + timedelta(days=days),
+        depot.id
+    )
+
+    if search.start_date > search.return_date:
+        return []
+
+    return search.get_suggestions(items, item_quantities, return_date - start_date, start_date)
@@ -0,0 +1,21 @@
+# Generated by Django 2.2.28 on 2026-10-18 11:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('depot', '0016_remove_item_wikidata_item'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='depot',
+            index=models.Index(fields=['organization', 'active'], name='depot_depot_organiz_7eb400_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(condition=models.Q(_negated=True, visibility='3'), fields=['depot', 'visibility'], name='depot_item_visible_idx'),
+        ),
+    ]
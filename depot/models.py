@@ -1,6 +1,7 @@
 from django.contrib.auth.models import Group, User
 from django.db import models
 from django.utils.translation import ugettext_lazy as _
+from depot.permissions import get_permissions
 
 
 class Organization(models.Model):
@@ -25,14 +26,14 @@ class Organization(models.Model):
         Organizations are managed by superusers and organization managers.
         """
 
-        return user.is_superuser or self.managers.filter(id=user.id).exists()
+        return get_permissions(user).manages_organization(self.id)
 
     def is_member(self, user):
         """
         Checks if the user is in one of the groups defined in this organization.
         """
 
-        return self.groups.filter(id__in=user.groups.all()).exists()
+        return get_permissions(user).is_member(self.id)
 
     @property
     def active_depots(self):
@@ -48,7 +49,7 @@ class Organization(models.Model):
         Filter for organizations managed by the given user
         """
 
-        return models.Q(managers__id=user.id)
+        return models.Q(id__in=get_permissions(user).managed_organization_ids)
 
     def __str__(self):
         return self.name
@@ -75,17 +76,14 @@ class Depot(models.Model):
         any manager user and any user in a manager group.
         """
 
-        return (user.is_superuser
-                or self.organization.managed_by(user)
-                or self.manager_users.filter(id=user.id).exists()
-                or self.manager_groups.filter(id__in=user.groups.all()).exists())
+        return get_permissions(user).manages_depot(self.id)
 
     def show_internal_items(self, user):
         """
         Internal items can be seen by superusers and organization members.
         """
 
-        return user.is_superuser or self.organization.is_member(user)
+        return user.is_superuser or get_permissions(user).is_member(self.organization_id)
 
     def visible_items(self, user):
         """
@@ -116,14 +114,11 @@ class Depot(models.Model):
         List all items with the visibility set to public.
         """
 
-        return self.item_set.filter(visibility=Item.VISIBILITY_PUBLIC)
+        return self.active_items.filter(visibility=Item.VISIBILITY_PUBLIC)
 
     @property
     def active_items(self):
-        return self.item_set.filter(
-            models.Q(visibility=Item.VISIBILITY_PUBLIC)
-            | models.Q(visibility=Item.VISIBILITY_INTERNAL)
-        )
+        return self.item_set.exclude(visibility=Item.VISIBILITY_DELETED)
 
     @staticmethod
     def filter_by_user(user):
@@ -131,9 +126,12 @@ class Depot(models.Model):
         Filter for depots managed by the given user
         """
 
-        return (models.Q(organization__managers__id=user.id)
-                | models.Q(manager_users__id=user.id)
-                | models.Q(manager_groups__id__in=user.groups.all()))
+        return models.Q(id__in=get_permissions(user).managed_depot_ids)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['organization', 'active']),
+        ]
 
     def __str__(self):
         return self.name
@@ -175,14 +173,21 @@ class Item(models.Model):
         Filter for items managed by the given user
         """
 
-        return (models.Q(depot__organization__managers__id=user.id)
-                | models.Q(depot__manager_users__id=user.id)
-                | models.Q(depot__manager_groups__id__in=user.groups.all()))
+        return models.Q(depot_id__in=get_permissions(user).managed_depot_ids)
 
     class Meta:
         unique_together = (
             ('name', 'depot'),
         )
+        indexes = [
+            # Deleted items ('3') are never listed. Backends without
+            # partial indexes ignore the condition and index all items.
+            models.Index(
+                fields=['depot', 'visibility'],
+                name='depot_item_visible_idx',
+                condition=~models.Q(visibility='3')
+            ),
+        ]
 
     def __str__(self):
         return self.name
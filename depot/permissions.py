@@ -0,0 +1,155 @@
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+VERSION_KEY = 'permissions:version'
+
+
+def get_roles_version():
+    """
+    Return the version shared by the cached roles of all users
+
+    A missing version is initialized with the current time so that
+    entries cached before an eviction of the version are never reused.
+    """
+
+    version = cache.get(VERSION_KEY)
+
+    if version is None:
+        cache.add(VERSION_KEY, int(time.time() * 1000000), None)
+        version = cache.get(VERSION_KEY)
+
+    return version
+
+
+def roles_key(user_id, version):
+    return 'permissions:user:%d:%d' % (user_id, version)
+
+
+def delete_roles(user_ids):
+    version = get_roles_version()
+    cache.delete_many([roles_key(user_id, version) for user_id in user_ids])
+
+
+def increase_roles_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        get_roles_version()
+
+
+def invalidate_users(user_ids):
+    """
+    Drop the cached roles of the given users
+
+    The roles are dropped again once the current transaction is
+    committed, since a concurrent request may load them from the rows
+    committed so far and cache them in the meantime.
+    """
+
+    user_ids = list(user_ids)
+    delete_roles(user_ids)
+    transaction.on_commit(lambda: delete_roles(user_ids))
+
+
+def invalidate_all_users():
+    """
+    Increase the shared version, so that the cached roles of all users are ignored
+
+    The version is increased again once the current transaction is committed.
+    """
+
+    increase_roles_version()
+    transaction.on_commit(increase_roles_version)
+
+
+def load_roles(user_id):
+    """
+    Load the ids of all organizations and depots a user manages or belongs to
+
+    :return: a dictionary with the sets of ids, as stored in the cache
+    """
+
+    from depot.models import Depot, Organization
+
+    return {
+        'managed_organizations': frozenset(Organization.objects.filter(
+            managers__id=user_id
+        ).values_list('id', flat=True)),
+        'member_organizations': frozenset(Organization.objects.filter(
+            groups__user__id=user_id
+        ).values_list('id', flat=True)),
+        'managed_depots': frozenset(Depot.objects.filter(
+            Q(organization__managers__id=user_id)
+            | Q(manager_users__id=user_id)
+            | Q(manager_groups__user__id=user_id)
+        ).values_list('id', flat=True).distinct()),
+    }
+
+
+class PermissionResolver:
+    """
+    Resolve the organizations and depots a user manages or belongs to
+
+    The roles of each user are cached across requests and dropped whenever
+    one of the relations defining them changes. Within a request, they are
+    read from the cache only once, since the resolver is attached to the
+    user object, which is created anew for each request.
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    @cached_property
+    def roles(self):
+        if not self.user.is_authenticated:
+            return {
+                'managed_organizations': frozenset(),
+                'member_organizations': frozenset(),
+                'managed_depots': frozenset(),
+            }
+
+        key = roles_key(self.user.id, get_roles_version())
+        roles = cache.get(key)
+
+        if roles is None:
+            roles = load_roles(self.user.id)
+            cache.set(key, roles, settings.PERMISSION_CACHE_TIMEOUT)
+
+        return roles
+
+    @property
+    def managed_organization_ids(self):
+        return self.roles['managed_organizations']
+
+    @property
+    def member_organization_ids(self):
+        return self.roles['member_organizations']
+
+    @property
+    def managed_depot_ids(self):
+        return self.roles['managed_depots']
+
+    def manages_organization(self, organization_id):
+        return self.user.is_superuser or organization_id in self.managed_organization_ids
+
+    def is_member(self, organization_id):
+        return organization_id in self.member_organization_ids
+
+    def manages_depot(self, depot_id):
+        return self.user.is_superuser or depot_id in self.managed_depot_ids
+
+
+def get_permissions(user):
+    """
+    Get the permission resolver of the given user, creating it on first use
+    """
+
+    try:
+        return user._permission_resolver
+    except AttributeError:
+        user._permission_resolver = PermissionResolver(user)
+        return user._permission_resolver
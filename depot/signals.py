@@ -0,0 +1,168 @@
+from django.contrib.auth.models import Group, User
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+from depot.catalog import invalidate_catalogs, invalidate_index
+from depot.models import Depot, Item, Organization
+from depot.permissions import invalidate_all_users, invalidate_users
+
+
+@receiver(m2m_changed, sender=Organization.managers.through)
+@receiver(m2m_changed, sender=Depot.manager_users.through)
+@receiver(m2m_changed, sender=User.groups.through)
+def user_relation_changed(sender, instance, action, pk_set, **kwargs):
+    """
+    Drop the cached roles of the users added to or removed from a relation
+
+    Clearing the relation of an organization, depot or group does not
+    tell which users were affected, so the roles of all users are dropped.
+    """
+
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if isinstance(instance, User):
+        invalidate_users([instance.pk])
+    elif pk_set:
+        invalidate_users(pk_set)
+    elif action == 'post_clear':
+        invalidate_all_users()
+
+
+@receiver(m2m_changed, sender=Organization.groups.through)
+@receiver(m2m_changed, sender=Depot.manager_groups.through)
+def group_relation_changed(sender, action, **kwargs):
+    """
+    Groups can contain any number of users, so the roles of all users are dropped
+    """
+
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_all_users()
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, **kwargs):
+    """
+    Deleting a group removes all of its relations without an m2m_changed signal
+    """
+
+    invalidate_all_users()
+
+
+@receiver(post_save, sender=Depot)
+@receiver(post_delete, sender=Depot)
+@receiver(post_delete, sender=Organization)
+def depot_changed(sender, raw=False, **kwargs):
+    """
+    New depots and depots moved to another organization change its managers' roles
+    """
+
+    if not raw:
+        invalidate_all_users()
+
+
+@receiver(pre_save, sender=Item)
+def item_moved(sender, instance, raw=False, **kwargs):
+    """
+    An item moved to another depot also changes the catalog of its previous depot
+    """
+
+    if not raw and instance.pk is not None:
+        invalidate_catalogs(Item.objects.filter(pk=instance.pk).values_list('depot_id', flat=True))
+
+
+@receiver(post_save, sender=Item)
+@receiver(post_delete, sender=Item)
+def item_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_catalogs([instance.depot_id])
+
+
+@receiver(post_save, sender=Depot)
+@receiver(post_delete, sender=Depot)
+def depot_catalog_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_catalogs([instance.pk])
+
+
+@receiver(post_save, sender=Organization)
+def organization_saved(sender, instance, raw=False, **kwargs):
+    """
+    The depot pages show the name of their organization
+    """
+
+    if not raw:
+        invalidate_catalogs(instance.depot_set.values_list('id', flat=True))
+
+
+@receiver(m2m_changed, sender=Organization.managers.through)
+def organization_managers_changed(sender, action, **kwargs):
+    """
+    The managers of the organizations are only listed on the depot index
+    """
+
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_index()
+
+
+@receiver(m2m_changed, sender=Depot.manager_users.through)
+@receiver(m2m_changed, sender=Depot.manager_groups.through)
+def depot_managers_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Update the catalogs of the depots whose list of managers changed
+
+    When all depots of a user or group are cleared, the depots
+    have to be looked up before they are removed.
+    """
+
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            invalidate_catalogs([instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        invalidate_catalogs(pk_set)
+    elif action == 'pre_clear':
+        invalidate_catalogs(instance.depot_set.values_list('id', flat=True))
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def group_members_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    The members of manager groups are listed as managers of the depots
+    """
+
+    if action not in ('pre_clear', 'post_add', 'post_remove'):
+        return
+
+    if reverse:
+        # The members of a group changed
+        depots = instance.depot_set.all()
+    elif action == 'pre_clear':
+        depots = Depot.objects.filter(manager_groups__user=instance)
+    else:
+        depots = Depot.objects.filter(manager_groups__in=pk_set)
+
+    invalidate_catalogs(depots.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=User)
+def manager_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """
+    The depot pages and the index list the names of the managers
+
+    Saving only the time of the last login, as on every login, is skipped.
+    """
+
+    if raw or created:
+        return
+
+    if update_fields is not None and not {'first_name', 'last_name'} & set(update_fields):
+        return
+
+    depot_ids = list(Depot.objects.filter(
+        Q(manager_users=instance) | Q(manager_groups__user=instance)
+    ).values_list('id', flat=True).distinct())
+
+    if depot_ids:
+        invalidate_catalogs(depot_ids)
+    elif instance.organization_set.exists():
+        invalidate_index()
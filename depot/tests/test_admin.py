@@ -0,0 +1,82 @@
+from django.contrib import admin
+from django.test import RequestFactory
+from depot.admins.depot import DepotAdmin
+from depot.admins.item import ItemAdmin
+from depot.admins.organization import OrganizationAdmin
+from depot.models import Depot, Item, Organization
+from rental.admin import RentalAdmin
+from rental.models import Rental
+from verleihtool.test import ClientTestCase
+
+
+class AdminQuerysetTestCase(ClientTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.organization = Organization.objects.create(name='My organization')
+        self.other_organization = Organization.objects.create(name='Other organization')
+
+        self.organization_depot = Depot.objects.create(
+            name='Organization depot', organization=self.organization
+        )
+        self.user_depot = Depot.objects.create(
+            name='User depot', organization=self.other_organization
+        )
+        self.group_depot = Depot.objects.create(
+            name='Group depot', organization=self.other_organization
+        )
+        self.other_depot = Depot.objects.create(
+            name='Other depot', organization=self.other_organization
+        )
+
+        # Manage the organization depot in every possible way at once
+        self.organization.managers.add(self.user)
+        self.organization_depot.manager_users.add(self.user)
+        self.organization_depot.manager_groups.add(self.group)
+        self.user_depot.manager_users.add(self.user)
+        self.group_depot.manager_groups.add(self.group)
+
+        self.managed_depots = {self.organization_depot, self.user_depot, self.group_depot}
+
+    def get_queryset(self, admin_class, model):
+        request = RequestFactory().get('/admin/')
+        request.user = self.user
+        return admin_class(model, admin.site).get_queryset(request)
+
+    def assertNoFanOut(self, queryset):
+        sql = str(queryset.query)
+        self.assertNotIn('DISTINCT', sql)
+        self.assertNotIn('manager', sql)
+
+    def test_organization_queryset(self):
+        queryset = self.get_queryset(OrganizationAdmin, Organization)
+        self.assertNoFanOut(queryset)
+        self.assertEqual(list(queryset), [self.organization])
+
+    def test_depot_queryset(self):
+        queryset = self.get_queryset(DepotAdmin, Depot)
+        self.assertNoFanOut(queryset)
+        self.assertEqual(len(queryset), 3)
+        self.assertEqual(set(queryset), self.managed_depots)
+
+    def test_item_queryset(self):
+        for depot in Depot.objects.all():
+            Item.objects.create(
+                name='Item', depot=depot, quantity=1, visibility=Item.VISIBILITY_PUBLIC
+            )
+
+        queryset = self.get_queryset(ItemAdmin, Item)
+        self.assertNoFanOut(queryset)
+        self.assertEqual(len(queryset), 3)
+        self.assertEqual({item.depot for item in queryset}, self.managed_depots)
+
+    def test_rental_queryset(self):
+        for depot in Depot.objects.all():
+            Rental.objects.create(
+                depot=depot, start_date='2017-03-25 12:00', return_date='2017-03-27 12:00'
+            )
+
+        queryset = self.get_queryset(RentalAdmin, Rental)
+        self.assertNoFanOut(queryset)
+        self.assertEqual(len(queryset), 3)
+        self.assertEqual({rental.depot for rental in queryset}, self.managed_depots)
@@ -0,0 +1,106 @@
+from datetime import datetime
+from depot.models import Depot, Item, Organization
+from rental.models import ItemRental, Rental
+from verleihtool.test import ClientTestCase
+
+
+class DepotAvailabilityTestCase(ClientTestCase):
+    """
+    Test the availability endpoint at `/depots/{id}/availability/`
+    """
+
+    def setUp(self):
+        super().setUp()
+
+        self.organization = Organization.objects.create()
+
+        self.depot = Depot.objects.create(
+            name='My Depot',
+            organization=self.organization
+        )
+
+        self.item = Item.objects.create(
+            name='My Item',
+            depot=self.depot,
+            quantity=5,
+            visibility=Item.VISIBILITY_PUBLIC
+        )
+
+        self.start_date = datetime(2030, 5, 1, 0, 0)
+        self.return_date = datetime(2030, 5, 4, 0, 0)
+
+    def get(self, client, item, **headers):
+        return client.get('/depots/%d/availability/' % self.depot.id, {
+            'item': item.id,
+            'start_date': self.start_date.strftime('%Y-%m-%d %H:%M'),
+            'return_date': self.return_date.strftime('%Y-%m-%d %H:%M'),
+        }, **headers)
+
+    def create_rental(self, quantity):
+        rental = Rental.objects.create(
+            depot=self.depot,
+            start_date=datetime(2030, 5, 2, 0, 0),
+            return_date=datetime(2030, 5, 3, 0, 0),
+            state=Rental.STATE_APPROVED
+        )
+        ItemRental.objects.create(rental=rental, item=self.item, quantity=quantity)
+
+    def test_chart_data(self):
+        self.create_rental(2)
+        response = self.get(self.as_guest, self.item)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'available': 3,
+            'intervals': [
+                {'x': '2030-05-01T00:00:00', 'y': 5},
+                {'x': '2030-05-02T00:00:00', 'y': 5},
+                {'x': '2030-05-02T00:00:00', 'y': 3},
+                {'x': '2030-05-03T00:00:00', 'y': 3},
+                {'x': '2030-05-03T00:00:00', 'y': 5},
+                {'x': '2030-05-04T00:00:00', 'y': 5},
+            ]
+        })
+
+    def test_not_modified(self):
+        response = self.get(self.as_guest, self.item)
+        etag = response['ETag']
+
+        response = self.get(self.as_guest, self.item, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_modified_after_new_rental(self):
+        response = self.get(self.as_guest, self.item)
+        etag = response['ETag']
+
+        self.create_rental(2)
+
+        response = self.get(self.as_guest, self.item, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['available'], 3)
+
+    def test_internal_item_hidden_for_guest(self):
+        item = Item.objects.create(
+            name='My Internal Item',
+            depot=self.depot,
+            quantity=1,
+            visibility=Item.VISIBILITY_INTERNAL
+        )
+        response = self.get(self.as_guest, item)
+        self.assertEqual(response.status_code, 404)
+
+        response = self.get(self.as_superuser, item)
+        self.assertEqual(response.status_code, 200)
+
+    def test_invalid_time_frame(self):
+        response = self.as_guest.get('/depots/%d/availability/' % self.depot.id, {
+            'item': self.item.id,
+            'start_date': 'tomorrow',
+        })
+        self.assertEqual(response.status_code, 400)
+
+    def test_create_rental_links_to_endpoint(self):
+        response = self.as_guest.get('/depots/%d/rentals/create/' % self.depot.id)
+        self.assertSuccess(response, 'depot/create-rental.html')
+        self.assertContains(response, '/depots/%d/availability/?' % self.depot.id)
+        self.assertNotContains(response, 'data-intervals')
@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+from depot.models import Depot, Item, Organization
+from rental.models import ItemRental, Rental
+from verleihtool.test import ClientTestCase
+
+
+class DepotAvailabilitySearchTestCase(ClientTestCase):
+    """
+    Test the search for available time frames at `/depots/{id}/availability/search/`
+    """
+
+    def setUp(self):
+        super().setUp()
+
+        organization = Organization.objects.create()
+
+        self.depot = Depot.objects.create(
+            name='My Depot',
+            organization=organization
+        )
+
+        self.item = Item.objects.create(
+            name='My Item',
+            depot=self.depot,
+            quantity=1,
+            visibility=Item.VISIBILITY_PUBLIC
+        )
+
+        tomorrow = datetime.now() + timedelta(days=1)
+        self.start_date = datetime(tomorrow.year, tomorrow.month, tomorrow.day, 10, 0)
+        self.return_date = self.start_date + timedelta(days=2)
+
+        rental = Rental.objects.create(
+            depot=self.depot,
+            start_date=self.start_date,
+            return_date=self.return_date + timedelta(days=1),
+            state=Rental.STATE_APPROVED
+        )
+        ItemRental.objects.create(rental=rental, item=self.item, quantity=1)
+
+    def format(self, date):
+        return date.strftime('%Y-%m-%d %H:%M')
+
+    def test_suggest_next_free_time_frame(self):
+        response = self.as_guest.get('/depots/%d/availability/search/' % self.depot.id, {
+            'start_date': self.format(self.start_date),
+            'return_date': self.format(self.return_date),
+            'item-%d-quantity' % self.item.id: 1,
+        })
+        self.assertEqual(response.status_code, 200)
+
+        windows = response.json()['windows']
+        self.assertEqual(windows[0], {
+            'start_date': (self.start_date + timedelta(days=3)).isoformat(),
+            'return_date': (self.start_date + timedelta(days=5)).isoformat(),
+        })
+
+    def test_unknown_item(self):
+        response = self.as_guest.get('/depots/%d/availability/search/' % self.depot.id, {
+            'start_date': self.format(self.start_date),
+            'return_date': self.format(self.return_date),
+            'item-%d-quantity' % (self.item.id + 1): 1,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'windows': []})
+
+    def test_empty_cart(self):
+        response = self.as_guest.get('/depots/%d/availability/search/' % self.depot.id, {
+            'start_date': self.format(self.start_date),
+            'return_date': self.format(self.return_date),
+        })
+        self.assertEqual(response.status_code, 400)
+
+    def test_suggestions_after_failed_rental(self):
+        response = self.as_guest.post('/rentals/create/', {
+            'firstname': 'Guest',
+            'lastname': 'User',
+            'depot_id': self.depot.id,
+            'email': 'guest@user.com',
+            'purpose': 'None',
+            'start_date': self.format(self.start_date),
+            'return_date': self.format(self.return_date),
+            'item-%d-quantity' % self.item.id: 1
+        }, follow=True)
+
+        self.assertSuccess(response, 'depot/create-rental.html')
+        self.assertContains(response, 'All selected items are available in these time frames')
+        self.assertContains(response, 'start_date=%s' % (
+            self.format(self.start_date + timedelta(days=3)).replace(' ', '+').replace(':', '%3A')
+        ))
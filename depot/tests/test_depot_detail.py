@@ -1,4 +1,8 @@
+from depot.admins.item import ItemAdmin
 from depot.models import Depot, Item, Organization
+from django.contrib.admin.sites import AdminSite
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from verleihtool.test import ClientTestCase
 
 
@@ -155,3 +159,88 @@ class DepotDetailTestCase(ClientTestCase):
         response = self.as_guest.get('/depots/%d/' % self.depot.id)
         self.assertSuccess(response, 'depot/detail.html')
         self.assertContains(response, 'This depot is managed by no one apparently.')
+
+    def get_etag(self, client):
+        response = client.get('/depots/%d/' % self.depot.id)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def assertNotModified(self, client, etag):
+        response = client.get('/depots/%d/' % self.depot.id, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertTemplateNotUsed(response, 'depot/detail.html')
+
+    def test_not_modified(self):
+        self.create_item('My Item', Item.VISIBILITY_PUBLIC)
+        client = self.as_guest
+        etag = self.get_etag(client)
+
+        # Only the depot itself is loaded
+        with self.assertNumQueries(1):
+            self.assertNotModified(client, etag)
+
+    def test_modified_by_items(self):
+        etag = self.get_etag(self.as_guest)
+        self.create_item('My Item', Item.VISIBILITY_PUBLIC)
+        self.assertNotEqual(self.get_etag(self.as_guest), etag)
+
+    def test_modified_by_item_admin_action(self):
+        self.create_item('My Item', Item.VISIBILITY_PUBLIC)
+        etag = self.get_etag(self.as_guest)
+
+        admin = ItemAdmin(Item, AdminSite())
+        admin.message_user = lambda request, message: None
+        admin.make_internal(None, Item.objects.filter(depot=self.depot))
+
+        self.assertNotEqual(self.get_etag(self.as_guest), etag)
+
+    def test_modified_by_managers(self):
+        etag = self.get_etag(self.as_guest)
+        self.depot.manager_groups.add(self.group)
+        etag_with_group = self.get_etag(self.as_guest)
+        self.assertNotEqual(etag_with_group, etag)
+
+        self.group.user_set.remove(self.user)
+        self.assertNotEqual(self.get_etag(self.as_guest), etag_with_group)
+
+    def test_modified_by_renamed_manager(self):
+        self.depot.manager_groups.add(self.group)
+        etag = self.get_etag(self.as_guest)
+
+        self.user.first_name = 'Renamed'
+        self.user.save()
+
+        response = self.as_guest.get('/depots/%d/' % self.depot.id, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Renamed')
+
+    def test_etag_per_user(self):
+        self.assertNotEqual(self.get_etag(self.as_guest), self.get_etag(self.as_user))
+
+    def test_cached_fragment(self):
+        self.create_item('My Item', Item.VISIBILITY_PUBLIC)
+        self.as_guest.get('/depots/%d/' % self.depot.id)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.as_guest.get('/depots/%d/' % self.depot.id)
+
+        self.assertContains(response, 'My Item')
+        self.assertFalse([query for query in queries if 'depot_item' in query['sql']])
+
+    def test_cached_fragment_per_visibility(self):
+        self.create_item('My Item', Item.VISIBILITY_PUBLIC)
+        self.create_item('Internal Item', Item.VISIBILITY_INTERNAL)
+        self.organization.groups.add(self.group)
+
+        self.assertNotContains(self.as_guest.get('/depots/%d/' % self.depot.id), 'Internal Item')
+        self.assertContains(self.as_user.get('/depots/%d/' % self.depot.id), 'Internal Item')
+        self.assertNotContains(self.as_guest.get('/depots/%d/' % self.depot.id), 'Internal Item')
+
+    def test_cached_fragment_invalidated_by_depot_admin(self):
+        self.as_guest.get('/depots/%d/' % self.depot.id)
+        self.depot.description = 'Changed description'
+        self.depot.save()
+
+        self.assertContains(self.as_guest.get('/depots/%d/' % self.depot.id),
+                            'Changed description')
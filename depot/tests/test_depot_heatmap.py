@@ -0,0 +1,80 @@
+from datetime import datetime
+from depot.models import Depot, Item, Organization
+from rental.models import ItemRental, Rental
+from verleihtool.test import ClientTestCase
+
+
+class DepotHeatmapTestCase(ClientTestCase):
+    """
+    Test the utilization heatmap at `/depots/{id}/heatmap/`
+    """
+
+    def setUp(self):
+        super().setUp()
+
+        organization = Organization.objects.create()
+
+        self.depot = Depot.objects.create(
+            name='My Depot',
+            organization=organization
+        )
+
+        self.item = Item.objects.create(
+            name='My Item',
+            depot=self.depot,
+            quantity=5,
+            visibility=Item.VISIBILITY_PUBLIC
+        )
+
+        rental = Rental.objects.create(
+            depot=self.depot,
+            start_date=datetime(2030, 5, 2),
+            return_date=datetime(2030, 5, 3),
+            state=Rental.STATE_APPROVED
+        )
+        ItemRental.objects.create(rental=rental, item=self.item, quantity=2)
+
+    def test_heatmap_as_guest(self):
+        response = self.as_guest.get('/depots/%d/heatmap/' % self.depot.id)
+        self.assertEqual(response.status_code, 403)
+
+    def test_heatmap_data_as_guest(self):
+        response = self.as_guest.get('/depots/%d/heatmap/data/' % self.depot.id)
+        self.assertEqual(response.status_code, 403)
+
+    def test_heatmap_as_depot_manager(self):
+        self.depot.manager_users.add(self.user)
+        response = self.as_user.get('/depots/%d/heatmap/' % self.depot.id, {
+            'start_date': '2030-05-01',
+            'slots': 3,
+        })
+        self.assertSuccess(response, 'depot/heatmap.html')
+        self.assertContains(response, 'My Item')
+        self.assertContains(response, '02.05.')
+        self.assertContains(response, 'rgba(217, 83, 79, 0.40)')
+
+    def test_heatmap_data(self):
+        response = self.as_superuser.get('/depots/%d/heatmap/data/' % self.depot.id, {
+            'start_date': '2030-05-01',
+            'slots': 3,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'slots': ['2030-05-01T00:00:00', '2030-05-02T00:00:00', '2030-05-03T00:00:00'],
+            'items': [{
+                'id': self.item.id,
+                'name': 'My Item',
+                'quantity': 5,
+                'free': [5, 3, 5],
+            }],
+        })
+
+    def test_heatmap_data_hourly(self):
+        response = self.as_superuser.get('/depots/%d/heatmap/data/' % self.depot.id, {
+            'start_date': '2030-05-01',
+            'resolution': 'hour',
+            'slots': 100000,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['slots']), 24 * 14)
+        self.assertEqual(response.json()['items'][0]['free'][24:48], [3] * 24)
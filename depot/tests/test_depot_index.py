@@ -1,3 +1,11 @@
+from depot.admins.depot import DepotAdmin
+from depot.admins.item import ItemAdmin
+from depot.catalog import get_catalog_version, get_index_version
+from django.contrib.admin.sites import AdminSite
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from verleihtool.test import ClientTestCase
 from depot.models import Depot, Item, Organization
 
@@ -171,3 +179,122 @@ class DepotIndexTestCase(ClientTestCase):
         response = self.as_guest.get('/depots/')
         self.assertSuccess(response, 'depot/index.html')
         self.assertContains(response, 'This organization is managed by no one apparently.')
+
+    # Measure the rendering of the catalog instead of the cached fragment
+    @override_settings(CATALOG_CACHE_TIMEOUT=0)
+    def test_constant_queries_for_organizations(self):
+        organization = create_organization('My organization')
+        create_depot('My depot', organization=organization)
+        organization.managers.add(self.user)
+        client = self.as_user
+
+        # Warm up the cached roles of the user
+        client.get('/depots/')
+
+        with CaptureQueriesContext(connection) as single_organization_queries:
+            client.get('/depots/')
+
+        for i in range(5):
+            organization = create_organization('Organization %d' % i)
+            organization.managers.add(self.superuser)
+            create_depot('Depot %d' % i, organization=organization)
+            create_depot('Other depot %d' % i, organization=organization)
+
+        client.get('/depots/')
+
+        with CaptureQueriesContext(connection) as many_organizations_queries:
+            response = client.get('/depots/')
+
+        self.assertTrue([
+            query for query in many_organizations_queries if 'depot_item' in query['sql']
+        ])
+        self.assertEqual(len(single_organization_queries), len(many_organizations_queries))
+        self.assertContains(response, 'Other depot 4')
+        self.assertContains(response, 'This organization is managed by Armin Admin.')
+
+    def test_cached_fragment(self):
+        create_depot('My depot')
+        self.as_guest.get('/depots/')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.as_guest.get('/depots/')
+
+        self.assertContains(response, 'My depot')
+        self.assertContains(response, '42 items')
+        self.assertFalse([query for query in queries if 'depot_' in query['sql']])
+
+    def test_cached_fragment_per_language(self):
+        depot = create_depot('My depot')
+        self.assertContains(self.as_guest.get('/depots/'), 'href="/depots/%d/"' % depot.id)
+        self.assertContains(self.as_guest.get('/de/depots/'), 'href="/de/depots/%d/"' % depot.id)
+
+    def test_cached_fragment_invalidated_by_renamed_manager(self):
+        depot = create_depot('My depot')
+        depot.organization.managers.add(self.user)
+        self.as_guest.get('/depots/')
+
+        self.user.last_name = 'Renamed'
+        self.user.save()
+        self.assertContains(self.as_guest.get('/depots/'), 'Ursula Renamed')
+
+    def test_cached_fragment_per_managed_organizations(self):
+        depot = create_depot('My depot')
+        self.as_guest.get('/depots/')
+        depot.organization.managers.add(self.user)
+
+        response = self.as_user.get('/depots/')
+        organization_id = depot.organization.id
+        self.assertContains(response, '/admin/depot/organization/%d/change/' % organization_id)
+        self.assertContains(response, 'This organization is managed by Ursula User.')
+
+    def test_cached_fragment_invalidated_by_admin_actions(self):
+        depot = create_depot('My depot')
+        other_depot = create_depot('Other depot')
+        self.assertContains(self.as_guest.get('/depots/'), 'Other depot')
+
+        admin = ItemAdmin(Item, AdminSite())
+        admin.message_user = lambda request, message: None
+        admin.make_deleted(None, Item.objects.filter(depot=depot, name='Item 0'))
+        self.assertContains(self.as_guest.get('/depots/'), '41 items')
+
+        admin = DepotAdmin(Depot, AdminSite())
+        admin.message_user = lambda request, message: None
+        admin.make_archived(None, Depot.objects.filter(pk=other_depot.pk))
+        self.assertNotContains(self.as_guest.get('/depots/'), 'Other depot')
+
+    def test_admin_actions_on_filtered_changelist(self):
+        depot = create_depot('My depot')
+        other_depot = create_depot('Other depot')
+        self.assertContains(self.as_guest.get('/depots/'), 'Other depot')
+        version = get_catalog_version(depot.id)
+
+        # The changelist is filtered by the field the action changes
+        admin = ItemAdmin(Item, AdminSite())
+        admin.message_user = lambda request, message: None
+        admin.make_deleted(None, Item.objects.filter(
+            depot=depot, name='Item 0', visibility=Item.VISIBILITY_PUBLIC
+        ))
+        self.assertGreater(get_catalog_version(depot.id), version)
+        self.assertContains(self.as_guest.get('/depots/'), '41 items')
+
+        admin = DepotAdmin(Depot, AdminSite())
+        admin.message_user = lambda request, message: None
+        admin.make_archived(None, Depot.objects.filter(pk=other_depot.pk, active=True))
+        self.assertNotContains(self.as_guest.get('/depots/'), 'Other depot')
+
+
+class CatalogCommitTestCase(TransactionTestCase):
+
+    def test_catalogs_invalidated_again_after_commit(self):
+        cache.clear()
+        depot = create_depot('My depot')
+
+        with transaction.atomic():
+            Item.objects.create(name='New item', depot=depot, quantity=1,
+                                visibility=Item.VISIBILITY_PUBLIC)
+            # A concurrent request may cache the old catalog under these versions
+            catalog_version = get_catalog_version(depot.id)
+            index_version = get_index_version()
+
+        self.assertGreater(get_catalog_version(depot.id), catalog_version)
+        self.assertGreater(get_index_version(), index_version)
@@ -0,0 +1,186 @@
+from django.contrib.auth.models import AnonymousUser, Group, User
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
+from depot.models import Depot, Organization
+from depot.permissions import get_permissions, get_roles_version, load_roles, roles_key
+
+
+class PermissionResolverTestCase(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.user = User.objects.create_user(username='user', password='password')
+        self.group = Group.objects.create(name='group')
+        self.user.groups.add(self.group)
+
+        self.organization = Organization.objects.create(name='My organization')
+        self.depot = Depot.objects.create(name='My depot', organization=self.organization)
+
+    def reload_user(self):
+        # Permissions are resolved once per user object, i.e. once per request
+        return User.objects.get(pk=self.user.pk)
+
+    def test_no_permissions(self):
+        user = self.reload_user()
+        self.assertFalse(self.organization.managed_by(user))
+        self.assertFalse(self.organization.is_member(user))
+        self.assertFalse(self.depot.managed_by(user))
+        self.assertFalse(self.depot.show_internal_items(user))
+
+    def test_anonymous_user(self):
+        with self.assertNumQueries(0):
+            self.assertFalse(self.organization.managed_by(AnonymousUser()))
+            self.assertFalse(self.organization.is_member(AnonymousUser()))
+            self.assertFalse(self.depot.managed_by(AnonymousUser()))
+
+    def test_superuser(self):
+        superuser = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+
+        with self.assertNumQueries(0):
+            self.assertTrue(self.organization.managed_by(superuser))
+            self.assertTrue(self.depot.managed_by(superuser))
+            self.assertTrue(self.depot.show_internal_items(superuser))
+
+    def test_organization_manager(self):
+        self.organization.managers.add(self.user)
+        user = self.reload_user()
+        self.assertTrue(self.organization.managed_by(user))
+        self.assertTrue(self.depot.managed_by(user))
+        self.assertFalse(self.depot.show_internal_items(user))
+
+    def test_organization_member(self):
+        self.organization.groups.add(self.group)
+        user = self.reload_user()
+        self.assertTrue(self.organization.is_member(user))
+        self.assertTrue(self.depot.show_internal_items(user))
+        self.assertFalse(self.depot.managed_by(user))
+
+    def test_depot_manager_user(self):
+        self.depot.manager_users.add(self.user)
+        user = self.reload_user()
+        self.assertTrue(self.depot.managed_by(user))
+        self.assertFalse(self.organization.managed_by(user))
+
+    def test_depot_manager_group(self):
+        self.depot.manager_groups.add(self.group)
+        user = self.reload_user()
+        self.assertTrue(self.depot.managed_by(user))
+        self.assertFalse(self.organization.managed_by(user))
+
+    def test_queries_are_memoized(self):
+        other_depot = Depot.objects.create(name='Other depot', organization=self.organization)
+        other_depot.manager_users.add(self.user)
+        user = self.reload_user()
+
+        with self.assertNumQueries(3):
+            for depot in [self.depot, other_depot] * 3:
+                depot.managed_by(user)
+                depot.show_internal_items(user)
+
+        self.assertIs(get_permissions(user), get_permissions(user))
+
+    def test_roles_are_cached_across_requests(self):
+        self.depot.manager_users.add(self.user)
+        self.assertTrue(self.depot.managed_by(self.reload_user()))
+
+        user = self.reload_user()
+
+        with self.assertNumQueries(0):
+            self.assertTrue(self.depot.managed_by(user))
+            self.assertFalse(self.depot.show_internal_items(user))
+
+    def assertInvalidated(self, change, check):
+        self.assertFalse(check(self.reload_user()))
+        change()
+        self.assertTrue(check(self.reload_user()))
+
+    def test_invalidate_organization_managers(self):
+        self.assertInvalidated(
+            lambda: self.organization.managers.add(self.user),
+            self.organization.managed_by
+        )
+
+    def test_invalidate_organization_groups(self):
+        self.assertInvalidated(
+            lambda: self.organization.groups.add(self.group),
+            self.organization.is_member
+        )
+
+    def test_invalidate_depot_manager_users(self):
+        self.assertInvalidated(
+            lambda: self.user.depot_set.add(self.depot),
+            self.depot.managed_by
+        )
+
+    def test_invalidate_depot_manager_groups(self):
+        self.assertInvalidated(
+            lambda: self.depot.manager_groups.add(self.group),
+            self.depot.managed_by
+        )
+
+    def test_invalidate_user_groups(self):
+        other_group = Group.objects.create(name='other group')
+        self.depot.manager_groups.add(other_group)
+        self.assertInvalidated(
+            lambda: other_group.user_set.add(self.user),
+            self.depot.managed_by
+        )
+
+    def test_invalidate_cleared_relation(self):
+        self.organization.managers.add(self.user)
+        self.assertTrue(self.organization.managed_by(self.reload_user()))
+
+        self.organization.managers.clear()
+        self.assertFalse(self.organization.managed_by(self.reload_user()))
+
+    def test_invalidate_deleted_group(self):
+        self.depot.manager_groups.add(self.group)
+        self.assertTrue(self.depot.managed_by(self.reload_user()))
+
+        self.group.delete()
+        self.assertFalse(self.depot.managed_by(self.reload_user()))
+
+    def test_invalidate_new_depot(self):
+        self.organization.managers.add(self.user)
+        self.assertTrue(self.depot.managed_by(self.reload_user()))
+
+        depot = Depot.objects.create(name='New depot', organization=self.organization)
+        self.assertTrue(depot.managed_by(self.reload_user()))
+
+    def test_filter_by_user(self):
+        self.depot.manager_users.add(self.user)
+        Depot.objects.create(name='Other depot', organization=self.organization)
+        user = self.reload_user()
+        get_permissions(user).roles
+
+        with self.assertNumQueries(1):
+            depots = list(Depot.objects.filter(Depot.filter_by_user(user)))
+
+        self.assertEqual(depots, [self.depot])
+
+
+class PermissionCommitTestCase(TransactionTestCase):
+
+    def test_roles_invalidated_again_after_commit(self):
+        cache.clear()
+        user = User.objects.create_user(username='user', password='password')
+        organization = Organization.objects.create(name='My organization')
+
+        stale_roles = load_roles(user.pk)
+
+        with transaction.atomic():
+            organization.managers.add(user)
+            # A concurrent request may cache the old roles in the meantime
+            cache.set(roles_key(user.pk, get_roles_version()), stale_roles)
+
+        self.assertTrue(organization.managed_by(User.objects.get(pk=user.pk)))
+
+        with transaction.atomic():
+            Group.objects.create(name='group').delete()
+            version = get_roles_version()
+
+        self.assertGreater(get_roles_version(), version)
@@ -1,7 +1,11 @@
-from depot.models import Depot, Organization
-from rental.models import Rental
+from unittest import mock
+from depot.models import Depot, Item, Organization
+from depot.views.depot_rentals_view import DepotRentalsView
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rental.models import ItemRental, Rental
 from verleihtool.test import ClientTestCase
-from datetime import datetime
+from datetime import datetime, timedelta
 
 
 class RentalsTestCase(ClientTestCase):
@@ -59,3 +63,85 @@ class RentalsTestCase(ClientTestCase):
         self.assertNotContains(response, 'revoked')
         self.assertNotContains(response, 'declined')
         self.assertNotContains(response, 'returned')
+
+    def create_dated_rental(self, firstname, day, items=()):
+        rental = Rental.objects.create(
+            depot=self.depot1,
+            firstname=firstname,
+            lastname='Renter',
+            start_date=datetime(2017, 3, day, 12, 0),
+            return_date=datetime(2017, 3, day, 12, 0) + timedelta(days=2),
+            state=Rental.STATE_PENDING
+        )
+        for item, quantity in items:
+            ItemRental.objects.create(rental=rental, item=item, quantity=quantity)
+        return rental
+
+    def get_rentals(self, query=''):
+        self.depot1.manager_users.add(self.user)
+        response = self.as_user.get('/depots/%d/rentals/%s' % (self.depot1.id, query))
+        self.assertSuccess(response, 'depot/rentals.html')
+        return response
+
+    def test_depot_rentals_annotations(self):
+        item = Item.objects.create(name='Item', depot=self.depot1, quantity=10)
+        other_item = Item.objects.create(name='Other item', depot=self.depot1, quantity=10)
+        self.create_dated_rental('Ida', 5, [(item, 3), (other_item, 4)])
+        self.create_dated_rental('Erik', 6)
+
+        response = self.get_rentals()
+        rentals = response.context['rentals']
+        self.assertEqual([rental.firstname for rental in rentals], ['Ida', 'Erik'])
+        self.assertEqual([rental.item_count for rental in rentals], [2, 0])
+        self.assertEqual([rental.total_quantity for rental in rentals], [7, None])
+
+    def test_depot_rentals_date_filters(self):
+        for day in range(1, 8):
+            self.create_dated_rental('Renter %d' % day, day)
+
+        response = self.get_rentals('?start_date=2017-03-03&return_date=2017-03-07')
+        self.assertEqual(
+            [rental.firstname for rental in response.context['rentals']],
+            ['Renter 3', 'Renter 4', 'Renter 5']
+        )
+
+    def test_depot_rentals_invalid_filters_are_ignored(self):
+        self.create_dated_rental('Ida', 5)
+        response = self.get_rentals('?start_date=tomorrow&after=nonsense')
+        self.assertEqual(len(response.context['rentals']), 1)
+
+    @mock.patch.object(DepotRentalsView, 'page_size', 2)
+    def test_depot_rentals_pagination(self):
+        # Rentals starting at the same time are ordered by uuid
+        for firstname in ['Ida', 'Erik', 'Otto']:
+            self.create_dated_rental(firstname, 5)
+        self.create_dated_rental('Uwe', 6)
+        self.create_dated_rental('Anna', 4)
+
+        pages = []
+        query = '?start_date=2017-03-05'
+
+        while query is not None:
+            response = self.get_rentals(query)
+            pages.append([rental.firstname for rental in response.context['rentals']])
+            query = response.context['next_url']
+
+        self.assertEqual([len(page) for page in pages], [2, 2])
+        self.assertEqual(sorted(pages[0] + pages[1][:1]), ['Erik', 'Ida', 'Otto'])
+        self.assertEqual(pages[1][1], 'Uwe')
+
+    def test_depot_rentals_constant_queries(self):
+        item = Item.objects.create(name='Item', depot=self.depot1, quantity=10)
+        self.create_dated_rental('Ida', 5, [(item, 1)])
+        self.get_rentals()
+
+        with CaptureQueriesContext(connection) as single_rental_queries:
+            self.get_rentals()
+
+        for day in range(6, 16):
+            self.create_dated_rental('Renter %d' % day, day, [(item, 1)])
+
+        with CaptureQueriesContext(connection) as many_rentals_queries:
+            self.get_rentals()
+
+        self.assertEqual(len(single_rental_queries), len(many_rentals_queries))
@@ -1,6 +1,9 @@
 from django.urls import path
+from .views.depot_availability_search_view import DepotAvailabilitySearchView
+from .views.depot_availability_view import DepotAvailabilityView
 from .views.depot_create_rental_view import DepotCreateRentalView
 from .views.depot_detail_view import DepotDetailView
+from .views.depot_heatmap_view import DepotHeatmapView, DepotHeatmapDataView
 from .views.depot_index_view import DepotIndexView
 from .views.depot_rentals_view import DepotRentalsView
 
@@ -8,6 +11,11 @@ app_name = 'depot'
 urlpatterns = [
     path('', DepotIndexView.as_view(), name='index'),
     path('<int:depot_id>/', DepotDetailView.as_view(), name='detail'),
+    path('<int:depot_id>/availability/', DepotAvailabilityView.as_view(), name='availability'),
+    path('<int:depot_id>/availability/search/', DepotAvailabilitySearchView.as_view(),
+         name='availability_search'),
+    path('<int:depot_id>/heatmap/', DepotHeatmapView.as_view(), name='heatmap'),
+    path('<int:depot_id>/heatmap/data/', DepotHeatmapDataView.as_view(), name='heatmap_data'),
     path('<int:depot_id>/rentals/', DepotRentalsView.as_view(), name='rentals'),
     path('<int:depot_id>/rentals/create/', DepotCreateRentalView.as_view(),
          name='create_rental')
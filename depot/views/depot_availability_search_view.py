@@ -0,0 +1,42 @@
+from datetime import datetime
+from depot.helpers import get_depot_if_allowed, extract_item_quantities, suggest_time_frames
+from django.http import HttpResponseBadRequest, JsonResponse
+from django.views import View
+
+
+class DepotAvailabilitySearchView(View):
+    """
+    Suggest time frames in which all items of a cart are available
+
+    The cart is given with the same parameters as in the rental form.
+    The requested time frame defines the duration of the rental and
+    the search is limited to the given number of days around it.
+    """
+
+    max_days = 60
+
+    def get(self, request, depot_id):
+        depot = get_depot_if_allowed(depot_id, request.user)
+        data = request.GET
+
+        try:
+            start_date = datetime.strptime(data['start_date'], '%Y-%m-%d %H:%M')
+            return_date = datetime.strptime(data['return_date'], '%Y-%m-%d %H:%M')
+            days = min(max(int(data.get('days', 7)), 0), self.max_days)
+            item_quantities = extract_item_quantities(data)
+        except (KeyError, ValueError):
+            return HttpResponseBadRequest('Invalid cart or time frame')
+
+        if start_date > return_date or not item_quantities:
+            return HttpResponseBadRequest('Invalid cart or time frame')
+
+        suggestions = suggest_time_frames(
+            depot, request.user, item_quantities, start_date, return_date, days
+        )
+
+        return JsonResponse({
+            'windows': [{
+                'start_date': suggested_start_date.isoformat(),
+                'return_date': suggested_return_date.isoformat(),
+            } for suggested_start_date, suggested_return_date in suggestions]
+        })
@@ -0,0 +1,74 @@
+import hashlib
+from datetime import datetime
+from depot.helpers import get_depot_if_allowed
+from django.http import HttpResponseBadRequest, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from django.views import View
+from rental.availability_cache import CachedAvailability, get_depot_version
+
+
+class DepotAvailabilityView(View):
+    """
+    Provide the availability of a single item over time as JSON
+
+    The data is loaded by the availability chart when its modal is opened.
+    Each response carries an ETag based on the availability version of the
+    depot, so that repeated requests are answered with 304 Not Modified.
+    """
+
+    def get(self, request, depot_id):
+        depot = get_depot_if_allowed(depot_id, request.user)
+
+        try:
+            item_id = int(request.GET['item'])
+            start_date = datetime.strptime(request.GET['start_date'], '%Y-%m-%d %H:%M')
+            return_date = datetime.strptime(request.GET['return_date'], '%Y-%m-%d %H:%M')
+        except (KeyError, ValueError):
+            return HttpResponseBadRequest('Invalid item or time frame')
+
+        if start_date > return_date:
+            return HttpResponseBadRequest('The start date must be before the return date')
+
+        item = get_object_or_404(depot.visible_items(request.user), pk=item_id)
+
+        etag = quote_etag(hashlib.md5(('%d:%d:%d:%s:%s' % (
+            get_depot_version(depot.id), item.id, item.quantity,
+            start_date.isoformat(), return_date.isoformat()
+        )).encode()).hexdigest())
+
+        response = get_conditional_response(request, etag=etag)
+
+        if response is None:
+            availability = CachedAvailability(start_date, return_date, depot.id)
+            intervals = availability.get_availability_intervals(item)
+
+            response = JsonResponse({
+                'available': min(intervals).value,
+                'intervals': self.get_chart_data(intervals),
+            })
+
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+
+        return response
+
+    def get_chart_data(self, intervals):
+        """
+        Generate the data the JavaScript can render
+        """
+
+        data = []
+
+        for interval in intervals:
+            data.append({
+                "x": interval.begin.isoformat(),
+                "y": interval.value
+            })
+            data.append({
+                "x": interval.end.isoformat(),
+                "y": interval.value
+            })
+
+        return data
@@ -1,8 +1,12 @@
 from datetime import datetime, timedelta
-from depot.helpers import get_depot_if_allowed, extract_item_quantities
+from depot.helpers import (
+    extract_item_quantities, get_chart_time_frame, get_depot_if_allowed, suggest_time_frames
+)
 from django.shortcuts import render
+from django.urls import reverse
+from django.utils.http import urlencode
 from django.views import View
-from rental.availability import Availability
+from rental.availability_cache import CachedAvailability
 
 
 class DepotCreateRentalView(View):
@@ -18,35 +22,61 @@ class DepotCreateRentalView(View):
         # configure time frame
         start_date, return_date = self.get_start_return_date(request.GET)
 
-        item_list = depot.visible_items(request.user)
+        return self.render_form(request, depot, start_date, return_date)
 
-        availability = Availability(
-            datetime.combine(start_date.date() - timedelta(days=1), datetime.min.time()),
-            datetime.combine(return_date.date() + timedelta(days=1), datetime.min.time()),
-            depot_id
-        )
+    def render_form(self, request, depot, start_date, return_date,
+                    errors=None, data=None, intervals_by_item=None):
+        """
+        Render the form with the availability of all visible items
+
+        After a failed submission, the errors are shown together with the
+        submitted data. Intervals that have already been computed for the
+        chart time frame while validating the rental are reused.
+        """
+
+        item_list = list(depot.visible_items(request.user))
+
+        chart_start_date, chart_return_date = get_chart_time_frame(start_date, return_date)
+
+        intervals_by_item = dict(intervals_by_item or {})
+        missing = [item for item in item_list if item.id not in intervals_by_item]
+
+        if missing:
+            availability = CachedAvailability(chart_start_date, chart_return_date, depot.id)
+            intervals_by_item.update(availability.get_availability_intervals_for_items(missing))
 
         availability_data = []
 
         for item in item_list:
-            intervals = availability.get_availability_intervals(item)
+            intervals = intervals_by_item[item.id]
 
-            availability_data.append((
-                item,
-                self.get_chart_data(intervals),
-                min(intervals).value
-            ))
+            availability_data.append((item, min(intervals).value))
+
+        data = data or {}
+        item_quantities = extract_item_quantities(data)
 
-        errors = request.session.pop('errors', None)
-        data = request.session.pop('data', {})
+        # Suggest other time frames in case the selected items are not available
+        suggestions = []
+        if errors and item_quantities:
+            suggestions = self.get_suggestions(
+                depot, request.user, item_quantities, start_date, return_date
+            )
 
         return render(request, 'depot/create-rental.html', {
             'depot': depot,
             'show_visibility': depot.show_internal_items(request.user),
             'availability_data': availability_data,
+            'availability_url': '%s?%s' % (
+                reverse('depot:availability', args=[depot.id]),
+                urlencode({
+                    'start_date': chart_start_date.strftime('%Y-%m-%d %H:%M'),
+                    'return_date': chart_return_date.strftime('%Y-%m-%d %H:%M'),
+                })
+            ),
             'errors': errors,
             'data': data,
-            'item_quantities': extract_item_quantities(data),
+            'item_quantities': item_quantities,
+            'suggestions': suggestions,
             'start_date': start_date,
             'return_date': return_date,
             'start_date_formatted': start_date.strftime('%Y-%m-%d %H:%M'),
@@ -72,21 +102,22 @@ class DepotCreateRentalView(View):
 
         return (start_date, max(start_date, return_date))
 
-    def get_chart_data(self, intervals):
+    def get_suggestions(self, depot, user, item_quantities, start_date, return_date):
         """
-        Generate the data the JavaScript can render
+        Link to the time frames closest to the requested one with all items available
         """
 
-        data = []
-
-        for interval in intervals:
-            data.append({
-                "x": interval.begin.isoformat(),
-                "y": interval.value
-            })
-            data.append({
-                "x": interval.end.isoformat(),
-                "y": interval.value
-            })
+        suggestions = []
+
+        for suggested_start_date, suggested_return_date in suggest_time_frames(
+                depot, user, item_quantities, start_date, return_date):
+            suggestions.append((
+                suggested_start_date,
+                suggested_return_date,
+                '%s?%s' % (reverse('depot:create_rental', args=[depot.id]), urlencode({
+                    'start_date': suggested_start_date.strftime('%Y-%m-%d %H:%M'),
+                    'return_date': suggested_return_date.strftime('%Y-%m-%d %H:%M'),
+                }))
+            ))
 
-        return data
+        return suggestions
@@ -1,6 +1,11 @@
+import hashlib
 from datetime import datetime, timedelta
+from depot.catalog import get_catalog_version
 from depot.helpers import get_depot_if_allowed
 from django.shortcuts import render
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from django.utils.translation import get_language
 from django.views import View
 
 
@@ -11,18 +16,45 @@ class DepotDetailView(View):
     Archived depots can only be accessed by superusers and organization managers.
     The internal items of a depot can be seen by all members of this organization.
 
+    Each response carries an ETag based on the catalog version of the depot
+    and everything else the page depends on, so that reloads are answered
+    with 304 Not Modified without loading the items or rendering the page.
+    For other users, the managers and items are rendered from a fragment
+    cached by catalog version, language and visibility of internal items.
+
     :author: Florian Stamer
     """
 
     def get(self, request, depot_id):
         depot = get_depot_if_allowed(depot_id, request.user)
-        item_list = depot.visible_items(request.user)
-
-        return render(request, 'depot/detail.html', {
-            'depot': depot,
-            'item_list': item_list,
-            'show_visibility': depot.show_internal_items(request.user),
-            'managed_by_user': depot.managed_by(request.user),
-            'start_date': datetime.now() + timedelta(days=1),
-            'return_date': datetime.now() + timedelta(days=4)
-        })
+        show_visibility = depot.show_internal_items(request.user)
+        managed_by_user = depot.managed_by(request.user)
+
+        # The suggested time frame only changes once per hour
+        start_date = datetime.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=1)
+
+        catalog_version = get_catalog_version(depot.id)
+
+        etag = quote_etag(hashlib.md5(('%d:%d:%s:%s:%d:%d' % (
+            catalog_version, request.user.pk or 0, get_language(),
+            start_date.isoformat(), show_visibility, managed_by_user
+        )).encode()).hexdigest())
+
+        response = get_conditional_response(request, etag=etag)
+
+        if response is None:
+            response = render(request, 'depot/detail.html', {
+                'depot': depot,
+                'catalog_version': catalog_version,
+                # The items are only loaded if the fragment is not cached
+                'item_list': depot.visible_items(request.user),
+                'show_visibility': show_visibility,
+                'managed_by_user': managed_by_user,
+                'start_date': start_date,
+                'return_date': start_date + timedelta(days=3)
+            })
+
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+
+        return response
@@ -0,0 +1,90 @@
+from datetime import date, datetime, timedelta
+from depot.models import Depot
+from django.http import HttpResponseForbidden, JsonResponse
+from django.shortcuts import get_object_or_404, render
+from django.views import View
+from rental.heatmap import Heatmap
+
+
+class DepotHeatmapView(View):
+    """
+    Show the utilization of all items in a depot over a longer time frame
+
+    Each cell contains the number of free elements of an item within
+    one day or hour. Only managers of the depot can access this page.
+    """
+
+    resolutions = {
+        'day': (timedelta(days=1), 90),
+        'hour': (timedelta(hours=1), 24 * 14),
+    }
+
+    def get(self, request, depot_id):
+        depot = get_object_or_404(Depot, pk=depot_id)
+
+        if not depot.managed_by(request.user):
+            return HttpResponseForbidden('Not a manager of this depot')
+
+        heatmap = self.get_heatmap(request.GET, depot)
+        item_list = depot.active_items.order_by('name')
+        free_quantities = heatmap.get_free_quantities(item_list)
+
+        return self.render_heatmap(request, depot, heatmap, item_list, free_quantities)
+
+    def get_heatmap(self, data, depot):
+        """
+        Create the heatmap for the time frame given in the request
+
+        If required data is missing or invalid, default values are used.
+        """
+
+        resolution = data.get('resolution')
+        if resolution not in self.resolutions:
+            resolution = 'day'
+
+        slot_length, max_slots = self.resolutions[resolution]
+
+        try:
+            start_date = datetime.strptime(data.get('start_date'), '%Y-%m-%d')
+        except (ValueError, TypeError):
+            start_date = datetime.combine(date.today(), datetime.min.time())
+
+        try:
+            slot_count = min(max(int(data.get('slots')), 1), max_slots)
+        except (ValueError, TypeError):
+            slot_count = 31 if resolution == 'day' else 24 * 7
+
+        return Heatmap(start_date, slot_length, slot_count, depot.id)
+
+    def render_heatmap(self, request, depot, heatmap, item_list, free_quantities):
+        rows = []
+
+        for item in item_list:
+            rows.append((item, [
+                (free, 1 - free / item.quantity if item.quantity else 0)
+                for free in free_quantities[item.id]
+            ]))
+
+        return render(request, 'depot/heatmap.html', {
+            'depot': depot,
+            'slots': heatmap.slots,
+            'rows': rows,
+            'hourly': heatmap.slot_length < timedelta(days=1),
+        })
+
+
+class DepotHeatmapDataView(DepotHeatmapView):
+    """
+    Provide the utilization heatmap of a depot as JSON
+    """
+
+    def render_heatmap(self, request, depot, heatmap, item_list, free_quantities):
+        return JsonResponse({
+            'slots': [slot.isoformat() for slot in heatmap.slots],
+            'items': [{
+                'id': item.id,
+                'name': item.name,
+                'quantity': item.quantity,
+                'free': free_quantities[item.id],
+            } for item in item_list],
+        })
@@ -1,6 +1,10 @@
+from functools import partial
+from django.db.models import Count, Prefetch, Q
 from django.shortcuts import render
 from django.views import View
-from depot.models import Organization
+from depot.catalog import get_index_version
+from depot.models import Depot, Item, Organization
+from depot.permissions import get_permissions
 
 
 class DepotIndexView(View):
@@ -10,24 +14,53 @@ class DepotIndexView(View):
     Only organization managers get a link to the admin interface of their
     organization so that they can change the name and add new depots.
 
+    The organizations are loaded together with their managers and their
+    active depots, which are annotated with the number of public items,
+    so the number of queries does not depend on the number of depots.
+    The list is rendered from a fragment cached by the index version,
+    the language and the organizations managed by the user, in which
+    case no queries are run at all.
+
     :author: Florian Stamer
     :author: Benedikt Seidl
     """
 
     def get(self, request):
-        organization_depots = []
+        permissions = get_permissions(request.user)
+
+        if request.user.is_superuser:
+            managed_organizations = 'all'
+        else:
+            managed_organizations = ','.join(
+                str(organization_id)
+                for organization_id in sorted(permissions.managed_organization_ids)
+            )
+
+        return render(request, 'depot/index.html', {
+            # Only called by the template if the fragment is not cached
+            'organization_depots': partial(self.get_organization_depots, permissions),
+            'index_version': get_index_version(),
+            'managed_organizations': managed_organizations,
+        })
 
-        for organization in Organization.objects.all():
-            managed_by_user = organization.managed_by(request.user)
-            depots = organization.active_depots.all()
+    def get_organization_depots(self, permissions):
+        depots = Depot.objects.filter(active=True).annotate(
+            public_item_count=Count('item', filter=Q(item__visibility=Item.VISIBILITY_PUBLIC))
+        ).order_by('id')
 
-            if depots:
+        organizations = Organization.objects.prefetch_related(
+            Prefetch('depot_set', queryset=depots, to_attr='active_depot_list'),
+            'managers'
+        ).order_by('id')
+
+        organization_depots = []
+
+        for organization in organizations:
+            if organization.active_depot_list:
                 organization_depots.append({
                     'model': organization,
-                    'managed_by_user': managed_by_user,
-                    'depots': depots
+                    'managed_by_user': permissions.manages_organization(organization.id),
+                    'depots': organization.active_depot_list
                 })
 
-        return render(request, 'depot/index.html', {
-            'organization_depots': organization_depots
-        })
+        return organization_depots
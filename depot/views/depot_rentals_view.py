@@ -1,6 +1,11 @@
+import uuid
+from datetime import datetime, timedelta
 from depot.models import Depot
+from django.db.models import Count, Q, Sum
 from django.http import HttpResponseForbidden
 from django.shortcuts import get_object_or_404, render
+from django.utils.dateparse import parse_datetime
+from django.utils.http import urlencode
 from django.views import View
 from rental.models import Rental
 
@@ -12,21 +17,98 @@ class DepotRentalsView(View):
     Show labels to visually differentiate the state a
     rental is in.
 
+    The rentals are ordered by their start date and can be filtered
+    by a range of dates. They are split into pages using the start
+    date and uuid of the last rental shown as a cursor, so that each
+    page is read from the index without counting or skipping rows.
+
     :author: Florian Stamer
     """
 
+    page_size = 50
+
     def get(self, request, depot_id):
         depot = get_object_or_404(Depot, pk=depot_id)
 
         if not depot.managed_by(request.user):
             return HttpResponseForbidden('Not a manager of this depot')
 
+        filters = self.get_filters(request.GET)
+
         rentals = Rental.objects.filter(
             depot_id=depot.id,
             state__in=[Rental.STATE_PENDING, Rental.STATE_APPROVED]
-        )
+        ).annotate(
+            item_count=Count('itemrental'),
+            total_quantity=Sum('itemrental__quantity')
+        ).order_by('start_date', 'uuid')
+
+        if 'start_date' in filters:
+            rentals = rentals.filter(start_date__gte=filters['start_date'])
+
+        if 'return_date' in filters:
+            rentals = rentals.filter(return_date__lt=filters['return_date'] + timedelta(days=1))
+
+        cursor = self.parse_cursor(request.GET.get('after'))
+
+        if cursor is not None:
+            start_date, rental_uuid = cursor
+            rentals = rentals.filter(
+                Q(start_date__gt=start_date)
+                | Q(start_date=start_date, uuid__gt=rental_uuid)
+            )
+
+        # Load one more rental to find out if there is a next page
+        rentals = list(rentals[:self.page_size + 1])
+        next_url = None
+
+        if len(rentals) > self.page_size:
+            rentals = rentals[:self.page_size]
+            last = rentals[-1]
+            next_url = '?' + urlencode(dict(
+                {key: value.strftime('%Y-%m-%d') for key, value in filters.items()},
+                after='%s,%s' % (last.start_date.isoformat(), last.uuid)
+            ))
 
         return render(request, 'depot/rentals.html', {
             'rentals': rentals,
             'depot': depot,
+            'filters': filters,
+            'next_url': next_url,
         })
+
+    def get_filters(self, data):
+        """
+        Extract the dates to filter the rentals by from the request
+
+        Missing and invalid dates are ignored.
+        """
+
+        filters = {}
+
+        for key in ['start_date', 'return_date']:
+            try:
+                filters[key] = datetime.strptime(data.get(key), '%Y-%m-%d')
+            except (ValueError, TypeError):
+                pass
+
+        return filters
+
+    def parse_cursor(self, cursor):
+        """
+        Split the cursor into the start date and uuid of the last rental shown
+
+        :return: a tuple of the form (start_date, uuid) or None if the cursor is invalid
+        """
+
+        try:
+            start_date, rental_uuid = cursor.split(',')
+            start_date = parse_datetime(start_date)
+            rental_uuid = uuid.UUID(rental_uuid)
+        except (ValueError, AttributeError):
+            return None
+
+        if start_date is None:
+            return None
+
+        return start_date, rental_uuid
@@ -1,6 +1,11 @@
-from django.contrib import admin
-from django.db.models import Q
+from datetime import datetime
+from django.contrib import admin, messages
+from django.db import transaction
+from rental.approval import approve_rentals
+from rental.availability_cache import invalidate_depot
+from rental.digest import record_state_changes
 from rental.models import Rental, ItemRental
+from rental.occupancy import update_occupancy
 
 
 class ItemRentalInline(admin.TabularInline):
@@ -37,32 +42,65 @@ class RentalAdmin(admin.ModelAdmin):
             message = '%s rentals were' % num_changed
         return '%s successfully marked as %s' % (message, change)
 
+    def update_state(self, request, queryset, state):
+        with transaction.atomic():
+            # The changelist filters, e.g. by state, may no longer match the
+            # rentals after the update, so they are read only once before
+            rows = list(queryset.values_list('pk', 'state', 'depot_id'))
+            old_states = {pk: old_state for pk, old_state, _ in rows}
+
+            num_changed = Rental.objects.filter(pk__in=old_states).update(
+                state=state, updated_at=datetime.now()
+            )
+            # Bulk updates bypass the signals keeping the occupancy in sync
+            update_occupancy(old_states.keys())
+            record_state_changes(old_states, state, request.user)
+
+        for depot_id in {depot_id for _, _, depot_id in rows}:
+            invalidate_depot(depot_id)
+        return num_changed
+
     def make_approved(self, request, queryset):
-        rentals_approved = queryset.update(state=Rental.STATE_APPROVED)
-        self.message_user(request, self.format_message(rentals_approved, 'approved'))
+        # Approvals have to check the availability of all items
+        rentals = list(queryset.exclude(state=Rental.STATE_APPROVED))
+        old_states = {rental.pk: rental.state for rental in rentals}
+
+        with transaction.atomic():
+            approved, rejected = approve_rentals(rentals)
+            record_state_changes({
+                rental.pk: old_states[rental.pk] for rental in approved
+            }, Rental.STATE_APPROVED, request.user)
+
+        # The changelist may be filtered by a state the approved rentals left
+        self.message_user(request, self.format_message(len(approved), 'approved'))
+
+        if rejected:
+            self.message_user(request, 'Not enough items available to approve %s' % ', '.join(
+                str(rental) for rental in rejected
+            ), messages.ERROR)
 
     make_approved.short_description = 'Mark selected rentals as approved'
 
     def make_declined(self, request, queryset):
-        rentals_declined = queryset.update(state=Rental.STATE_DECLINED)
+        rentals_declined = self.update_state(request, queryset, Rental.STATE_DECLINED)
         self.message_user(request, self.format_message(rentals_declined, 'declined'))
 
     make_declined.short_description = 'Mark selected rentals as declined'
 
     def make_pending(self, request, queryset):
-        rentals_pending = queryset.update(state=Rental.STATE_PENDING)
+        rentals_pending = self.update_state(request, queryset, Rental.STATE_PENDING)
         self.message_user(request, self.format_message(rentals_pending, 'pending'))
 
     make_pending.short_description = 'Mark selected rentals as pending'
 
     def make_revoked(self, request, queryset):
-        rentals_revoked = queryset.update(state=Rental.STATE_REVOKED)
+        rentals_revoked = self.update_state(request, queryset, Rental.STATE_REVOKED)
         self.message_user(request, self.format_message(rentals_revoked, 'revoked'))
 
     make_revoked.short_description = 'Mark selected rentals as revoked'
 
     def make_returned(self, request, queryset):
-        rentals_returned = queryset.update(state=Rental.STATE_RETURNED)
+        rentals_returned = self.update_state(request, queryset, Rental.STATE_RETURNED)
         self.message_user(request, self.format_message(rentals_returned, 'returned'))
 
     make_returned.short_description = 'Mark selected rentals as returned'
@@ -75,9 +113,7 @@ class RentalAdmin(admin.ModelAdmin):
         if request.user.is_superuser:
             return qs
 
-        return qs.filter(Q(depot__organization__managers__id=request.user.id)
-                         | Q(depot__manager_users__id=request.user.id)
-                         | Q(depot__manager_groups__id__in=request.user.groups.all())).distinct()
+        return qs.filter(Rental.filter_by_user(request.user))
 
     def has_add_permission(self, request):
         # Only via the rental request form
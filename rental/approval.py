@@ -0,0 +1,157 @@
+from collections import defaultdict
+from django.db import connection, transaction
+from django.db.models import F
+from depot.models import Item
+from rental.models import ItemRental, Rental
+from rental.availability import get_availability
+
+
+def lock_items(rentals):
+    """
+    Lock all items of the given rentals until the end of the transaction
+
+    Approvals of rentals sharing an item are serialized this way, while
+    approvals of different items can proceed in parallel. The rows are
+    locked in a fixed order to prevent deadlocks. Backends without row
+    locks like SQLite take their database write lock instead.
+    """
+
+    items = Item.objects.filter(
+        id__in=ItemRental.objects.filter(rental__in=rentals).values('item_id')
+    )
+
+    if connection.features.has_select_for_update:
+        list(items.select_for_update().order_by('id').values_list('id', flat=True))
+    else:
+        items.update(quantity=F('quantity'))
+
+
+class Conflict:
+    """
+    An item of a rental exceeding its availability in the rental's time frame
+    """
+
+    __slots__ = ('item_rental', 'available')
+
+    def __init__(self, item_rental, available):
+        self.item_rental = item_rental
+        self.available = available
+
+    @property
+    def item(self):
+        return self.item_rental.item
+
+    @property
+    def quantity(self):
+        return self.item_rental.quantity
+
+    def __str__(self):
+        return ('The quantity of %d must not exceed the availability of %d '
+                'in the requested time frame.' % (self.quantity, self.available))
+
+
+def get_item_availability(rental, item_rentals=None):
+    """
+    Determine the availability of all items in the given rental at once
+
+    The availability is the minimum over the rental's time frame and does
+    not include the rental itself, even if it is already approved. It is
+    always read from the database, so that approvals holding the item
+    locks see all rentals approved before them.
+
+    :param item_rentals: the item rentals with their items, loaded if not given
+    :return: a list of tuples (item_rental, available)
+    """
+
+    if item_rentals is None:
+        item_rentals = list(rental.itemrental_set.select_related('item'))
+
+    availability = get_availability(rental.start_date, rental.return_date, rental.depot_id,
+                                    consistent=True)
+    intervals = availability.get_availability_intervals_for_items(
+        item_rental.item for item_rental in item_rentals
+    )
+
+    result = []
+
+    for item_rental in item_rentals:
+        available = min(intervals[item_rental.item_id]).value
+
+        # An approved rental occupies its items during the whole time frame
+        if rental.state == Rental.STATE_APPROVED:
+            available += item_rental.quantity
+
+        result.append((item_rental, available))
+
+    return result
+
+
+def find_conflicts(rental, item_rentals=None):
+    """
+    Check the availability of all items in the given rental at once
+
+    All items are evaluated in a single pass with one availability query,
+    so that every conflict is reported instead of only the first one.
+
+    :param item_rentals: the item rentals with their items, loaded if not given
+    :return: a list with a conflict for each item exceeding its availability
+    """
+
+    return [
+        Conflict(item_rental, available)
+        for item_rental, available in get_item_availability(rental, item_rentals)
+        if item_rental.quantity > available
+    ]
+
+
+def approve_rentals(rentals):
+    """
+    Approve the given rentals as long as all their items are available
+
+    The availability is checked and the state is saved within the same
+    transaction while holding the locks on the affected items, so that
+    concurrent approvals can never overbook an item. The rentals are
+    read again once the items are locked and those whose state differs
+    from the given objects by then, e.g. because another manager has
+    declined or approved them in the meantime, are skipped.
+
+    :return: a tuple with the list of approved rentals and a dictionary
+             mapping each rejected rental to its conflicts
+    """
+
+    expected_states = {rental.pk: rental.state for rental in rentals}
+    approved = []
+    rejected = {}
+
+    with transaction.atomic():
+        lock_items(list(expected_states))
+
+        current = {
+            rental.pk: rental for rental in Rental.objects.select_for_update().filter(
+                pk__in=expected_states
+            ).order_by('pk')
+        }
+
+        # The rentals are approved in the given order
+        rentals = [
+            current[pk] for pk, state in expected_states.items()
+            if pk in current and current[pk].state == state != Rental.STATE_APPROVED
+        ]
+
+        item_rentals = defaultdict(list)
+        for item_rental in ItemRental.objects.filter(rental__in=rentals).select_related('item'):
+            item_rentals[item_rental.rental_id].append(item_rental)
+
+        for rental in rentals:
+            conflicts = find_conflicts(rental, item_rentals[rental.pk])
+
+            if conflicts:
+                rejected[rental] = conflicts
+                continue
+
+            # Saving the rental updates its occupancy events before the next check
+            rental.state = Rental.STATE_APPROVED
+            rental.save(update_fields=['state', 'updated_at'])
+            approved.append(rental)
+
+    return approved, rejected
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class RentalConfig(AppConfig):
     name = 'rental'
+
+    def ready(self):
+        from rental import signals  # noqa: F401
@@ -1,4 +1,8 @@
-from django.db.models import Prefetch
+from collections import defaultdict
+from itertools import groupby
+from operator import itemgetter
+from django.conf import settings
+from django.utils.module_loading import import_string
 from rental.models import ItemRental, Rental
 
 
@@ -9,6 +13,8 @@ class Interval:
     :author: Benedikt Seidl
     """
 
+    __slots__ = ('begin', 'end', 'value')
+
     def __init__(self, begin, end, value):
         self.begin = begin
         self.end = end
@@ -40,6 +46,10 @@ class Availability:
     :author: Leo Tappe
     """
 
+    # Whether the availability is read from the database within the
+    # current transaction instead of a copy updated after the commit
+    consistent = True
+
     def __init__(self, start_date, return_date, depot_id,
                  conflicting_states=[Rental.STATE_APPROVED]):
         self.start_date = start_date
@@ -58,45 +68,128 @@ class Availability:
         :return: a list of lists of the form [from, to, num_available]
         """
 
-        interval_borders = []
-        intervals = []
+        return self.get_availability_intervals_for_items([item])[item.id]
+
+    def get_availability_intervals_for_items(self, items):
+        """
+        Compute the availability intervals for all given items at once.
+
+        All relevant item rentals of the depot in the given time frame
+        are loaded with a single query and then assigned to the items.
+
+        :param items: the items of the depot that you want to rent
+        :return: a dictionary mapping each item id to its list of intervals
+        """
+
+        items = list(items)
+        events = self.load_events(items)
+
+        return {
+            item.id: self.compute_intervals(item.quantity, events[item.id])
+            for item in items
+        }
+
+    def load_events(self, items):
+        """
+        Load the events changing the availability of the given items.
+
+        Each relevant rental results in two events, one decreasing the
+        availability when the rental starts and one increasing it again
+        when the items are returned.
+
+        :param items: the items of the depot that you want to rent
+        :return: a dictionary mapping each item id to a list of (date, delta) tuples
+        """
+
+        events = defaultdict(list)
+
+        item_rentals = self.get_item_rentals().values_list(
+            'item_id', 'rental__start_date', 'rental__return_date', 'quantity'
+        )
+
+        for item_id, start_date, return_date, quantity in item_rentals:
+            events[item_id].append((start_date, -quantity))
+            events[item_id].append((return_date, quantity))
+
+        return events
+
+    def get_item_rentals(self):
+        """
+        Select the item rentals of the depot overlapping the time frame
+        """
 
-        rentals = Rental.objects.filter(
-            start_date__lt=self.return_date,
-            return_date__gt=self.start_date,
-            depot_id=self.depot_id,
-            state__in=self.conflicting_states,
-            items=item
-        ).prefetch_related(
-            Prefetch(
-                'itemrental_set',
-                queryset=ItemRental.objects.filter(item=item),
-                to_attr='relevant_rental'
-            )
+        return ItemRental.objects.filter(
+            rental__depot_id=self.depot_id,
+            rental__state__in=self.conflicting_states,
+            rental__start_date__lt=self.return_date,
+            rental__return_date__gt=self.start_date
         )
 
-        # collect all the datetimes where a relevant rental starts / gets returned
-        for rental in rentals:
-            if rental.start_date > self.start_date:
-                interval_borders.append(rental.start_date)
-            if rental.return_date < self.return_date:
-                interval_borders.append(rental.return_date)
+    def compute_intervals(self, total, events):
+        """
+        Split the time frame into intervals based on the given events.
+
+        Sweeping over the sorted events yields the availability as a
+        step function in O(n log n). Events before the beginning of the
+        time frame only change the initial availability and consecutive
+        intervals with the same value are merged.
 
-        # insert start and end date
-        interval_borders.append(self.start_date)
-        interval_borders.append(self.return_date)
+        :param total: the total quantity of the item
+        :param events: a list of tuples of the form (date, delta)
+        :return: a list of intervals with the number of available elements
+        """
+
+        changes = []
+        value = total
 
-        # sort these points
-        interval_borders.sort()
+        for date, delta in events:
+            if date <= self.start_date:
+                value += delta
+            elif date < self.return_date:
+                changes.append((date, delta))
 
-        # create intervals, initialize with full availability
-        for begin, end in zip(interval_borders, interval_borders[1:]):
-            intervals.append(Interval(begin, end, item.quantity))
+        changes.sort(key=itemgetter(0))
 
-        # for each rental, modify availability during occupied intervals accordingly
-        for rental in rentals:
-            for interval in intervals:
-                if rental.start_date < interval.end and rental.return_date > interval.begin:
-                    interval.value -= rental.relevant_rental[0].quantity
+        intervals = []
+        begin = self.start_date
+
+        for date, group in groupby(changes, key=itemgetter(0)):
+            delta = sum(quantity for _, quantity in group)
+
+            if delta != 0:
+                intervals.append(Interval(begin, date, value))
+                begin = date
+                value += delta
+
+        intervals.append(Interval(begin, self.return_date, value))
 
         return intervals
+
+
+def get_minimum_availability(intervals, start_date, return_date):
+    """
+    Find the lowest availability within a part of the time frame of the given intervals
+    """
+
+    return min(
+        interval.value for interval in intervals
+        if interval.begin <= start_date < interval.end
+        or start_date <= interval.begin < return_date
+    )
+
+
+def get_availability(start_date, return_date, depot_id, consistent=False, **kwargs):
+    """
+    Create an availability helper with the backend configured in the settings
+
+    :param consistent: require a backend reading the database within the
+                       current transaction, e.g. while approving rentals,
+                       otherwise the rental tables are read directly
+    """
+
+    backend = import_string(settings.AVAILABILITY_BACKEND)
+
+    if consistent and not backend.consistent:
+        backend = Availability
+
+    return backend(start_date, return_date, depot_id, **kwargs)
@@ -0,0 +1,123 @@
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rental.availability import Availability, get_availability
+
+HITS_KEY = 'availability:hits'
+MISSES_KEY = 'availability:misses'
+
+
+def depot_version_key(depot_id):
+    return 'availability:depot:%d' % depot_id
+
+
+def get_depot_version(depot_id):
+    """
+    Return the current availability version of the given depot
+
+    A missing version is initialized with the current time so that
+    entries cached before an eviction of the version are never reused.
+    """
+
+    key = depot_version_key(depot_id)
+    version = cache.get(key)
+
+    if version is None:
+        cache.add(key, int(time.time() * 1000000), None)
+        version = cache.get(key)
+
+    return version
+
+
+def increase_depot_version(depot_id):
+    try:
+        cache.incr(depot_version_key(depot_id))
+    except ValueError:
+        get_depot_version(depot_id)
+
+
+def invalidate_depot(depot_id):
+    """
+    Increase the availability version of the given depot
+
+    All results cached for older versions are ignored afterwards.
+    The version is increased again once the current transaction is
+    committed, since a concurrent request may compute the availability
+    from the rows committed so far and cache it under the new version.
+    """
+
+    increase_depot_version(depot_id)
+    transaction.on_commit(lambda: increase_depot_version(depot_id))
+
+
+def increment(key, delta):
+    if not delta:
+        return
+
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        cache.add(key, delta, None)
+
+
+def get_cache_stats():
+    """
+    Return the number of cache hits and misses of all availability lookups
+    """
+
+    stats = cache.get_many([HITS_KEY, MISSES_KEY])
+    return stats.get(HITS_KEY, 0), stats.get(MISSES_KEY, 0)
+
+
+def reset_cache_stats():
+    cache.delete_many([HITS_KEY, MISSES_KEY])
+
+
+class CachedAvailability(Availability):
+    """
+    Availability which caches the intervals of each item
+
+    The results are cached by depot version, item, time frame and
+    conflicting states. Every change to a rental of the depot increases
+    its version, so that outdated results are never served. The cache
+    backend has to be shared by all worker processes for this to hold.
+    Missing results are computed with the configured availability backend.
+    """
+
+    consistent = False
+
+    def cache_key(self, version, item):
+        return 'availability:%d:%d:%d:%d:%s:%s:%s' % (
+            self.depot_id, version, item.id, item.quantity,
+            self.start_date.isoformat(), self.return_date.isoformat(),
+            ','.join(sorted(self.conflicting_states))
+        )
+
+    def get_availability_intervals_for_items(self, items):
+        items = list(items)
+        version = get_depot_version(self.depot_id)
+        keys = {item.id: self.cache_key(version, item) for item in items}
+
+        cached = cache.get_many(keys.values())
+        intervals = {
+            item.id: cached[keys[item.id]] for item in items if keys[item.id] in cached
+        }
+        missing = [item for item in items if item.id not in intervals]
+
+        increment(HITS_KEY, len(intervals))
+        increment(MISSES_KEY, len(missing))
+
+        if missing:
+            availability = get_availability(
+                self.start_date, self.return_date, self.depot_id,
+                conflicting_states=self.conflicting_states
+            )
+            computed = availability.get_availability_intervals_for_items(missing)
+            cache.set_many(
+                {keys[item_id]: value for item_id, value in computed.items()},
+                settings.AVAILABILITY_CACHE_TIMEOUT
+            )
+            intervals.update(computed)
+
+        return intervals
@@ -0,0 +1,141 @@
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from rental.models import RentalEvent
+from rental.outbox import queue_markdown_mail
+
+
+def record_state_changes(old_states, state, user=None):
+    """
+    Record the transition of the given rentals to a new state
+
+    Rentals that already were in the new state are skipped.
+
+    :param old_states: a dictionary mapping the rental ids to their previous state
+    :param user: the user changing the state, if logged in
+    """
+
+    user_id = user.id if user is not None and user.is_authenticated else None
+
+    RentalEvent.objects.bulk_create([
+        RentalEvent(rental_id=rental_id, old_state=old_state, state=state, user_id=user_id)
+        for rental_id, old_state in old_states.items()
+        if old_state != state
+    ])
+
+
+def record_creation(rental, user=None):
+    record_state_changes({rental.pk: ''}, rental.state, user)
+
+
+def get_depot_managers(depot_ids):
+    """
+    Resolve the managers of the given depots with three queries
+
+    A depot is managed by its manager users, the users in its manager
+    groups and the managers of its organization.
+
+    :return: a dictionary mapping each depot id to the set of its managers' ids
+    """
+
+    managers = defaultdict(set)
+
+    for lookup in ('depot', 'groups__depot', 'organization__depot'):
+        pairs = User.objects.filter(**{
+            lookup + '__id__in': depot_ids
+        }).values_list(lookup + '__id', 'id')
+
+        for depot_id, user_id in pairs:
+            managers[depot_id].add(user_id)
+
+    return managers
+
+
+def summarize(events):
+    """
+    Merge the events of each rental into its overall change
+
+    :return: a list of tuples (rental, old_state, state), the old
+             state is empty for rentals created in the meantime
+    """
+
+    changes = OrderedDict()
+
+    for event in events:
+        if event.rental_id in changes:
+            rental, old_state, state = changes[event.rental_id]
+            changes[event.rental_id] = (rental, old_state, event.state)
+        else:
+            changes[event.rental_id] = (event.rental, event.old_state, event.state)
+
+    return list(changes.values())
+
+
+def queue_digests():
+    """
+    Collect all pending rental events into one digest per manager
+
+    Each manager receives the changes of the rentals in all depots they
+    manage, except for the changes they made themselves, with a single
+    mail rendered only once. The events are claimed by marking them as
+    notified first, so overlapping runs skip the events of each other,
+    and the digests are queued in the outbox in the same transaction,
+    so no event is reported twice and none is lost. The send_mails
+    command delivers them over a single connection.
+
+    :return: the number of queued digests
+    """
+
+    now = datetime.now()
+
+    with transaction.atomic():
+        events = RentalEvent.objects.filter(notified_at__isnull=True)
+
+        if connection.features.has_select_for_update_skip_locked:
+            events = events.select_for_update(skip_locked=True)
+
+        ids = list(events.values_list('id', flat=True))
+
+        if not ids:
+            return 0
+
+        # Events claimed by a concurrent run in the meantime are left out
+        RentalEvent.objects.filter(
+            id__in=ids,
+            notified_at__isnull=True
+        ).update(notified_at=now)
+
+        events = list(RentalEvent.objects.filter(
+            id__in=ids,
+            notified_at=now
+        ).select_related('rental__depot').order_by('created_at', 'id'))
+
+        managers = get_depot_managers({event.rental.depot_id for event in events})
+
+        events_by_user = defaultdict(list)
+        for event in events:
+            for user_id in managers[event.rental.depot_id]:
+                if user_id != event.user_id:
+                    events_by_user[user_id].append(event)
+
+        recipients = User.objects.filter(
+            id__in=events_by_user.keys(),
+            is_active=True
+        ).exclude(email='').order_by('id')
+
+        for user in recipients:
+            changes_by_depot = OrderedDict()
+            for change in summarize(events_by_user[user.id]):
+                changes_by_depot.setdefault(change[0].depot, []).append(change)
+
+            queue_markdown_mail(
+                '[Verleihtool] Rental digest, %d rental(s) changed' % sum(
+                    len(changes) for changes in changes_by_depot.values()
+                ),
+                'rental/mails/digest.md',
+                {'user': user, 'changes_by_depot': changes_by_depot},
+                [user.email]
+            )
+
+    return len(recipients)
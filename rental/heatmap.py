@@ -0,0 +1,78 @@
+from collections import defaultdict
+from itertools import accumulate
+from rental.models import ItemRental, Rental
+
+
+class Heatmap:
+    """
+    Helper class to determine the utilization of a whole depot over time
+
+    The time frame is split into slots of equal length. Every approved
+    rental adds its quantity to each slot it overlaps, which is done with
+    a difference array and a cumulative sum per item instead of comparing
+    every rental with every slot. The result is an upper bound for the
+    occupation within each slot and exact when rentals start and end on
+    slot borders.
+    """
+
+    def __init__(self, start_date, slot_length, slot_count, depot_id,
+                 conflicting_states=[Rental.STATE_APPROVED]):
+        self.start_date = start_date
+        self.slot_length = slot_length
+        self.slot_count = slot_count
+        self.depot_id = depot_id
+        self.conflicting_states = conflicting_states
+
+    @property
+    def return_date(self):
+        return self.start_date + self.slot_length * self.slot_count
+
+    @property
+    def slots(self):
+        """
+        The beginning of each slot in the time frame
+        """
+
+        return [self.start_date + self.slot_length * i for i in range(self.slot_count)]
+
+    def get_free_quantities(self, items):
+        """
+        Compute the number of free elements of each item in every slot.
+
+        :param items: the items of the depot
+        :return: a dictionary mapping each item id to a list with one value per slot
+        """
+
+        items = list(items)
+        deltas = defaultdict(lambda: [0] * (self.slot_count + 1))
+
+        item_rentals = ItemRental.objects.filter(
+            rental__start_date__lt=self.return_date,
+            rental__return_date__gt=self.start_date,
+            rental__depot_id=self.depot_id,
+            rental__state__in=self.conflicting_states
+        ).values_list('item_id', 'rental__start_date', 'rental__return_date', 'quantity')
+
+        for item_id, start_date, return_date, quantity in item_rentals:
+            first, last = self.get_slot_range(start_date, return_date)
+            delta = deltas[item_id]
+            delta[first] += quantity
+            delta[last] -= quantity
+
+        free_quantities = {}
+
+        for item in items:
+            occupied = accumulate(deltas[item.id][:self.slot_count])
+            free_quantities[item.id] = [item.quantity - value for value in occupied]
+
+        return free_quantities
+
+    def get_slot_range(self, start_date, return_date):
+        """
+        Return the first and the last slot (exclusive) overlapped by the given dates
+        """
+
+        first = (start_date - self.start_date) // self.slot_length
+        last = -((self.start_date - return_date) // self.slot_length)
+
+        return max(first, 0), min(last, self.slot_count)
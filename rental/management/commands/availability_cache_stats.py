@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from rental.availability_cache import get_cache_stats, reset_cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Show the number of hits and misses of the availability cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Reset the counters after showing them'
+        )
+
+    def handle(self, *args, **options):
+        hits, misses = get_cache_stats()
+        total = hits + misses
+        ratio = hits / total if total else 0
+
+        self.stdout.write('Hits: %d' % hits)
+        self.stdout.write('Misses: %d' % misses)
+        self.stdout.write('Hit ratio: %.1f%%' % (ratio * 100))
+
+        if options['reset']:
+            reset_cache_stats()
+            self.stdout.write('The counters have been reset.')
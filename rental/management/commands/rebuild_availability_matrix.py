@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from rental.matrix import build_matrix, get_path, is_enabled, verify_matrix
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the memory-mapped availability matrix starting from today'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify', action='store_true',
+            help='Compare the existing matrix with the rental tables and only rebuild it '
+                 'if they differ'
+        )
+
+    def handle(self, *args, **options):
+        if options['verify'] and is_enabled():
+            drifted = verify_matrix()
+
+            if not drifted:
+                self.stdout.write(self.style.SUCCESS('The availability matrix is consistent.'))
+                return
+
+            self.stderr.write('The rows of %d items differ from the rental tables: %s' % (
+                len(drifted), ', '.join(str(item_id) for item_id in drifted)
+            ))
+
+        count = build_matrix()
+        self.stdout.write(self.style.SUCCESS(
+            'Wrote %d item rentals to %s.' % (count, get_path())
+        ))
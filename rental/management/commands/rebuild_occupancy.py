@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from depot.models import Depot
+from rental.availability import Availability
+from rental.models import Rental
+from rental.occupancy import OccupancyAvailability, rebuild_occupancy
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the occupancy events and verify them against the rental tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify-only', action='store_true',
+            help='Only compare the existing occupancy events without rebuilding them'
+        )
+
+    def handle(self, *args, **options):
+        if not options['verify_only']:
+            rebuild_occupancy()
+            self.stdout.write('Rebuilt the occupancy events of all approved rentals.')
+
+        mismatches = 0
+
+        for depot in Depot.objects.all():
+            mismatches += self.verify_depot(depot)
+
+        if mismatches:
+            raise CommandError('%d items differ from the rental tables.' % mismatches)
+
+        self.stdout.write(self.style.SUCCESS('The occupancy events are consistent.'))
+
+    def verify_depot(self, depot):
+        time_frame = Rental.objects.filter(
+            depot=depot,
+            state=Rental.STATE_APPROVED
+        ).aggregate(start_date=Min('start_date'), return_date=Max('return_date'))
+
+        if time_frame['start_date'] is None:
+            return 0
+
+        args = (time_frame['start_date'], time_frame['return_date'], depot.id)
+        items = list(depot.item_set.all())
+        expected = Availability(*args).get_availability_intervals_for_items(items)
+        actual = OccupancyAvailability(*args).get_availability_intervals_for_items(items)
+
+        mismatches = 0
+
+        for item in items:
+            if expected[item.id] != actual[item.id]:
+                self.stderr.write('Occupancy of %s in %s differs: expected %s, got %s' % (
+                    item, depot, expected[item.id], actual[item.id]
+                ))
+                mismatches += 1
+
+        return mismatches
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from rental.digest import queue_digests
+
+
+class Command(BaseCommand):
+    help = 'Queue a digest of the recent rental changes for each depot manager'
+
+    def handle(self, *args, **options):
+        count = queue_digests()
+        self.stdout.write('Queued %d digests, deliver them with send_mails.' % count)
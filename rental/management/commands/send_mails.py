@@ -0,0 +1,42 @@
+import time
+from django.core.management.base import BaseCommand
+from rental.outbox import MAX_ATTEMPTS, deliver_mails
+
+
+class Command(BaseCommand):
+    help = 'Deliver the mails waiting in the outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=50,
+            help='Number of mails sent over a single connection'
+        )
+        parser.add_argument(
+            '--max-attempts', type=int, default=MAX_ATTEMPTS,
+            help='Give up on mails that failed this many times'
+        )
+        parser.add_argument(
+            '--loop', type=float, metavar='SECONDS',
+            help='Keep running and check the outbox again after the given number of seconds'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            total_sent = total_failed = 0
+
+            # Drain the outbox batch by batch
+            while True:
+                sent, failed = deliver_mails(options['batch_size'], options['max_attempts'])
+                total_sent += sent
+                total_failed += failed
+
+                if sent == 0 or failed:
+                    break
+
+            if total_sent or total_failed or not options['loop']:
+                self.stdout.write('Sent %d mails, %d failed.' % (total_sent, total_failed))
+
+            if not options['loop']:
+                return
+
+            time.sleep(options['loop'])
@@ -0,0 +1,452 @@
+import fcntl
+import mmap
+import os
+import struct
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from itertools import groupby
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from depot.models import Item
+from rental.availability import Availability, Interval
+from rental.models import ItemRental, MatrixPatch, Rental
+
+MAGIC = b'VTAM'
+HEADER = struct.Struct('=4sqIII')
+HEADER_SIZE = 32
+EPOCH = datetime(1970, 1, 1)
+MAX_OCCUPANCY = 0xFFFF
+
+# Days before today covered by a new matrix, e.g. for the availability charts
+HISTORY_DAYS = 7
+
+# Additional rows for items created after the matrix has been built
+RESERVED_ROWS = 128
+
+
+def to_naive(date):
+    """
+    Convert the given date to a naive datetime in UTC
+    """
+
+    if timezone.is_aware(date):
+        return timezone.make_naive(date, timezone.utc)
+
+    return date
+
+
+class AvailabilityMatrix:
+    """
+    Occupancy of all items in fixed time slots stored in a memory-mapped file
+
+    The file starts with a small header followed by one row of unsigned
+    16 bit integers per item id, each holding the quantity occupied by
+    approved rentals during one slot. A rental occupies every slot it
+    overlaps, so the matrix never reports more items than available.
+    All processes mapping the file share the same pages and see the
+    changes of each other without reading the database.
+    """
+
+    def __init__(self, file, writable=False):
+        access = mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ
+        self.buffer = mmap.mmap(file.fileno(), 0, access=access)
+
+        magic, origin, slot_seconds, self.slot_count, self.row_count = \
+            HEADER.unpack_from(self.buffer)
+
+        if magic != MAGIC:
+            self.buffer.close()
+            raise ValueError('%s is not an availability matrix' % file.name)
+
+        self.origin = EPOCH + timedelta(seconds=origin)
+        self.slot_length = timedelta(seconds=slot_seconds)
+        self.end = self.origin + self.slot_count * self.slot_length
+        self.slots = memoryview(self.buffer)[HEADER_SIZE:].cast('H')
+
+    @classmethod
+    def open(cls, path, writable=False):
+        with open(path, 'r+b' if writable else 'rb') as file:
+            return cls(file, writable)
+
+    @classmethod
+    def create(cls, path, origin, slot_length, slot_count, row_count):
+        """
+        Create an empty matrix file with the given dimensions
+
+        :return: the new matrix opened for writing
+        """
+
+        with open(path, 'w+b') as file:
+            file.write(HEADER.pack(
+                MAGIC,
+                int((to_naive(origin) - EPOCH).total_seconds()),
+                int(slot_length.total_seconds()),
+                slot_count,
+                row_count
+            ))
+            file.truncate(HEADER_SIZE + 2 * slot_count * row_count)
+            return cls(file, writable=True)
+
+    def close(self):
+        self.slots.release()
+        self.buffer.close()
+
+    def get_slot(self, date, round_up=False):
+        """
+        Find the index of the slot containing the given date
+
+        :param round_up: return the index of the next slot instead,
+                         unless the date is exactly at its beginning
+        """
+
+        slot, remainder = divmod(to_naive(date) - self.origin, self.slot_length)
+
+        if round_up and remainder:
+            slot += 1
+
+        return slot
+
+    def get_date(self, slot):
+        """
+        Get the beginning of the given slot in the time zone used by the application
+        """
+
+        date = self.origin + slot * self.slot_length
+
+        if settings.USE_TZ:
+            return timezone.make_aware(date, timezone.utc)
+
+        return date
+
+    def contains(self, start_date, return_date):
+        return (self.origin <= to_naive(start_date)
+                and to_naive(return_date) <= self.end)
+
+    def get_row(self, item_id):
+        """
+        Get the occupancy of the given item in all slots without copying
+
+        :return: a memoryview of the row or None if the item was
+                 created after the matrix has been built
+        """
+
+        if item_id >= self.row_count:
+            return None
+
+        offset = item_id * self.slot_count
+        return self.slots[offset:offset + self.slot_count]
+
+    def add(self, item_id, start_date, return_date, quantity):
+        """
+        Add the given quantity to all slots of an item overlapping the time frame
+
+        Negative quantities remove a rental again. Slots outside of the
+        matrix and items without a row are ignored.
+        """
+
+        if item_id >= self.row_count:
+            return
+
+        offset = item_id * self.slot_count
+        first = max(self.get_slot(start_date), 0)
+        last = min(self.get_slot(return_date, round_up=True), self.slot_count)
+        slots = self.slots
+
+        for index in range(offset + first, offset + last):
+            slots[index] = min(max(slots[index] + quantity, 0), MAX_OCCUPANCY)
+
+    def flush(self):
+        self.buffer.flush()
+
+
+_readers = {}
+
+
+def get_path():
+    return getattr(settings, 'AVAILABILITY_MATRIX_PATH', None)
+
+
+def is_enabled():
+    """
+    Check whether an availability matrix has been built
+    """
+
+    path = get_path()
+    return bool(path) and os.path.exists(path)
+
+
+def get_matrix():
+    """
+    Get the matrix mapped by this process
+
+    The file is mapped again whenever it has been replaced by a rebuild.
+
+    :return: the matrix or None if it has not been built yet
+    """
+
+    path = get_path()
+
+    try:
+        stat = os.stat(path)
+    except (OSError, TypeError):
+        return None
+
+    key = (stat.st_dev, stat.st_ino)
+    reader = _readers.get(path)
+
+    if reader is None or reader[0] != key:
+        _readers[path] = reader = (key, AvailabilityMatrix.open(path))
+
+    return reader[1]
+
+
+@contextmanager
+def lock_matrix(path):
+    """
+    Serialize all processes writing to the matrix at the given path
+    """
+
+    with open(path + '.lock', 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def use_snapshot():
+    """
+    Let all following queries of the current transaction read the same snapshot
+
+    SQLite and MySQL do so by default, PostgreSQL only in repeatable read.
+    Call this first thing in a new transaction.
+    """
+
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+
+
+def write_matrix(path, origin, slot_length, slot_count, row_count):
+    """
+    Write all approved rentals overlapping the given dimensions to a new matrix file
+
+    The pending patches are read from the same snapshot as the rentals,
+    since their changes are already included in the new matrix.
+
+    :return: a tuple with the new matrix opened for writing, the number of
+             item rentals written to it and the ids of the included patches
+    """
+
+    outermost = not connection.in_atomic_block
+
+    with transaction.atomic():
+        if outermost:
+            use_snapshot()
+
+        patch_ids = list(MatrixPatch.objects.values_list('id', flat=True))
+
+        item_rentals = ItemRental.objects.filter(
+            rental__state=Rental.STATE_APPROVED,
+            rental__start_date__lt=origin + slot_count * slot_length,
+            rental__return_date__gt=origin
+        ).values_list('item_id', 'rental__start_date', 'rental__return_date', 'quantity')
+
+        matrix = AvailabilityMatrix.create(path, origin, slot_length, slot_count, row_count)
+
+        try:
+            count = 0
+            for count, (item_id, start_date, return_date, quantity) in enumerate(
+                    item_rentals.iterator(), 1):
+                matrix.add(item_id, start_date, return_date, quantity)
+            matrix.flush()
+        except Exception:
+            matrix.close()
+            raise
+
+    return matrix, count, patch_ids
+
+
+def build_matrix(origin=None):
+    """
+    Build the matrix from all approved rentals and replace the current file
+
+    The new matrix starts a few days before the given origin and covers
+    the horizon configured in the settings from there on. Readers keep
+    using the previous file until they notice the replacement. The
+    patches of changes the build has already read are dropped, so they
+    are not applied to the new matrix again.
+
+    :return: the number of item rentals written to the matrix
+    """
+
+    path = get_path()
+
+    if origin is None:
+        origin = to_naive(timezone.now())
+
+    origin = datetime.combine(origin.date(), time()) - timedelta(days=HISTORY_DAYS)
+    slot_length = timedelta(seconds=settings.AVAILABILITY_MATRIX_SLOT_LENGTH)
+    horizon = timedelta(days=HISTORY_DAYS + settings.AVAILABILITY_MATRIX_HORIZON)
+    slot_count = -(-horizon // slot_length)
+
+    with lock_matrix(path):
+        row_count = (Item.objects.aggregate(Max('id'))['id__max'] or 0) + RESERVED_ROWS + 1
+        matrix, count, patch_ids = write_matrix(
+            path + '.new', origin, slot_length, slot_count, row_count
+        )
+        matrix.close()
+        os.replace(path + '.new', path)
+        MatrixPatch.objects.filter(id__in=patch_ids).delete()
+
+    return count
+
+
+def verify_matrix():
+    """
+    Compare the matrix row by row with a fresh build from the approved rentals
+
+    The matrix drifts from the database whenever a process dies between
+    committing a change and patching the matrix. Changes whose patches
+    are still waiting for the lock are reported as well, so differences
+    are a reason to rebuild rather than proof of a lost patch.
+
+    :return: the ids of the items whose rows differ
+    """
+
+    path = get_path()
+
+    with lock_matrix(path):
+        current = AvailabilityMatrix.open(path)
+
+        try:
+            expected, _, _ = write_matrix(
+                path + '.verify', current.origin, current.slot_length,
+                current.slot_count, current.row_count
+            )
+
+            try:
+                return [
+                    item_id for item_id in range(current.row_count)
+                    if current.get_row(item_id) != expected.get_row(item_id)
+                ]
+            finally:
+                expected.close()
+                os.remove(path + '.verify')
+        finally:
+            current.close()
+
+
+def patch_matrix(removed, added, patch_id):
+    """
+    Apply changed rentals to the slots of the matrix they overlap
+
+    :param removed: (item_id, start_date, return_date, quantity) tuples no longer occupying items
+    :param added: (item_id, start_date, return_date, quantity) tuples now occupying items
+    :param patch_id: the id of the patch recorded with the change, the patch
+                     is skipped if a build has read the change and dropped it
+    """
+
+    path = get_path()
+
+    with lock_matrix(path):
+        deleted, _ = MatrixPatch.objects.filter(pk=patch_id).delete()
+
+        if not deleted or not os.path.exists(path):
+            return
+
+        matrix = AvailabilityMatrix.open(path, writable=True)
+
+        try:
+            for item_id, start_date, return_date, quantity in removed:
+                matrix.add(item_id, start_date, return_date, -quantity)
+            for item_id, start_date, return_date, quantity in added:
+                matrix.add(item_id, start_date, return_date, quantity)
+            matrix.flush()
+        finally:
+            matrix.close()
+
+
+def schedule_patch(removed, added):
+    """
+    Record a patch within the current transaction and apply it once committed
+
+    Every transaction records a patch of its own, so concurrent changes
+    do not wait for each other. Patches leaving the occupancy as it is,
+    e.g. of rentals saved without changes, are not recorded at all.
+    """
+
+    if is_enabled() and sorted(removed) != sorted(added):
+        patch_id = MatrixPatch.objects.create().pk
+        transaction.on_commit(lambda: patch_matrix(removed, added, patch_id))
+
+
+class MatrixAvailability(Availability):
+    """
+    Availability read from the memory-mapped availability matrix
+
+    The time frame is rounded outwards to whole slots, so a rental
+    blocks its items for the complete slots it overlaps. Time frames
+    outside of the matrix, items created after it has been built and
+    any other conflicting states fall back to the rental tables.
+    """
+
+    consistent = False
+
+    def get_availability_intervals_for_items(self, items):
+        items = list(items)
+
+        if list(self.conflicting_states) != [Rental.STATE_APPROVED]:
+            return super().get_availability_intervals_for_items(items)
+
+        matrix = get_matrix()
+
+        if matrix is None or not matrix.contains(self.start_date, self.return_date):
+            return super().get_availability_intervals_for_items(items)
+
+        first = matrix.get_slot(self.start_date)
+        last = matrix.get_slot(self.return_date, round_up=True)
+
+        intervals = {}
+        missing = []
+
+        for item in items:
+            row = matrix.get_row(item.id)
+
+            if row is None:
+                missing.append(item)
+            else:
+                intervals[item.id] = self.compute_slot_intervals(
+                    matrix, item.quantity, row, first, last
+                )
+
+        if missing:
+            intervals.update(super().get_availability_intervals_for_items(missing))
+
+        return intervals
+
+    def compute_slot_intervals(self, matrix, total, row, first, last):
+        """
+        Merge consecutive slots with the same occupancy into intervals
+
+        :param matrix: the matrix the row belongs to
+        :param total: the total quantity of the item
+        :param row: the occupancy of the item in all slots
+        :param first: the slot containing the beginning of the time frame
+        :param last: the slot after the end of the time frame
+        :return: a list of intervals with the number of available elements
+        """
+
+        intervals = []
+        begin = self.start_date
+        slot = first
+
+        for occupied, group in groupby(row[first:last]):
+            slot += sum(1 for _ in group)
+            end = min(matrix.get_date(slot), self.return_date)
+            intervals.append(Interval(begin, end, total - occupied))
+            begin = end
+
+        return intervals
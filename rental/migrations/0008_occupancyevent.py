@@ -0,0 +1,54 @@
+# Generated by Django 2.2.28 on 2026-10-18 11:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_occupancy_events(apps, schema_editor):
+    ItemRental = apps.get_model('rental', 'ItemRental')
+    OccupancyEvent = apps.get_model('rental', 'OccupancyEvent')
+
+    events = []
+    for item_rental in ItemRental.objects.filter(rental__state='2').select_related('rental'):
+        rental = item_rental.rental
+        events.append(OccupancyEvent(
+            rental_id=rental.pk, item_id=item_rental.item_id, depot_id=rental.depot_id,
+            date=rental.start_date, quantity=item_rental.quantity
+        ))
+        events.append(OccupancyEvent(
+            rental_id=rental.pk, item_id=item_rental.item_id, depot_id=rental.depot_id,
+            date=rental.return_date, quantity=-item_rental.quantity
+        ))
+
+    OccupancyEvent.objects.bulk_create(events, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('depot', '0016_remove_item_wikidata_item'),
+        ('rental', '0007_auto_20190807_2121'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OccupancyEvent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateTimeField()),
+                ('quantity', models.IntegerField()),
+                ('depot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='depot.Depot')),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='depot.Item')),
+                ('rental', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='rental.Rental')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='occupancyevent',
+            index=models.Index(fields=['depot', 'date'], name='rental_occu_depot_i_e3bf7e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='occupancyevent',
+            index=models.Index(fields=['item', 'date'], name='rental_occu_item_id_25199b_idx'),
+        ),
+        migrations.RunPython(create_occupancy_events, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 2.2.28 on 2026-10-18 11:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental', '0008_occupancyevent'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='itemrental',
+            index=models.Index(fields=['item', 'rental'], name='rental_item_item_id_abb73f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rental',
+            index=models.Index(fields=['depot', 'state', 'start_date', 'return_date'], name='rental_rent_depot_i_f2225a_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 2.2.28 on 2026-10-18 11:53
+
+import datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental', '0009_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutgoingMail',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=256)),
+                ('body', models.TextField()),
+                ('html_body', models.TextField(blank=True)),
+                ('to', models.TextField(help_text='Comma-separated list of recipients')),
+                ('cc', models.TextField(blank=True, help_text='Comma-separated list of recipients')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('next_attempt', models.DateTimeField(default=datetime.datetime.now)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='outgoingmail',
+            index=models.Index(fields=['sent_at', 'next_attempt'], name='rental_outg_sent_at_64943c_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 2.2.28 on 2026-10-18 11:56
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('rental', '0010_outgoingmail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RentalEvent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('old_state', models.CharField(blank=True, choices=[('1', 'pending'), ('2', 'approved'), ('3', 'declined'), ('4', 'revoked'), ('5', 'returned')], max_length=1)),
+                ('state', models.CharField(choices=[('1', 'pending'), ('2', 'approved'), ('3', 'declined'), ('4', 'revoked'), ('5', 'returned')], max_length=1)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('notified_at', models.DateTimeField(blank=True, null=True)),
+                ('rental', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='rental.Rental')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='rentalevent',
+            index=models.Index(fields=['notified_at', 'created_at'], name='rental_rent_notifie_6f56a8_idx'),
+        ),
+    ]
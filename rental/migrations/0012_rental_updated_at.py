@@ -0,0 +1,20 @@
+# Generated by Django 2.2.28 on 2026-10-18 12:10
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental', '0011_rentalevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rental',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
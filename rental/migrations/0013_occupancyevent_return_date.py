@@ -0,0 +1,42 @@
+# Generated by Django 2.2.28 on 2026-10-18 14:02
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_return_dates(apps, schema_editor):
+    OccupancyEvent = apps.get_model('rental', 'OccupancyEvent')
+    Rental = apps.get_model('rental', 'Rental')
+
+    OccupancyEvent.objects.update(return_date=Subquery(
+        Rental.objects.filter(pk=OuterRef('rental_id')).values('return_date')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental', '0012_rental_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='occupancyevent',
+            name='return_date',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(copy_return_dates, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='occupancyevent',
+            name='return_date',
+            field=models.DateTimeField(),
+        ),
+        migrations.RemoveIndex(
+            model_name='occupancyevent',
+            name='rental_occu_depot_i_e3bf7e_idx',
+        ),
+        migrations.AddIndex(
+            model_name='occupancyevent',
+            index=models.Index(fields=['depot', 'return_date', 'date'], name='rental_occu_depot_i_e50acc_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 2.2.28 on 2026-10-18 12:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental', '0013_occupancyevent_return_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MatrixClock',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
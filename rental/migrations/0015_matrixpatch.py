@@ -0,0 +1,23 @@
+# Generated by Django 2.2.28 on 2026-10-18 12:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental', '0014_matrixclock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MatrixPatch',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.DeleteModel(
+            name='MatrixClock',
+        ),
+    ]
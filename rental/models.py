@@ -5,6 +5,7 @@ from django.core.exceptions import ValidationError
 from django.contrib.auth.models import User
 from django.utils.translation import ugettext_lazy as _
 from depot.models import Depot, Item
+from depot.permissions import get_permissions
 
 
 class Rental(models.Model):
@@ -48,6 +49,7 @@ class Rental(models.Model):
     start_date = models.DateTimeField()
     return_date = models.DateTimeField()
     state = models.CharField(max_length=1, choices=STATES, default=STATE_PENDING)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def clean(self):
         if not self.depot.active:
@@ -63,6 +65,20 @@ class Rental(models.Model):
                 'start_date': 'The start date must be in the future for new rentals.'
             })
 
+    @staticmethod
+    def filter_by_user(user):
+        """
+        Filter for rentals in depots managed by the given user
+        """
+
+        return models.Q(depot_id__in=get_permissions(user).managed_depot_ids)
+
+    class Meta:
+        indexes = [
+            # Availability checks and the rentals overview of a depot
+            models.Index(fields=['depot', 'state', 'start_date', 'return_date']),
+        ]
+
     def __str__(self):
         return 'Rental by %s %s' % (self.firstname, self.lastname)
 
@@ -87,10 +103,10 @@ class ItemRental(models.Model):
             })
 
         if self.item.visibility != Item.VISIBILITY_PUBLIC:
-            organization = self.rental.depot.organization
+            organization_id = self.rental.depot.organization_id
             user = self.rental.user
 
-            if user is None or not organization.is_member(user):
+            if user is None or not get_permissions(user).is_member(organization_id):
                 raise ValidationError({
                     'item': 'You have to be a member of the organization '
                             'that manages this depot to rent an internal item.'
@@ -107,3 +123,109 @@ class ItemRental(models.Model):
                 'returned': 'The amount of returned items must be less than or '
                             'equal to the total amount of rented items.'
             })
+
+    class Meta:
+        indexes = [
+            # Find the rentals of an item without visiting the rentals of other items
+            models.Index(fields=['item', 'rental']),
+        ]
+
+
+class OccupancyEvent(models.Model):
+    """
+    Denormalized change of the occupied quantity of an item.
+
+    Every item of an approved rental is represented by two events,
+    one occupying the rented quantity at the start date and one
+    releasing it again at the return date. The events are kept in
+    sync with the rentals by the functions in `rental.occupancy`.
+
+    Both events carry the return date of their rental, so that the
+    pairs of rentals ended before a time frame can be skipped.
+    """
+
+    depot = models.ForeignKey(Depot, on_delete=models.CASCADE)
+    item = models.ForeignKey(Item, on_delete=models.CASCADE)
+    rental = models.ForeignKey(Rental, on_delete=models.CASCADE)
+    date = models.DateTimeField()
+    return_date = models.DateTimeField()
+    quantity = models.IntegerField()
+
+    class Meta:
+        indexes = [
+            # Only the events of rentals not returned before a time frame are scanned
+            models.Index(fields=['depot', 'return_date', 'date']),
+            models.Index(fields=['item', 'date']),
+        ]
+
+    def __str__(self):
+        return '%+d x %s at %s' % (self.quantity, self.item, self.date)
+
+
+class MatrixPatch(models.Model):
+    """
+    Change of the occupancy that has not been applied to the availability matrix yet
+
+    Each transaction changing the occupancy while the matrix is in use
+    inserts a row, which is deleted by whoever includes the change in
+    the matrix first: the patch after the commit or a build that has
+    already read the change, see `rental.matrix`.
+    """
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return 'Patch %d' % self.pk
+
+
+class OutgoingMail(models.Model):
+    """
+    An email waiting in the outbox to be delivered.
+
+    Mails are written to the outbox in the same transaction as the
+    changes they are about and delivered by a separate worker, see
+    `rental.outbox`. Failed deliveries are retried later on.
+    """
+
+    subject = models.CharField(max_length=256)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    to = models.TextField(help_text='Comma-separated list of recipients')
+    cc = models.TextField(blank=True, help_text='Comma-separated list of recipients')
+    created_at = models.DateTimeField(auto_now_add=True)
+    next_attempt = models.DateTimeField(default=datetime.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['sent_at', 'next_attempt']),
+        ]
+
+    def __str__(self):
+        return '%s to %s' % (self.subject, self.to)
+
+
+class RentalEvent(models.Model):
+    """
+    Creation or state transition of a rental.
+
+    The events are collected into periodic digests for the depot
+    managers, see `rental.digest`. The old state of a new rental is empty.
+    """
+
+    rental = models.ForeignKey(Rental, on_delete=models.CASCADE)
+    old_state = models.CharField(max_length=1, choices=Rental.STATES, blank=True)
+    state = models.CharField(max_length=1, choices=Rental.STATES)
+    user = models.ForeignKey(User, blank=True, null=True, on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+    notified_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['notified_at', 'created_at']),
+        ]
+
+    def __str__(self):
+        return '%s: %s -> %s' % (self.rental, self.old_state or 'new', self.state)
@@ -0,0 +1,139 @@
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Case, DateTimeField, F, Sum, Value, When
+from rental import matrix
+from rental.availability import Availability
+from rental.models import ItemRental, OccupancyEvent, Rental
+
+
+def update_occupancy(rental_ids):
+    """
+    Replace the occupancy events of the given rentals
+
+    Only approved rentals occupy their items, the events of
+    all other rentals are removed. The availability matrix is
+    patched with the difference if it is in use.
+    """
+
+    rental_ids = list(rental_ids)
+
+    with transaction.atomic():
+        events = OccupancyEvent.objects.filter(rental_id__in=rental_ids)
+        removed = get_occupied_ranges(events) if matrix.is_enabled() else []
+        events.delete()
+
+        item_rentals = list(ItemRental.objects.filter(
+            rental_id__in=rental_ids,
+            rental__state=Rental.STATE_APPROVED
+        ).values_list(
+            'rental_id', 'item_id', 'rental__depot_id',
+            'rental__start_date', 'rental__return_date', 'quantity'
+        ))
+
+        OccupancyEvent.objects.bulk_create(create_events(item_rentals))
+
+        matrix.schedule_patch(removed, [
+            (item_id, start_date, return_date, quantity)
+            for _, item_id, _, start_date, return_date, quantity in item_rentals
+        ])
+
+
+def rebuild_occupancy():
+    """
+    Recreate the occupancy events of all approved rentals from scratch
+    """
+
+    with transaction.atomic():
+        OccupancyEvent.objects.all().delete()
+
+        item_rentals = ItemRental.objects.filter(
+            rental__state=Rental.STATE_APPROVED
+        ).values_list(
+            'rental_id', 'item_id', 'rental__depot_id',
+            'rental__start_date', 'rental__return_date', 'quantity'
+        )
+
+        OccupancyEvent.objects.bulk_create(create_events(item_rentals), batch_size=500)
+
+
+def create_events(item_rentals):
+    """
+    Turn the given item rental rows into pairs of occupancy events
+    """
+
+    events = []
+
+    for rental_id, item_id, depot_id, start_date, return_date, quantity in item_rentals:
+        events.append(OccupancyEvent(
+            rental_id=rental_id, item_id=item_id, depot_id=depot_id,
+            date=start_date, return_date=return_date, quantity=quantity
+        ))
+        events.append(OccupancyEvent(
+            rental_id=rental_id, item_id=item_id, depot_id=depot_id,
+            date=return_date, return_date=return_date, quantity=-quantity
+        ))
+
+    return events
+
+
+def get_occupied_ranges(events):
+    """
+    Turn the given pairs of occupancy events back into time frames
+
+    :return: a list of (item_id, start_date, return_date, quantity) tuples
+    """
+
+    events = list(events.values_list('rental_id', 'item_id', 'date', 'quantity'))
+    return_dates = {
+        rental_id: date for rental_id, _, date, quantity in events if quantity < 0
+    }
+
+    return [
+        (item_id, date, return_dates[rental_id], quantity)
+        for rental_id, item_id, date, quantity in events if quantity > 0
+    ]
+
+
+class OccupancyAvailability(Availability):
+    """
+    Availability based on the materialized occupancy events
+
+    All events before the time frame are folded into a single event
+    at its beginning by the database, so the availability of all
+    items in a depot is read with one range scan over the events.
+    The events of rentals returned before the time frame cancel each
+    other out and are skipped, so the scan does not grow with the
+    history of the depot.
+    Since only approved rentals are materialized, any other
+    conflicting states fall back to the rental tables.
+    """
+
+    def load_events(self, items):
+        if list(self.conflicting_states) != [Rental.STATE_APPROVED]:
+            return super().load_events(items)
+
+        events = defaultdict(list)
+
+        for item_id, date, occupied in self.get_occupancy():
+            events[item_id].append((date, -occupied))
+
+        return events
+
+    def get_occupancy(self):
+        """
+        Sum up the occupancy events of all items in the depot per moment
+        """
+
+        return OccupancyEvent.objects.filter(
+            depot_id=self.depot_id,
+            return_date__gt=self.start_date,
+            date__lt=self.return_date
+        ).annotate(
+            moment=Case(
+                When(date__lte=self.start_date, then=Value(self.start_date)),
+                default=F('date'),
+                output_field=DateTimeField()
+            )
+        ).values('item_id', 'moment').annotate(
+            occupied=Sum('quantity')
+        ).values_list('item_id', 'moment', 'occupied').order_by()
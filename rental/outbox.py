@@ -0,0 +1,163 @@
+import markdown
+from datetime import datetime, timedelta
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import connection, transaction
+from django.template.loader import render_to_string
+from rental.models import OutgoingMail
+
+# Delay before the first retry, doubled with every further attempt
+RETRY_DELAY = timedelta(minutes=1)
+MAX_RETRY_DELAY = timedelta(hours=6)
+MAX_ATTEMPTS = 8
+
+# Time a worker has to deliver the mails it claimed before they are due again
+LEASE = timedelta(hours=1)
+
+
+def queue_mail(subject, body, to, cc=(), html_body=''):
+    """
+    Add a mail to the outbox
+
+    Call this within the transaction of the change the mail is about,
+    so that the mail is only sent if the change is committed.
+    """
+
+    return OutgoingMail.objects.create(
+        subject=subject,
+        body=body,
+        html_body=html_body,
+        to=','.join(to),
+        cc=','.join(cc)
+    )
+
+
+def queue_markdown_mail(subject, template_name, context, to, cc=(), request=None):
+    """
+    Render a markdown template and add it to the outbox in plain text and HTML
+    """
+
+    message = render_to_string(template_name, context, request)
+
+    return queue_mail(
+        subject=subject,
+        body=message,
+        to=to,
+        cc=cc,
+        html_body=markdown.markdown(message)
+    )
+
+
+def get_retry_delay(attempts):
+    return min(RETRY_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+
+
+def create_message(mail, connection):
+    email = EmailMultiAlternatives(
+        subject=mail.subject,
+        body=mail.body,
+        to=mail.to.split(','),
+        cc=mail.cc.split(',') if mail.cc else [],
+        connection=connection
+    )
+
+    if mail.html_body:
+        email.attach_alternative(mail.html_body, 'text/html')
+
+    return email
+
+
+def claim_mails(now, batch_size, max_attempts):
+    """
+    Claim a batch of due mails by moving their next attempt past the lease
+
+    Other workers skip the claimed mails until the lease expires, which
+    lets the mails be sent outside of any transaction. Mails of a worker
+    that died while sending are thus retried after the lease.
+
+    :return: the list of claimed mails
+    """
+
+    lease = now + LEASE
+
+    with transaction.atomic():
+        mails = OutgoingMail.objects.filter(
+            sent_at__isnull=True,
+            next_attempt__lte=now,
+            attempts__lt=max_attempts
+        ).order_by('next_attempt', 'id')
+
+        if connection.features.has_select_for_update_skip_locked:
+            mails = mails.select_for_update(skip_locked=True)
+
+        ids = list(mails.values_list('id', flat=True)[:batch_size])
+
+        if not ids:
+            return []
+
+        # Mails claimed by a concurrent worker in the meantime are not due anymore
+        OutgoingMail.objects.filter(
+            id__in=ids,
+            next_attempt__lte=now
+        ).update(next_attempt=lease)
+
+    return list(OutgoingMail.objects.filter(
+        id__in=ids,
+        next_attempt=lease
+    ).order_by('id'))
+
+
+def deliver_mails(batch_size=50, max_attempts=MAX_ATTEMPTS):
+    """
+    Deliver a batch of due mails from the outbox over a single connection
+
+    The batch is claimed in a short transaction, so the database is not
+    locked while talking to the mail server, whose connection times out
+    after the EMAIL_TIMEOUT setting. The result of each mail is recorded
+    right after sending it. Each failed mail is retried with an
+    exponentially growing delay until it has been attempted max_attempts
+    times. If the connection cannot be opened at all, the whole batch is
+    retried later on.
+
+    :return: a tuple with the number of sent and failed mails
+    """
+
+    now = datetime.now()
+    sent = failed = 0
+
+    mails = claim_mails(now, batch_size, max_attempts)
+
+    if not mails:
+        return 0, 0
+
+    mail_connection = get_connection()
+
+    try:
+        mail_connection.open()
+    except Exception as e:
+        for mail in mails:
+            schedule_retry(mail, now, e)
+        return 0, len(mails)
+
+    try:
+        for mail in mails:
+            try:
+                create_message(mail, mail_connection).send()
+            except Exception as e:
+                schedule_retry(mail, now, e)
+                failed += 1
+            else:
+                mail.sent_at = datetime.now()
+                mail.attempts += 1
+                mail.save(update_fields=['sent_at', 'attempts'])
+                sent += 1
+    finally:
+        mail_connection.close()
+
+    return sent, failed
+
+
+def schedule_retry(mail, now, error):
+    mail.attempts += 1
+    mail.next_attempt = now + get_retry_delay(mail.attempts)
+    mail.last_error = repr(error)
+    mail.save(update_fields=['attempts', 'next_attempt', 'last_error'])
@@ -0,0 +1,84 @@
+from rental.availability import get_availability
+
+
+class AvailabilitySearch:
+    """
+    Helper class to find time frames in which a whole cart is available
+
+    The availability of every item in the cart is computed once for the
+    complete search horizon. All intervals in which an item has fewer
+    elements available than requested are then merged in a single sweep,
+    and the gaps in between are the time frames in which every item is
+    available.
+    """
+
+    def __init__(self, start_date, return_date, depot_id):
+        self.start_date = start_date
+        self.return_date = return_date
+        self.depot_id = depot_id
+
+    def get_start_date_ranges(self, items, item_quantities, duration):
+        """
+        Find all possible start dates for a rental of the given duration.
+
+        :param items: the items in the cart
+        :param item_quantities: a dictionary mapping each item id to the requested quantity
+        :param duration: the length of the rental as a timedelta
+        :return: a sorted list of tuples (earliest, latest) of possible start dates
+        """
+
+        items = list(items)
+        end_date = self.return_date + duration
+
+        availability = get_availability(self.start_date, end_date, self.depot_id)
+        intervals = availability.get_availability_intervals_for_items(items)
+
+        blocked = []
+
+        for item in items:
+            quantity = item_quantities[item.id]
+            blocked.extend(
+                (interval.begin, interval.end)
+                for interval in intervals[item.id]
+                if interval.value < quantity
+            )
+
+        blocked.sort()
+
+        ranges = []
+        free_since = self.start_date
+
+        for begin, end in blocked:
+            if begin > free_since:
+                self.add_range(ranges, free_since, begin, duration)
+            free_since = max(free_since, end)
+
+        self.add_range(ranges, free_since, end_date, duration)
+
+        return ranges
+
+    def add_range(self, ranges, begin, end, duration):
+        latest = min(end - duration, self.return_date)
+
+        if begin <= latest:
+            ranges.append((begin, latest))
+
+    def get_suggestions(self, items, item_quantities, duration, desired_start_date, limit=5):
+        """
+        Find the start dates closest to the desired one.
+
+        From each range of possible start dates, the date closest to the
+        desired start date is taken. The earliest possible windows are
+        found by passing the beginning of the search horizon.
+
+        :return: a list of at most `limit` tuples (start_date, return_date)
+        """
+
+        ranges = self.get_start_date_ranges(items, item_quantities, duration)
+
+        start_dates = sorted(
+            (min(max(desired_start_date, earliest), latest) for earliest, latest in ranges),
+            key=lambda start_date: abs(start_date - desired_start_date)
+        )
+
+        return [(start_date, start_date + duration) for start_date in start_dates[:limit]]
@@ -0,0 +1,41 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rental.availability_cache import invalidate_depot
+from rental.models import ItemRental, Rental
+from rental.occupancy import update_occupancy
+
+
+@receiver(post_save, sender=Rental)
+def rental_saved(sender, instance, created, raw=False, **kwargs):
+    """
+    Keep the occupancy events in sync with the state and dates of a rental
+    """
+
+    if raw:
+        return
+
+    invalidate_depot(instance.depot_id)
+
+    if not created or instance.state == Rental.STATE_APPROVED:
+        update_occupancy([instance.pk])
+
+
+@receiver(post_delete, sender=Rental)
+def rental_deleted(sender, instance, **kwargs):
+    invalidate_depot(instance.depot_id)
+
+
+@receiver(post_save, sender=ItemRental)
+@receiver(post_delete, sender=ItemRental)
+def item_rental_changed(sender, instance, raw=False, **kwargs):
+    """
+    Only the items of approved rentals have occupancy events to update
+    """
+
+    if raw:
+        return
+
+    invalidate_depot(instance.rental.depot_id)
+
+    if instance.rental.state == Rental.STATE_APPROVED:
+        update_occupancy([instance.rental_id])
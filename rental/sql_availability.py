@@ -0,0 +1,121 @@
+from collections import defaultdict
+from django.db import connection
+from django.utils.dateparse import parse_datetime
+from rental.availability import Availability, Interval
+from rental.models import ItemRental, Rental
+
+AVAILABILITY_QUERY = """
+    WITH events AS (
+        SELECT ir.item_id AS item_id,
+               CASE WHEN r.start_date > %s THEN r.start_date ELSE %s END AS moment,
+               -ir.quantity AS delta
+        FROM {item_rental} ir
+        JOIN {rental} r ON r.{rental_pk} = ir.rental_id
+        WHERE {conditions}
+        UNION ALL
+        SELECT ir.item_id AS item_id,
+               r.return_date AS moment,
+               ir.quantity AS delta
+        FROM {item_rental} ir
+        JOIN {rental} r ON r.{rental_pk} = ir.rental_id
+        WHERE {conditions} AND r.return_date < %s
+    ), changes AS (
+        SELECT item_id, moment, SUM(delta) AS delta
+        FROM events
+        GROUP BY item_id, moment
+    )
+    SELECT item_id, moment, SUM(delta) OVER (PARTITION BY item_id ORDER BY moment) AS change
+    FROM changes
+    ORDER BY item_id, moment
+"""
+
+
+class SqlAvailability(Availability):
+    """
+    Availability computed by the database using window functions
+
+    The start and return events of all relevant rentals are combined in
+    the database and a running sum over the events of each item yields
+    the change of its availability at every breakpoint. Only these
+    breakpoints are turned into intervals in Python.
+
+    Databases without support for window functions fall back
+    to the computation in Python.
+    """
+
+    def get_availability_intervals_for_items(self, items):
+        if not connection.features.supports_over_clause:
+            return super().get_availability_intervals_for_items(items)
+
+        items = list(items)
+        breakpoints = self.load_breakpoints()
+
+        return {
+            item.id: self.create_intervals(item.quantity, breakpoints[item.id])
+            for item in items
+        }
+
+    def load_breakpoints(self):
+        """
+        Load the change of the availability at every breakpoint of each item
+
+        :return: a dictionary mapping each item id to a list of (date, change) tuples
+        """
+
+        states = list(self.conflicting_states)
+        breakpoints = defaultdict(list)
+
+        if not states:
+            return breakpoints
+
+        conditions = ('r.depot_id = %s AND r.state IN ({states}) '
+                      'AND r.start_date < %s AND r.return_date > %s')
+
+        query = AVAILABILITY_QUERY.format(
+            item_rental=connection.ops.quote_name(ItemRental._meta.db_table),
+            rental=connection.ops.quote_name(Rental._meta.db_table),
+            rental_pk=connection.ops.quote_name(Rental._meta.pk.column),
+            conditions=conditions.format(states=', '.join(['%s'] * len(states)))
+        )
+
+        start_date = connection.ops.adapt_datetimefield_value(self.start_date)
+        return_date = connection.ops.adapt_datetimefield_value(self.return_date)
+        condition_params = [self.depot_id] + states + [return_date, start_date]
+
+        params = ([start_date, start_date] + condition_params
+                  + condition_params + [return_date])
+
+        with connection.cursor() as cursor:
+            cursor.execute(query, params)
+
+            for item_id, date, change in cursor.fetchall():
+                if isinstance(date, str):
+                    date = parse_datetime(date)
+                breakpoints[item_id].append((date, change))
+
+        return breakpoints
+
+    def create_intervals(self, total, breakpoints):
+        """
+        Turn the breakpoints of an item into a list of intervals
+
+        Breakpoints which do not change the availability are skipped.
+        """
+
+        intervals = []
+        begin = self.start_date
+        value = total
+
+        for date, change in breakpoints:
+            if total + change == value:
+                continue
+
+            if date > begin:
+                intervals.append(Interval(begin, date, value))
+                begin = date
+
+            value = total + change
+
+        intervals.append(Interval(begin, self.return_date, value))
+
+        return intervals
@@ -0,0 +1,183 @@
+from datetime import datetime, timedelta
+from depot.models import Depot, Item, Organization
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from rental.admin import RentalAdmin
+from rental.approval import approve_rentals, find_conflicts
+from rental.models import ItemRental, OccupancyEvent, Rental
+
+
+class ApprovalTestCase(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.organization = Organization.objects.create()
+        self.depot = Depot.objects.create(
+            name='Approval Depot',
+            organization=self.organization,
+            active=True
+        )
+        self.item = Item.objects.create(
+            depot=self.depot,
+            quantity=5,
+            visibility=Item.VISIBILITY_PUBLIC
+        )
+        self.other_item = Item.objects.create(
+            name='other item',
+            depot=self.depot,
+            quantity=5,
+            visibility=Item.VISIBILITY_PUBLIC
+        )
+        self.start = datetime.now() + timedelta(days=3)
+        self.end = datetime.now() + timedelta(days=7)
+
+    def create_rental(self, item, quantity, state=Rental.STATE_PENDING):
+        rental = Rental.objects.create(
+            depot=self.depot,
+            firstname='Rita',
+            lastname='Renter',
+            start_date=self.start,
+            return_date=self.end,
+            state=state
+        )
+        ItemRental.objects.create(rental=rental, item=item, quantity=quantity)
+        return rental
+
+    def test_approve_available_rental(self):
+        rental = self.create_rental(self.item, 5)
+
+        self.assertEqual(approve_rentals([rental]), ([rental], {}))
+        rental.refresh_from_db()
+        self.assertEqual(rental.state, Rental.STATE_APPROVED)
+        self.assertEqual(OccupancyEvent.objects.filter(rental=rental).count(), 2)
+
+    def test_reject_overbooking(self):
+        self.create_rental(self.item, 3, Rental.STATE_APPROVED)
+        rental = self.create_rental(self.item, 3)
+
+        approved, rejected = approve_rentals([rental])
+        self.assertEqual(approved, [])
+        self.assertEqual(list(rejected), [rental])
+        rental.refresh_from_db()
+        self.assertEqual(rental.state, Rental.STATE_PENDING)
+
+    def test_overlapping_rentals_in_one_batch(self):
+        first = self.create_rental(self.item, 3)
+        second = self.create_rental(self.item, 3)
+        third = self.create_rental(self.other_item, 3)
+
+        approved, rejected = approve_rentals([first, second, third])
+        self.assertEqual(approved, [first, third])
+        self.assertEqual(list(rejected), [second])
+        self.assertEqual(
+            set(Rental.objects.filter(state=Rental.STATE_APPROVED)),
+            {first, third}
+        )
+
+    def test_skip_rentals_changed_in_the_meantime(self):
+        declined = self.create_rental(self.item, 3)
+        approved = self.create_rental(self.other_item, 3)
+        changed = self.create_rental(self.item, 3)
+
+        # Other managers change the rentals after they have been loaded
+        Rental.objects.filter(pk=declined.pk).update(state=Rental.STATE_DECLINED)
+        Rental.objects.filter(pk=approved.pk).update(state=Rental.STATE_APPROVED)
+        Rental.objects.filter(pk=changed.pk).update(purpose='Changed purpose')
+
+        self.assertEqual(approve_rentals([declined, approved, changed]), ([changed], {}))
+        declined.refresh_from_db()
+        self.assertEqual(declined.state, Rental.STATE_DECLINED)
+        changed.refresh_from_db()
+        self.assertEqual(changed.state, Rental.STATE_APPROVED)
+        self.assertEqual(changed.purpose, 'Changed purpose')
+
+    def test_admin_action_rejects_overbooking(self):
+        self.create_rental(self.item, 3, Rental.STATE_APPROVED)
+        rental = self.create_rental(self.item, 3)
+        other_rental = self.create_rental(self.other_item, 3)
+
+        request = RequestFactory().post('/admin/rental/rental/')
+        setattr(request, 'session', {})
+        setattr(request, '_messages', FallbackStorage(request))
+        request.user = AnonymousUser()
+
+        admin = RentalAdmin(Rental, None)
+        admin.make_approved(request, Rental.objects.filter(pk__in=[rental.pk, other_rental.pk]))
+
+        rental.refresh_from_db()
+        other_rental.refresh_from_db()
+        self.assertEqual(rental.state, Rental.STATE_PENDING)
+        self.assertEqual(other_rental.state, Rental.STATE_APPROVED)
+
+        stored_messages = [str(message) for message in request._messages]
+        self.assertEqual(stored_messages, [
+            '1 rental was successfully marked as approved',
+            'Not enough items available to approve Rental by Rita Renter',
+        ])
+
+    def test_admin_action_on_filtered_changelist(self):
+        rental = self.create_rental(self.item, 3)
+
+        request = RequestFactory().post('/admin/rental/rental/?state__exact=1')
+        setattr(request, 'session', {})
+        setattr(request, '_messages', FallbackStorage(request))
+        request.user = AnonymousUser()
+
+        admin = RentalAdmin(Rental, None)
+        admin.make_approved(request, Rental.objects.filter(state=Rental.STATE_PENDING))
+
+        rental.refresh_from_db()
+        self.assertEqual(rental.state, Rental.STATE_APPROVED)
+        self.assertEqual([str(message) for message in request._messages], [
+            '1 rental was successfully marked as approved',
+        ])
+
+    def test_report_all_conflicts(self):
+        self.create_rental(self.item, 4, Rental.STATE_APPROVED)
+        rental = self.create_rental(self.item, 3)
+        ItemRental.objects.create(rental=rental, item=self.other_item, quantity=6)
+        third_item = Item.objects.create(
+            name='third item',
+            depot=self.depot,
+            quantity=5,
+            visibility=Item.VISIBILITY_PUBLIC
+        )
+        ItemRental.objects.create(rental=rental, item=third_item, quantity=5)
+
+        conflicts = find_conflicts(rental)
+
+        self.assertEqual(
+            [(conflict.item, conflict.quantity, conflict.available) for conflict in conflicts],
+            [(self.item, 3, 1), (self.other_item, 6, 5)]
+        )
+        self.assertEqual(
+            str(conflicts[0]),
+            'The quantity of 3 must not exceed the availability of 1 in the requested time frame.'
+        )
+
+    def test_query_count_independent_of_items(self):
+        small_rental = self.create_rental(self.item, 1)
+        large_rental = self.create_rental(self.item, 1)
+
+        for i in range(30):
+            item = Item.objects.create(
+                name='Item %d' % i,
+                depot=self.depot,
+                quantity=1,
+                visibility=Item.VISIBILITY_PUBLIC
+            )
+            ItemRental.objects.create(rental=large_rental, item=item, quantity=1)
+
+        with CaptureQueriesContext(connection) as small_queries:
+            approve_rentals([small_rental])
+
+        with CaptureQueriesContext(connection) as large_queries:
+            approve_rentals([large_rental])
+
+        self.assertEqual(len(small_queries), len(large_queries))
+        self.assertEqual(
+            Rental.objects.filter(state=Rental.STATE_APPROVED).count(), 2
+        )
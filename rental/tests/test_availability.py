@@ -101,7 +101,7 @@ class AvailabilityTestCase(TestCase):
         availability = Availability(self.start, self.end, self.depot.id,
                                     conflicting_states=[Rental.STATE_PENDING])
 
-        with self.assertNumQueries(2):
+        with self.assertNumQueries(1):
             intervals = availability.get_availability_intervals(self.item)
             expected = [
                 Interval(self.start, start, 10),
@@ -117,7 +117,7 @@ class AvailabilityTestCase(TestCase):
 
         availability = Availability(self.start, self.end, self.depot.id)
 
-        with self.assertNumQueries(2):
+        with self.assertNumQueries(1):
             intervals = availability.get_availability_intervals(self.item)
             expected = [Interval(self.start, self.end, 7)]
             self.assertEqual(intervals, expected)
@@ -129,7 +129,7 @@ class AvailabilityTestCase(TestCase):
 
         availability = Availability(self.start, self.end, self.depot.id)
 
-        with self.assertNumQueries(2):
+        with self.assertNumQueries(1):
             intervals = availability.get_availability_intervals(self.item)
             expected = [
                 Interval(self.start, start, 10),
@@ -145,7 +145,7 @@ class AvailabilityTestCase(TestCase):
 
         availability = Availability(self.start, self.end, self.depot.id)
 
-        with self.assertNumQueries(2):
+        with self.assertNumQueries(1):
             intervals = availability.get_availability_intervals(self.item)
             expected = [
                 Interval(self.start, end, 7),
@@ -164,7 +164,7 @@ class AvailabilityTestCase(TestCase):
 
         availability = Availability(self.start, self.end, self.depot.id)
 
-        with self.assertNumQueries(2):
+        with self.assertNumQueries(1):
             intervals = availability.get_availability_intervals(self.item)
             expected = [
                 Interval(self.start, left_end, 7),
@@ -184,7 +184,7 @@ class AvailabilityTestCase(TestCase):
 
         availability = Availability(self.start, self.end, self.depot.id)
 
-        with self.assertNumQueries(2):
+        with self.assertNumQueries(1):
             intervals = availability.get_availability_intervals(self.item)
             expected = [
                 Interval(self.start, right_start, 7),
@@ -204,7 +204,7 @@ class AvailabilityTestCase(TestCase):
 
         availability = Availability(self.start, self.end, self.depot.id)
 
-        with self.assertNumQueries(2):
+        with self.assertNumQueries(1):
             intervals = availability.get_availability_intervals(self.item)
             expected = [
                 Interval(self.start, enclosed_start, 7),
@@ -230,7 +230,67 @@ class AvailabilityTestCase(TestCase):
 
         availability = Availability(self.start, self.end, self.depot.id)
 
-        with self.assertNumQueries(2):
+        with self.assertNumQueries(1):
             intervals = availability.get_availability_intervals(self.item)
             expected = [Interval(self.start, self.end, 7)]
             self.assertEqual(intervals, expected)
+
+    def test_multiple_items_single_query(self):
+        other_item = Item.objects.create(
+            name='other item',
+            depot=self.depot,
+            quantity=5,
+            visibility=Item.VISIBILITY_PUBLIC
+        )
+
+        start = self.start + timedelta(days=1)
+        end = self.end + timedelta(days=-1)
+        self.create_conflicting_rental(start, end, 3)
+
+        rental = self.create_conflicting_rental(self.start, self.end, 2)
+        ItemRental.objects.create(rental=rental, item=other_item, quantity=4)
+
+        availability = Availability(self.start, self.end, self.depot.id)
+
+        with self.assertNumQueries(1):
+            intervals = availability.get_availability_intervals_for_items(
+                [self.item, other_item]
+            )
+            self.assertEqual(intervals, {
+                self.item.id: [
+                    Interval(self.start, start, 8),
+                    Interval(start, end, 5),
+                    Interval(end, self.end, 8)
+                ],
+                other_item.id: [Interval(self.start, self.end, 1)]
+            })
+
+    def test_back_to_back_rentals_are_merged(self):
+        middle = self.start + timedelta(days=2)
+        self.create_conflicting_rental(self.start + timedelta(days=-1), middle, 3)
+        self.create_conflicting_rental(middle, self.end + timedelta(days=1), 3)
+
+        availability = Availability(self.start, self.end, self.depot.id)
+
+        intervals = availability.get_availability_intervals(self.item)
+        expected = [Interval(self.start, self.end, 7)]
+        self.assertEqual(intervals, expected)
+
+    def test_rentals_starting_at_the_same_time(self):
+        start = self.start + timedelta(days=1)
+        first_end = self.start + timedelta(days=2)
+        second_end = self.end + timedelta(days=-1)
+        self.create_conflicting_rental(start, second_end, 2)
+        self.create_conflicting_rental(start, first_end, 3)
+
+        availability = Availability(self.start, self.end, self.depot.id)
+
+        intervals = availability.get_availability_intervals(self.item)
+        expected = [
+            Interval(self.start, start, 10),
+            Interval(start, first_end, 5),
+            Interval(first_end, second_end, 8),
+            Interval(second_end, self.end, 10)
+        ]
+        self.assertEqual(intervals, expected)
+        self.assertEqual(min(intervals).value, 5)
@@ -0,0 +1,120 @@
+from datetime import datetime, timedelta
+from io import StringIO
+from depot.models import Depot, Item, Organization
+from django.core.cache import cache
+from django.core.management import call_command
+from django.contrib.auth.models import AnonymousUser
+from django.db import transaction
+from django.test import RequestFactory, TestCase, TransactionTestCase
+from rental.admin import RentalAdmin
+from rental.availability import Interval
+from rental.availability_cache import CachedAvailability, get_cache_stats, get_depot_version
+from rental.models import ItemRental, Rental
+
+
+class AvailabilityCacheTestCase(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.organization = Organization.objects.create()
+        self.depot = Depot.objects.create(
+            name='Cache Depot',
+            organization=self.organization,
+            active=True
+        )
+        self.item = Item.objects.create(
+            depot=self.depot,
+            quantity=10,
+            visibility=Item.VISIBILITY_PUBLIC
+        )
+        self.start = datetime.now() + timedelta(days=3)
+        self.end = datetime.now() + timedelta(days=7)
+        self.availability = CachedAvailability(self.start, self.end, self.depot.id)
+
+    def create_rental(self, quantity, state=Rental.STATE_APPROVED):
+        rental = Rental.objects.create(
+            depot=self.depot,
+            start_date=self.start,
+            return_date=self.end,
+            state=state
+        )
+        ItemRental.objects.create(rental=rental, item=self.item, quantity=quantity)
+        return rental
+
+    def test_repeated_lookup_is_cached(self):
+        self.availability.get_availability_intervals(self.item)
+
+        with self.assertNumQueries(0):
+            intervals = self.availability.get_availability_intervals(self.item)
+            self.assertEqual(intervals, [Interval(self.start, self.end, 10)])
+
+        self.assertEqual(get_cache_stats(), (1, 1))
+
+    def test_new_rental_invalidates_depot(self):
+        self.availability.get_availability_intervals(self.item)
+        self.create_rental(3)
+
+        intervals = self.availability.get_availability_intervals(self.item)
+        self.assertEqual(intervals, [Interval(self.start, self.end, 7)])
+
+    def test_state_change_invalidates_depot(self):
+        rental = self.create_rental(3)
+        self.availability.get_availability_intervals(self.item)
+
+        rental.state = Rental.STATE_DECLINED
+        rental.save()
+
+        intervals = self.availability.get_availability_intervals(self.item)
+        self.assertEqual(intervals, [Interval(self.start, self.end, 10)])
+
+    def test_admin_action_invalidates_depot(self):
+        rental = self.create_rental(3, Rental.STATE_PENDING)
+        self.availability.get_availability_intervals(self.item)
+
+        admin = RentalAdmin(Rental, None)
+        admin.message_user = lambda request, message: None
+        request = RequestFactory().post('/admin/rental/rental/')
+        request.user = AnonymousUser()
+        admin.make_approved(request, Rental.objects.filter(pk=rental.pk))
+
+        intervals = self.availability.get_availability_intervals(self.item)
+        self.assertEqual(intervals, [Interval(self.start, self.end, 7)])
+
+    def test_quantity_change_is_not_cached(self):
+        self.availability.get_availability_intervals(self.item)
+        self.item.quantity = 5
+
+        intervals = self.availability.get_availability_intervals(self.item)
+        self.assertEqual(intervals, [Interval(self.start, self.end, 5)])
+
+    def test_stats_command(self):
+        self.availability.get_availability_intervals(self.item)
+        self.availability.get_availability_intervals(self.item)
+
+        out = StringIO()
+        call_command('availability_cache_stats', '--reset', stdout=out)
+        self.assertIn('Hits: 1', out.getvalue())
+        self.assertIn('Misses: 1', out.getvalue())
+        self.assertIn('Hit ratio: 50.0%', out.getvalue())
+        self.assertEqual(get_cache_stats(), (0, 0))
+
+
+class AvailabilityCacheCommitTestCase(TransactionTestCase):
+
+    def test_depot_invalidated_again_after_commit(self):
+        cache.clear()
+        organization = Organization.objects.create()
+        depot = Depot.objects.create(name='Cache Depot', organization=organization)
+
+        with transaction.atomic():
+            Rental.objects.create(
+                depot=depot,
+                start_date=datetime.now() + timedelta(days=3),
+                return_date=datetime.now() + timedelta(days=7),
+                state=Rental.STATE_APPROVED
+            )
+            # A concurrent request may cache the old rows under this version
+            version = get_depot_version(depot.id)
+
+        self.assertGreater(get_depot_version(depot.id), version)
@@ -0,0 +1,158 @@
+from datetime import datetime, timedelta
+from unittest import mock
+from depot.models import Depot, Organization
+from django.contrib.auth.models import Group, User
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.core import mail
+from django.db.models import QuerySet
+from django.test import RequestFactory
+from rental.admin import RentalAdmin
+from rental.digest import get_depot_managers, queue_digests, record_creation
+from rental.models import OutgoingMail, Rental, RentalEvent
+from rental.outbox import deliver_mails
+from verleihtool.test import ClientTestCase
+
+
+class DigestTestCase(ClientTestCase):
+
+    def setUp(self):
+        super().setUp()
+
+        self.organization = Organization.objects.create(name='My organization')
+        self.depot = Depot.objects.create(name='My depot', organization=self.organization)
+        self.other_depot = Depot.objects.create(name='Other depot',
+                                                organization=self.organization)
+
+        self.depot_manager = User.objects.create_user(
+            username='depot', email='depot@example.com', first_name='Dora', last_name='Depot'
+        )
+        self.group_manager = User.objects.create_user(
+            username='group', email='group@example.com'
+        )
+        self.organization_manager = User.objects.create_user(
+            username='orga', email='orga@example.com'
+        )
+
+        manager_group = Group.objects.create(name='managers')
+        manager_group.user_set.add(self.group_manager)
+        self.depot.manager_users.add(self.depot_manager)
+        self.depot.manager_groups.add(manager_group)
+        self.organization.managers.add(self.organization_manager)
+
+    def create_rental(self, depot, state=Rental.STATE_PENDING, firstname='Guest'):
+        rental = Rental.objects.create(
+            depot=depot,
+            firstname=firstname,
+            lastname='User',
+            start_date=datetime.now() + timedelta(days=1),
+            return_date=datetime.now() + timedelta(days=3),
+            state=state
+        )
+        record_creation(rental)
+        return rental
+
+    def get_digest(self, user):
+        return OutgoingMail.objects.get(to=user.email)
+
+    def test_get_depot_managers(self):
+        with self.assertNumQueries(3):
+            managers = get_depot_managers({self.depot.id, self.other_depot.id})
+
+        self.assertEqual(managers[self.depot.id], {
+            self.depot_manager.id, self.group_manager.id, self.organization_manager.id
+        })
+        self.assertEqual(managers[self.other_depot.id], {self.organization_manager.id})
+
+    def test_digest_per_manager(self):
+        rental = self.create_rental(self.depot)
+        self.create_rental(self.other_depot, firstname='Other')
+
+        self.assertEqual(queue_digests(), 3)
+
+        digest = self.get_digest(self.depot_manager)
+        self.assertEqual(digest.subject, '[Verleihtool] Rental digest, 1 rental(s) changed')
+        self.assertIn('Hello Dora Depot', digest.body)
+        self.assertIn('## My depot', digest.body)
+        self.assertIn('http://127.0.0.1:1337/rentals/%s/' % rental.uuid, digest.body)
+        self.assertIn('new request, pending', digest.body)
+        self.assertNotIn('Other depot', digest.body)
+
+        digest = self.get_digest(self.organization_manager)
+        self.assertIn('## My depot', digest.body)
+        self.assertIn('## Other depot', digest.body)
+        self.assertTrue(digest.subject.endswith('2 rental(s) changed'))
+
+    def test_events_are_reported_once(self):
+        self.create_rental(self.depot)
+        queue_digests()
+
+        self.assertFalse(RentalEvent.objects.filter(notified_at__isnull=True).exists())
+        self.assertEqual(queue_digests(), 0)
+        self.assertEqual(OutgoingMail.objects.count(), 3)
+
+    def test_claimed_events_are_skipped(self):
+        self.create_rental(self.depot)
+        claimed = self.create_rental(self.other_depot, firstname='Other')
+
+        # A concurrent run has claimed the event in the meantime
+        real_update = QuerySet.update
+
+        def update(queryset, **kwargs):
+            real_update(RentalEvent.objects.filter(rental=claimed), notified_at=datetime.now())
+            return real_update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', autospec=True, side_effect=update):
+            self.assertEqual(queue_digests(), 3)
+
+        self.assertNotIn('Other depot', self.get_digest(self.organization_manager).body)
+
+    def test_changes_are_merged(self):
+        rental = self.create_rental(self.depot)
+
+        response = self.as_superuser.post('/rentals/%s/state/' % rental.uuid, {
+            'old_state': Rental.STATE_PENDING,
+            'state': Rental.STATE_DECLINED,
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(RentalEvent.objects.latest('id').user, self.superuser)
+
+        queue_digests()
+        body = self.get_digest(self.depot_manager).body
+        self.assertIn('new request, declined', body)
+        self.assertEqual(body.count('/rentals/%s/' % rental.uuid), 1)
+
+    def test_own_changes_are_skipped(self):
+        rental = self.create_rental(self.depot, Rental.STATE_APPROVED)
+        RentalEvent.objects.update(notified_at=datetime.now())
+
+        request = RequestFactory().post('/admin/rental/rental/')
+        setattr(request, 'session', {})
+        setattr(request, '_messages', FallbackStorage(request))
+        request.user = self.depot_manager
+
+        admin = RentalAdmin(Rental, None)
+        admin.make_returned(request, Rental.objects.filter(pk=rental.pk))
+
+        self.assertEqual(queue_digests(), 2)
+        self.assertFalse(OutgoingMail.objects.filter(to=self.depot_manager.email).exists())
+        self.assertIn('approved → returned', self.get_digest(self.group_manager).body)
+
+    def test_constant_queries(self):
+        for i in range(10):
+            self.create_rental(self.depot, firstname='Guest %d' % i)
+
+        # Savepoint, claiming the events, the claimed events, three manager
+        # queries, recipients, one mail per recipient and release
+        with self.assertNumQueries(12):
+            self.assertEqual(queue_digests(), 3)
+
+    def test_delivery(self):
+        self.create_rental(self.depot)
+        queue_digests()
+
+        self.assertEqual(deliver_mails(), (3, 0))
+        self.assertEqual(
+            sorted(email.to[0] for email in mail.outbox),
+            ['depot@example.com', 'group@example.com', 'orga@example.com']
+        )
+        self.assertEqual(mail.outbox[0].alternatives[0][1], 'text/html')
@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+from depot.models import Depot, Item, Organization
+from django.test import TestCase
+from rental.heatmap import Heatmap
+from rental.models import ItemRental, Rental
+
+
+class HeatmapTestCase(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.organization = Organization.objects.create()
+        self.depot = Depot.objects.create(
+            name='Heatmap Depot',
+            organization=self.organization,
+            active=True
+        )
+        self.item = Item.objects.create(
+            depot=self.depot,
+            quantity=10,
+            visibility=Item.VISIBILITY_PUBLIC
+        )
+        self.other_item = Item.objects.create(
+            name='other item',
+            depot=self.depot,
+            quantity=4,
+            visibility=Item.VISIBILITY_PUBLIC
+        )
+        self.start = datetime(2030, 1, 1)
+        self.heatmap = Heatmap(self.start, timedelta(days=1), 5, self.depot.id)
+
+    def create_rental(self, start, end, quantity, item=None, state=Rental.STATE_APPROVED):
+        rental = Rental.objects.create(
+            depot=self.depot,
+            start_date=start,
+            return_date=end,
+            state=state
+        )
+        ItemRental.objects.create(
+            rental=rental,
+            item=item or self.item,
+            quantity=quantity
+        )
+        return rental
+
+    def test_slots(self):
+        self.assertEqual(self.heatmap.slots, [
+            self.start + timedelta(days=i) for i in range(5)
+        ])
+        self.assertEqual(self.heatmap.return_date, datetime(2030, 1, 6))
+
+    def test_no_rentals(self):
+        free = self.heatmap.get_free_quantities([self.item, self.other_item])
+        self.assertEqual(free, {
+            self.item.id: [10, 10, 10, 10, 10],
+            self.other_item.id: [4, 4, 4, 4, 4],
+        })
+
+    def test_aligned_and_partial_rentals(self):
+        self.create_rental(datetime(2030, 1, 2), datetime(2030, 1, 4), 3)
+        self.create_rental(datetime(2030, 1, 3, 12), datetime(2030, 1, 3, 14), 2)
+        self.create_rental(datetime(2029, 12, 1), datetime(2030, 1, 1, 8), 1, self.other_item)
+        self.create_rental(datetime(2030, 1, 5, 20), datetime(2030, 2, 1), 4, self.other_item)
+
+        with self.assertNumQueries(1):
+            free = self.heatmap.get_free_quantities([self.item, self.other_item])
+
+        self.assertEqual(free, {
+            self.item.id: [10, 7, 5, 10, 10],
+            self.other_item.id: [3, 4, 4, 4, 0],
+        })
+
+    def test_ignores_pending_and_outside_rentals(self):
+        self.create_rental(datetime(2030, 1, 2), datetime(2030, 1, 4), 3,
+                           state=Rental.STATE_PENDING)
+        self.create_rental(datetime(2029, 12, 1), datetime(2030, 1, 1), 3)
+        self.create_rental(datetime(2030, 1, 6), datetime(2030, 1, 8), 3)
+
+        free = self.heatmap.get_free_quantities([self.item])
+        self.assertEqual(free, {self.item.id: [10, 10, 10, 10, 10]})
@@ -0,0 +1,59 @@
+from datetime import datetime
+from unittest import skipUnless
+from depot.models import Depot, Organization
+from django.db import connection
+from django.test import TestCase
+from rental.availability import Availability
+from rental.models import OccupancyEvent, Rental
+from rental.occupancy import OccupancyAvailability
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Query plans are only checked on SQLite')
+class IndexTestCase(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        organization = Organization.objects.create(name='My organization')
+        self.depot = Depot.objects.create(name='My depot', organization=organization)
+
+    def explain(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return '\n'.join(row[-1] for row in cursor.fetchall())
+
+    def get_index_name(self, model, fields):
+        for index in model._meta.indexes:
+            if index.fields == fields:
+                return index.name
+
+    def test_availability_uses_rental_index(self):
+        availability = Availability(
+            datetime(2017, 3, 25), datetime(2017, 3, 27), self.depot.id
+        )
+        plan = self.explain(availability.get_item_rentals())
+
+        index_name = self.get_index_name(
+            Rental, ['depot', 'state', 'start_date', 'return_date']
+        )
+        self.assertIn(
+            'USING INDEX %s (depot_id=? AND state=? AND start_date<?)' % index_name, plan
+        )
+
+    def test_occupancy_skips_returned_rentals(self):
+        availability = OccupancyAvailability(
+            datetime(2017, 3, 25), datetime(2017, 3, 27), self.depot.id
+        )
+        plan = self.explain(availability.get_occupancy())
+
+        index_name = self.get_index_name(OccupancyEvent, ['depot', 'return_date', 'date'])
+        self.assertIn('USING INDEX %s (depot_id=? AND return_date>?)' % index_name, plan)
+
+    def test_active_items_use_partial_index(self):
+        plan = self.explain(self.depot.active_items.all())
+        self.assertIn('USING INDEX depot_item_visible_idx (depot_id=?)', plan)
+
+    def test_public_items_use_partial_index(self):
+        plan = self.explain(self.depot.public_items.all())
+        self.assertIn('USING INDEX depot_item_visible_idx (depot_id=? AND visibility=?)', plan)
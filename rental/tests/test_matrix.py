@@ -0,0 +1,241 @@
+import os
+import tempfile
+from datetime import datetime, timedelta
+from depot.models import Depot, Item, Organization
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from io import StringIO
+from rental.approval import get_item_availability
+from rental.availability import Availability, Interval
+from rental.matrix import (
+    AvailabilityMatrix, MatrixAvailability, build_matrix, get_matrix, get_path,
+    patch_matrix, verify_matrix
+)
+from rental.models import ItemRental, MatrixPatch, Rental
+
+
+class MatrixTestMixin:
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(
+            AVAILABILITY_MATRIX_PATH=os.path.join(self.directory.name, 'availability.matrix')
+        )
+        self.settings_override.enable()
+
+        self.organization = Organization.objects.create()
+        self.depot = Depot.objects.create(
+            name='Matrix Depot',
+            organization=self.organization,
+            active=True
+        )
+        self.item = Item.objects.create(
+            depot=self.depot,
+            quantity=10,
+            visibility=Item.VISIBILITY_PUBLIC
+        )
+        self.today = datetime(2017, 3, 20)
+        self.start = datetime(2017, 3, 23)
+        self.end = datetime(2017, 3, 27)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.directory.cleanup()
+        super().tearDown()
+
+    def create_rental(self, start, end, quantity, state=Rental.STATE_APPROVED):
+        rental = Rental.objects.create(
+            depot=self.depot,
+            start_date=start,
+            return_date=end,
+            state=state
+        )
+        ItemRental.objects.create(rental=rental, item=self.item, quantity=quantity)
+        return rental
+
+
+class MatrixAvailabilityTestCase(MatrixTestMixin, TestCase):
+
+    def test_matches_availability(self):
+        self.create_rental(self.start - timedelta(days=1), self.start + timedelta(days=1), 3)
+        self.create_rental(self.start + timedelta(hours=30), self.end + timedelta(days=1), 4)
+        build_matrix(self.today)
+
+        expected = Availability(self.start, self.end, self.depot.id)
+        actual = MatrixAvailability(self.start, self.end, self.depot.id)
+
+        with self.assertNumQueries(0):
+            intervals = actual.get_availability_intervals(self.item)
+
+        self.assertEqual(intervals, expected.get_availability_intervals(self.item))
+
+    def test_partial_slots_are_occupied(self):
+        start = self.start + timedelta(minutes=90)
+        self.create_rental(start, start + timedelta(hours=1), 3)
+        build_matrix(self.today)
+
+        availability = MatrixAvailability(self.start, self.end, self.depot.id)
+        self.assertEqual(availability.get_availability_intervals(self.item), [
+            Interval(self.start, self.start + timedelta(hours=1), 10),
+            Interval(self.start + timedelta(hours=1), self.start + timedelta(hours=3), 7),
+            Interval(self.start + timedelta(hours=3), self.end, 10),
+        ])
+
+    def test_fallback_outside_of_matrix(self):
+        self.create_rental(self.start, self.end, 3)
+        build_matrix(self.today + timedelta(days=30))
+
+        availability = MatrixAvailability(self.start, self.end, self.depot.id)
+
+        with self.assertNumQueries(1):
+            intervals = availability.get_availability_intervals(self.item)
+
+        self.assertEqual(intervals, [Interval(self.start, self.end, 7)])
+
+    def test_fallback_for_other_states(self):
+        self.create_rental(self.start, self.end, 3, Rental.STATE_PENDING)
+        build_matrix(self.today)
+
+        availability = MatrixAvailability(self.start, self.end, self.depot.id,
+                                          conflicting_states=[Rental.STATE_PENDING])
+        self.assertEqual(availability.get_availability_intervals(self.item), [
+            Interval(self.start, self.end, 7)
+        ])
+
+    def test_fallback_without_matrix(self):
+        self.create_rental(self.start, self.end, 3)
+
+        availability = MatrixAvailability(self.start, self.end, self.depot.id)
+        self.assertEqual(availability.get_availability_intervals(self.item), [
+            Interval(self.start, self.end, 7)
+        ])
+
+    def test_rebuild_is_mapped_again(self):
+        build_matrix(self.today)
+        self.assertEqual(get_matrix().origin, self.today - timedelta(days=7))
+
+        build_matrix(self.today + timedelta(days=1))
+        self.assertEqual(get_matrix().origin, self.today - timedelta(days=6))
+
+    def test_add_clamps_to_matrix(self):
+        path = os.path.join(self.directory.name, 'small.matrix')
+        matrix = AvailabilityMatrix.create(path, self.today, timedelta(hours=1), 24, 2)
+
+        matrix.add(1, self.today - timedelta(days=1), self.today + timedelta(hours=2), 3)
+        matrix.add(1, self.today + timedelta(hours=1), self.today + timedelta(days=2), -5)
+        matrix.add(2, self.today, self.today + timedelta(days=1), 3)
+
+        self.assertEqual(list(matrix.get_row(1)[:3]), [3, 0, 0])
+        self.assertIsNone(matrix.get_row(2))
+        matrix.close()
+
+    def get_available(self):
+        availability = MatrixAvailability(self.start, self.end, self.depot.id)
+        return min(availability.get_availability_intervals(self.item)).value
+
+    @override_settings(AVAILABILITY_BACKEND='rental.matrix.MatrixAvailability')
+    def test_approval_reads_database(self):
+        build_matrix(self.today)
+
+        # The patch of this rental is only applied after the commit
+        self.create_rental(self.start, self.end, 3)
+        self.assertEqual(self.get_available(), 10)
+
+        rental = self.create_rental(self.start, self.end, 8, Rental.STATE_PENDING)
+        [(item_rental, available)] = get_item_availability(rental)
+        self.assertEqual(available, 7)
+
+    def test_patches_seen_by_build_are_skipped(self):
+        build_matrix(self.today)
+        self.create_rental(self.start, self.end, 3)
+        patch = MatrixPatch.objects.get()
+
+        build_matrix(self.today)
+        self.assertFalse(MatrixPatch.objects.exists())
+        self.assertEqual(self.get_available(), 7)
+
+        # The patch of the rental arrives after the build has included it
+        added = [(self.item.id, self.start, self.end, 3)]
+        patch_matrix([], added, patch.pk)
+        self.assertEqual(self.get_available(), 7)
+
+        patch_matrix([], added, MatrixPatch.objects.create().pk)
+        self.assertEqual(self.get_available(), 4)
+        self.assertFalse(MatrixPatch.objects.exists())
+
+    def test_unchanged_occupancy_is_not_patched(self):
+        build_matrix(self.today)
+        rental = self.create_rental(self.start, self.end, 3, Rental.STATE_PENDING)
+        rental.save()
+        self.assertFalse(MatrixPatch.objects.exists())
+
+        rental.state = Rental.STATE_APPROVED
+        rental.save()
+        MatrixPatch.objects.all().delete()
+
+        rental.purpose = 'Unrelated change'
+        rental.save()
+        self.assertFalse(MatrixPatch.objects.exists())
+
+    def test_verify_matrix(self):
+        build_matrix(self.today)
+        self.assertEqual(verify_matrix(), [])
+
+        # The patch of this rental is lost without a commit
+        self.create_rental(self.start, self.end, 3)
+        self.assertEqual(verify_matrix(), [self.item.id])
+        self.assertFalse(os.path.exists(get_path() + '.verify'))
+
+    def test_command_rebuilds_drifted_matrix(self):
+        build_matrix()
+        out = StringIO()
+        call_command('rebuild_availability_matrix', '--verify', stdout=out)
+        self.assertIn('The availability matrix is consistent.', out.getvalue())
+
+        self.create_rental(datetime.now(), datetime.now() + timedelta(days=2), 3)
+        err = StringIO()
+        call_command('rebuild_availability_matrix', '--verify', stdout=out, stderr=err)
+        self.assertIn('The rows of 1 items differ', err.getvalue())
+        self.assertEqual(verify_matrix(), [])
+
+
+class MatrixPatchTestCase(MatrixTestMixin, TransactionTestCase):
+
+    def assertAvailable(self, value):
+        availability = MatrixAvailability(self.start, self.end, self.depot.id)
+        self.assertEqual(availability.get_availability_intervals(self.item), [
+            Interval(self.start, self.end, value)
+        ])
+
+    def test_patch_on_changes(self):
+        build_matrix(self.today)
+        rental = self.create_rental(self.start, self.end, 3, Rental.STATE_PENDING)
+        self.assertAvailable(10)
+
+        rental.state = Rental.STATE_APPROVED
+        rental.save()
+        self.assertAvailable(7)
+
+        item_rental = rental.itemrental_set.get()
+        item_rental.quantity = 5
+        item_rental.save()
+        self.assertAvailable(5)
+
+        rental.state = Rental.STATE_RETURNED
+        rental.save()
+        self.assertAvailable(10)
+        self.assertFalse(MatrixPatch.objects.exists())
+
+    def test_new_items_use_reserved_rows(self):
+        build_matrix(self.today)
+        self.item = Item.objects.create(
+            name='new item',
+            depot=self.depot,
+            quantity=4,
+            visibility=Item.VISIBILITY_PUBLIC
+        )
+        self.create_rental(self.start, self.end, 1)
+
+        with self.assertNumQueries(0):
+            self.assertAvailable(3)
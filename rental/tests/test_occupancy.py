@@ -0,0 +1,168 @@
+from datetime import datetime, timedelta
+from io import StringIO
+from depot.models import Depot, Item, Organization
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory, TestCase
+from rental.admin import RentalAdmin
+from rental.availability import Availability, Interval
+from rental.models import ItemRental, OccupancyEvent, Rental
+from rental.occupancy import OccupancyAvailability
+
+
+class OccupancyTestCase(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.organization = Organization.objects.create()
+        self.depot = Depot.objects.create(
+            name='Occupancy Depot',
+            organization=self.organization,
+            active=True
+        )
+        self.item = Item.objects.create(
+            depot=self.depot,
+            quantity=10,
+            visibility=Item.VISIBILITY_PUBLIC
+        )
+        self.start = datetime.now() + timedelta(days=3)
+        self.end = datetime.now() + timedelta(days=7)
+
+    def create_rental(self, start, end, quantity, state=Rental.STATE_APPROVED):
+        rental = Rental.objects.create(
+            depot=self.depot,
+            start_date=start,
+            return_date=end,
+            state=state
+        )
+        ItemRental.objects.create(
+            rental=rental,
+            item=self.item,
+            quantity=quantity
+        )
+        return rental
+
+    def assertOccupancy(self, rental, expected):
+        events = OccupancyEvent.objects.filter(rental=rental).order_by('date')
+        self.assertEqual(list(events.values_list('date', 'quantity')), expected)
+
+    def test_approved_rental_creates_events(self):
+        rental = self.create_rental(self.start, self.end, 3)
+        self.assertOccupancy(rental, [(self.start, 3), (self.end, -3)])
+
+    def test_pending_rental_creates_no_events(self):
+        rental = self.create_rental(self.start, self.end, 3, Rental.STATE_PENDING)
+        self.assertOccupancy(rental, [])
+
+    def test_state_change_updates_events(self):
+        rental = self.create_rental(self.start, self.end, 3, Rental.STATE_PENDING)
+
+        rental.state = Rental.STATE_APPROVED
+        rental.save()
+        self.assertOccupancy(rental, [(self.start, 3), (self.end, -3)])
+
+        rental.state = Rental.STATE_RETURNED
+        rental.save()
+        self.assertOccupancy(rental, [])
+
+    def test_date_and_quantity_change_updates_events(self):
+        rental = self.create_rental(self.start, self.end, 3)
+
+        rental.return_date = self.end + timedelta(days=1)
+        rental.save()
+        item_rental = rental.itemrental_set.get()
+        item_rental.quantity = 5
+        item_rental.save()
+
+        self.assertOccupancy(rental, [(self.start, 5), (self.end + timedelta(days=1), -5)])
+
+        item_rental.delete()
+        self.assertOccupancy(rental, [])
+
+    def test_admin_actions_update_events(self):
+        rental = self.create_rental(self.start, self.end, 3, Rental.STATE_PENDING)
+        admin = RentalAdmin(Rental, None)
+        admin.message_user = lambda request, message: None
+        request = RequestFactory().post('/admin/rental/rental/')
+        request.user = AnonymousUser()
+        queryset = Rental.objects.filter(pk=rental.pk)
+
+        admin.make_approved(request, queryset)
+        self.assertOccupancy(rental, [(self.start, 3), (self.end, -3)])
+
+        admin.make_declined(request, queryset)
+        self.assertOccupancy(rental, [])
+
+    def test_admin_actions_on_filtered_changelist(self):
+        rental = self.create_rental(self.start, self.end, 3, Rental.STATE_APPROVED)
+        admin = RentalAdmin(Rental, None)
+        admin.message_user = lambda request, message: None
+        request = RequestFactory().post('/admin/rental/rental/?state__exact=2')
+        request.user = AnonymousUser()
+
+        # The changelist filtered by the approved state no longer matches after the update
+        admin.make_declined(request, Rental.objects.filter(state=Rental.STATE_APPROVED))
+
+        rental.refresh_from_db()
+        self.assertEqual(rental.state, Rental.STATE_DECLINED)
+        self.assertOccupancy(rental, [])
+        availability = OccupancyAvailability(self.start, self.end, self.depot.id)
+        self.assertEqual(availability.get_availability_intervals(self.item), [
+            Interval(self.start, self.end, 10)
+        ])
+
+    def test_returned_rentals_are_skipped(self):
+        self.create_rental(self.start + timedelta(days=-3), self.start + timedelta(days=-2), 4)
+        self.create_rental(self.start + timedelta(days=-2), self.start, 3)
+
+        availability = OccupancyAvailability(self.start, self.end, self.depot.id)
+
+        self.assertEqual(dict(availability.load_events([self.item])), {})
+        self.assertEqual(availability.get_availability_intervals(self.item), [
+            Interval(self.start, self.end, 10)
+        ])
+
+    def test_availability_matches_rental_tables(self):
+        self.create_rental(self.start + timedelta(days=-2), self.start + timedelta(days=-1), 4)
+        self.create_rental(self.start + timedelta(days=-1), self.start + timedelta(days=1), 3)
+        self.create_rental(self.start + timedelta(days=1), self.end + timedelta(days=-1), 2)
+        self.create_rental(self.end + timedelta(days=-1), self.end + timedelta(days=1), 1)
+        self.create_rental(self.start, self.end, 5, Rental.STATE_PENDING)
+
+        expected = [
+            Interval(self.start, self.start + timedelta(days=1), 7),
+            Interval(self.start + timedelta(days=1), self.end + timedelta(days=-1), 8),
+            Interval(self.end + timedelta(days=-1), self.end, 9),
+        ]
+
+        availability = Availability(self.start, self.end, self.depot.id)
+        self.assertEqual(availability.get_availability_intervals(self.item), expected)
+
+        availability = OccupancyAvailability(self.start, self.end, self.depot.id)
+
+        with self.assertNumQueries(1):
+            intervals = availability.get_availability_intervals(self.item)
+            self.assertEqual(intervals, expected)
+
+    def test_other_conflicting_states_use_rental_tables(self):
+        start = self.start + timedelta(days=1)
+        self.create_rental(start, self.end, 5, Rental.STATE_PENDING)
+
+        availability = OccupancyAvailability(self.start, self.end, self.depot.id,
+                                             conflicting_states=[Rental.STATE_PENDING])
+
+        intervals = availability.get_availability_intervals(self.item)
+        expected = [Interval(self.start, start, 10), Interval(start, self.end, 5)]
+        self.assertEqual(intervals, expected)
+
+    def test_rebuild_command(self):
+        rental = self.create_rental(self.start, self.end, 3)
+        OccupancyEvent.objects.all().delete()
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_occupancy', '--verify-only',
+                         stdout=StringIO(), stderr=StringIO())
+
+        call_command('rebuild_occupancy', stdout=StringIO())
+        self.assertOccupancy(rental, [(self.start, 3), (self.end, -3)])
@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta
+from smtplib import SMTPException
+from unittest import mock
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from io import StringIO
+from rental.models import OutgoingMail
+from rental.outbox import LEASE, deliver_mails, queue_mail
+
+
+class OutboxTestCase(TestCase):
+
+    def queue(self, count):
+        for i in range(count):
+            queue_mail('Subject %d' % i, 'Body', ['user%d@example.com' % i], cc=['cc@example.com'],
+                       html_body='<p>Body</p>')
+
+    def test_deliver_mails(self):
+        self.queue(1)
+        self.assertEqual(deliver_mails(), (1, 0))
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['user0@example.com'])
+        self.assertEqual(mail.outbox[0].cc, ['cc@example.com'])
+        self.assertEqual(mail.outbox[0].alternatives, [('<p>Body</p>', 'text/html')])
+
+        outgoing = OutgoingMail.objects.get()
+        self.assertIsNotNone(outgoing.sent_at)
+        self.assertEqual(outgoing.attempts, 1)
+
+        # Sent mails are not delivered again
+        self.assertEqual(deliver_mails(), (0, 0))
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_batches_share_connection(self):
+        self.queue(5)
+
+        with mock.patch.object(EmailBackend, 'open', autospec=True,
+                               side_effect=EmailBackend.open) as open_mock:
+            self.assertEqual(deliver_mails(batch_size=3), (3, 0))
+
+        self.assertEqual(open_mock.call_count, 1)
+        self.assertEqual(deliver_mails(batch_size=3), (2, 0))
+        self.assertEqual(len(mail.outbox), 5)
+
+    def test_retry_with_backoff(self):
+        self.queue(2)
+
+        with mock.patch.object(EmailBackend, 'send_messages', side_effect=[
+            SMTPException('Relay unavailable'), 1
+        ]):
+            self.assertEqual(deliver_mails(), (1, 1))
+
+        failed = OutgoingMail.objects.get(sent_at__isnull=True)
+        self.assertEqual(failed.attempts, 1)
+        self.assertIn('Relay unavailable', failed.last_error)
+        self.assertGreater(failed.next_attempt, datetime.now())
+
+        # The mail is not due yet
+        self.assertEqual(deliver_mails(), (0, 0))
+
+        # Every further failure doubles the delay
+        OutgoingMail.objects.update(next_attempt=datetime.now())
+        before = datetime.now()
+        with mock.patch.object(EmailBackend, 'send_messages', side_effect=SMTPException):
+            self.assertEqual(deliver_mails(), (0, 1))
+
+        failed.refresh_from_db()
+        self.assertEqual(failed.attempts, 2)
+        self.assertGreaterEqual(failed.next_attempt, before + timedelta(minutes=2))
+
+        OutgoingMail.objects.update(next_attempt=datetime.now())
+        self.assertEqual(deliver_mails(), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_claimed_mails_are_skipped(self):
+        self.queue(1)
+
+        def send_messages(messages):
+            # A concurrent worker does not send the claimed mail again
+            self.assertEqual(deliver_mails(), (0, 0))
+            outgoing = OutgoingMail.objects.get()
+            self.assertGreater(outgoing.next_attempt, datetime.now() + LEASE / 2)
+            return 1
+
+        with mock.patch.object(EmailBackend, 'send_messages', side_effect=send_messages):
+            self.assertEqual(deliver_mails(), (1, 0))
+
+    def test_give_up_after_max_attempts(self):
+        self.queue(1)
+        OutgoingMail.objects.update(attempts=3)
+        self.assertEqual(deliver_mails(max_attempts=3), (0, 0))
+
+    def test_command_drains_outbox(self):
+        self.queue(5)
+        out = StringIO()
+        call_command('send_mails', '--batch-size=2', stdout=out)
+
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertIn('Sent 5 mails, 0 failed.', out.getvalue())
+
+
+class OutboxTransactionTestCase(TransactionTestCase):
+
+    def test_send_outside_of_transaction(self):
+        queue_mail('Subject', 'Body', ['user@example.com'])
+
+        def send_messages(messages):
+            self.assertFalse(connection.in_atomic_block)
+            return 1
+
+        with mock.patch.object(EmailBackend, 'send_messages', side_effect=send_messages):
+            self.assertEqual(deliver_mails(), (1, 0))
+
+        self.assertIsNotNone(OutgoingMail.objects.get().sent_at)
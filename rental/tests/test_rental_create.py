@@ -2,6 +2,12 @@ import re
 from datetime import datetime, timedelta
 from depot.models import Depot, Item, Organization
 from django.core import mail
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from unittest import mock
+from rental.availability_cache import CachedAvailability
+from rental.models import ItemRental, OutgoingMail, Rental
+from rental.outbox import deliver_mails
 from verleihtool.test import ClientTestCase
 
 
@@ -42,6 +48,11 @@ class RentalCreateTestCase(ClientTestCase):
         uuid = m.group(1)
         self.assertRedirects(response, '/rentals/%s/' % uuid)
 
+        # The mail is queued with the rental and sent by the outbox worker
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutgoingMail.objects.count(), 1)
+        self.assertEqual(deliver_mails(), (1, 0))
+
         self.assertEqual(len(mail.outbox), 1)
         self.assertEqual(
             mail.outbox[0].subject,
@@ -52,3 +63,88 @@ class RentalCreateTestCase(ClientTestCase):
         self.assertIn('<http://testserver/rentals/%s/>' % uuid, mail.outbox[0].body)
         self.assertEqual(mail.outbox[0].from_email, 'verleih@tool.com')
         self.assertEqual(mail.outbox[0].to, ['guest@user.com'])
+
+    def post_rental(self, client, item_quantities):
+        data = {
+            'firstname': 'Ursula',
+            'lastname': 'User',
+            'depot_id': self.depot.id,
+            'email': 'user@example.com',
+            'purpose': 'None',
+            'start_date': (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d %H:%M'),
+            'return_date': (datetime.now() + timedelta(days=3)).strftime('%Y-%m-%d %H:%M'),
+        }
+        for item, quantity in item_quantities:
+            data['item-%d-quantity' % item.id] = quantity
+        return client.post('/rentals/create/', data)
+
+    def create_items(self, count, visibility=Item.VISIBILITY_PUBLIC):
+        return [Item.objects.create(
+            name='Item %d' % Item.objects.count(),
+            depot=self.depot,
+            quantity=5,
+            visibility=visibility
+        ) for i in range(count)]
+
+    def test_create_items_in_bulk(self):
+        self.organization.groups.add(self.group)
+        items = self.create_items(3) + self.create_items(2, Item.VISIBILITY_INTERNAL)
+
+        response = self.post_rental(self.as_user, [(item, 2) for item in items])
+
+        rental = Rental.objects.get()
+        self.assertRedirects(response, '/rentals/%s/' % rental.uuid)
+        self.assertEqual(rental.user, self.user)
+        self.assertEqual(
+            set(rental.itemrental_set.values_list('item_id', 'quantity')),
+            {(item.id, 2) for item in items}
+        )
+
+    def test_create_items_validates_all_rows(self):
+        internal_item, = self.create_items(1, Item.VISIBILITY_INTERNAL)
+        response = self.post_rental(self.as_user, [(self.item, 2), (internal_item, 1)])
+
+        self.assertSuccess(response, 'depot/create-rental.html')
+        self.assertFalse(Rental.objects.exists())
+        self.assertFalse(ItemRental.objects.exists())
+        self.assertEqual(set(response.context['errors']), {
+            'My Item quantity', '%s item' % internal_item.name
+        })
+
+    def test_constant_queries_for_items(self):
+        client = self.as_user
+
+        with CaptureQueriesContext(connection) as single_item_queries:
+            self.post_rental(client, [(self.item, 1)])
+
+        items = self.create_items(50)
+
+        with CaptureQueriesContext(connection) as many_items_queries:
+            self.post_rental(client, [(item, 1) for item in items])
+
+        self.assertEqual(ItemRental.objects.count(), 51)
+        self.assertEqual(len(single_item_queries), len(many_items_queries))
+
+    def test_errors_rendered_inline(self):
+        other_item, = self.create_items(1)
+        client = self.as_user
+
+        with mock.patch.object(
+                CachedAvailability, 'get_availability_intervals_for_items',
+                autospec=True, side_effect=CachedAvailability.get_availability_intervals_for_items
+        ) as get_intervals:
+            response = self.post_rental(client, [(self.item, 2)])
+
+        self.assertSuccess(response, 'depot/create-rental.html')
+        self.assertEqual(list(response.context['errors']), ['My Item quantity'])
+        self.assertEqual(response.context['item_quantities'], {self.item.id: 2})
+        self.assertEqual(response.context['data']['firstname'], 'Ursula')
+        self.assertEqual(response.context['availability_data'], [
+            (self.item, 1), (other_item, 5)
+        ])
+        self.assertNotIn('errors', client.session)
+        self.assertNotIn('data', client.session)
+
+        # Only the items outside of the cart still had to be looked up
+        (availability, items), kwargs = get_intervals.call_args
+        self.assertEqual(items, [other_item])
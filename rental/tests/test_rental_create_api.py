@@ -0,0 +1,131 @@
+import json
+from datetime import datetime, timedelta
+from depot.models import Depot, Item, Organization
+from django.test import Client
+from rental.models import OutgoingMail, Rental
+from verleihtool.test import ClientTestCase
+
+
+class RentalCreateApiTestCase(ClientTestCase):
+
+    def setUp(self):
+        super().setUp()
+
+        self.organization = Organization.objects.create()
+        self.depot = Depot.objects.create(
+            name='My Depot',
+            organization=self.organization,
+            active=True
+        )
+        self.item = Item.objects.create(
+            name='My Item',
+            depot=self.depot,
+            quantity=3,
+            visibility=Item.VISIBILITY_PUBLIC
+        )
+        self.other_item = Item.objects.create(
+            name='Other Item',
+            depot=self.depot,
+            quantity=1,
+            visibility=Item.VISIBILITY_PUBLIC
+        )
+
+    def create_cart(self, items):
+        return {
+            'depot_id': self.depot.id,
+            'dates': {
+                'start_date': (datetime.now() + timedelta(days=1)).isoformat(),
+                'return_date': (datetime.now() + timedelta(days=3)).isoformat(),
+            },
+            'contact': {
+                'firstname': 'Kiosk',
+                'lastname': 'Client',
+                'email': 'kiosk@example.com',
+                'purpose': 'Testing',
+            },
+            'items': [{'id': item_id, 'quantity': quantity} for item_id, quantity in items],
+        }
+
+    def post_cart(self, cart, client=None):
+        client = client or Client(enforce_csrf_checks=True)
+        return client.post('/rentals/create/json/', json.dumps(cart),
+                           content_type='application/json')
+
+    def test_create_rental(self):
+        response = self.post_cart(self.create_cart([(self.item.id, 2), (self.other_item.id, 1)]))
+        self.assertEqual(response.status_code, 201)
+
+        rental = Rental.objects.get()
+        self.assertEqual(response.json(), {
+            'uuid': str(rental.uuid),
+            'url': 'http://testserver/rentals/%s/' % rental.uuid,
+        })
+        self.assertEqual(rental.firstname, 'Kiosk')
+        self.assertIsNone(rental.user)
+        self.assertEqual(
+            set(rental.itemrental_set.values_list('item_id', 'quantity')),
+            {(self.item.id, 2), (self.other_item.id, 1)}
+        )
+        self.assertEqual(OutgoingMail.objects.count(), 1)
+
+    def test_create_rental_as_user(self):
+        response = self.post_cart(self.create_cart([(self.item.id, 1)]), self.as_user)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Rental.objects.get().user, self.user)
+
+    def test_item_errors(self):
+        cart = self.create_cart([(self.item.id, 2), (self.other_item.id, 2), (4242, 1)])
+        response = self.post_cart(cart)
+        self.assertEqual(response.status_code, 400)
+
+        data = response.json()
+        self.assertEqual(data['errors'], {})
+        self.assertEqual([item['id'] for item in data['items']], [self.other_item.id, 4242])
+        self.assertIn('quantity', data['items'][0]['errors'])
+        self.assertIn('item', data['items'][1]['errors'])
+        self.assertFalse(Rental.objects.exists())
+        self.assertFalse(OutgoingMail.objects.exists())
+
+    def test_rental_errors(self):
+        cart = self.create_cart([(self.item.id, 1)])
+        cart['contact']['email'] = 'not an email'
+        response = self.post_cart(cart)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(response.json()['errors']), ['email'])
+        self.assertFalse(Rental.objects.exists())
+
+    def test_unknown_depot(self):
+        cart = self.create_cart([(self.item.id, 1)])
+        cart['depot_id'] = 4242
+        response = self.post_cart(cart)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {
+            'errors': {'depot': ['The depot does not exist.']},
+            'items': [],
+        })
+        self.assertFalse(Rental.objects.exists())
+
+    def test_missing_dates(self):
+        cart = self.create_cart([(self.item.id, 1)])
+        cart['dates'] = {'start_date': 'tomorrow'}
+        response = self.post_cart(cart)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(sorted(response.json()['errors']), ['return_date', 'start_date'])
+        self.assertFalse(Rental.objects.exists())
+
+    def test_empty_cart(self):
+        response = self.post_cart(self.create_cart([]))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(response.json()['errors']), ['item_quantities'])
+
+    def test_invalid_cart(self):
+        response = self.post_cart({'depot_id': self.depot.id})
+        self.assertEqual(response.status_code, 400)
+
+        response = Client().post('/rentals/create/json/', 'nonsense',
+                                 content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_form_data_is_rejected(self):
+        response = Client().post('/rentals/create/json/', {'depot_id': self.depot.id})
+        self.assertEqual(response.status_code, 415)
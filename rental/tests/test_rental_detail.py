@@ -1,7 +1,9 @@
 from datetime import datetime
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from verleihtool.test import ClientTestCase
-from depot.models import Depot, Organization
-from rental.models import Rental
+from depot.models import Depot, Item, Organization
+from rental.models import ItemRental, Rental
 
 
 class RentalDetailTestCase(ClientTestCase):
@@ -155,3 +157,126 @@ class RentalDetailTestCase(ClientTestCase):
         self.assertButton(response, 'Approved')
         self.assertNotButton(response, 'Declined')
         self.assertNotButton(response, 'Returned')
+
+    def create_item_rental(self, rental, quantity):
+        item = Item.objects.create(
+            name='Item %d' % Item.objects.count(),
+            depot=self.depot,
+            quantity=2,
+            visibility=Item.VISIBILITY_PUBLIC
+        )
+        ItemRental.objects.create(rental=rental, item=item, quantity=quantity)
+        return item
+
+    def test_availability_hidden_for_guest(self):
+        rental = self.create_rental(Rental.STATE_PENDING)
+        self.create_item_rental(rental, 1)
+        response = self.as_guest.get('/rentals/%s/' % rental.uuid)
+        self.assertNotContains(response, 'rental-item-available')
+
+        response = self.as_guest.get('/rentals/%s/availability/' % rental.uuid)
+        self.assertEqual(response.status_code, 403)
+
+    def test_availability_preview_as_depot_manager(self):
+        self.depot.manager_users.add(self.user)
+        rental = self.create_rental(Rental.STATE_PENDING)
+        item = self.create_item_rental(rental, 2)
+
+        conflicting_rental = self.create_rental(Rental.STATE_APPROVED)
+        ItemRental.objects.create(rental=conflicting_rental, item=item, quantity=1)
+
+        response = self.as_user.get('/rentals/%s/' % rental.uuid)
+        self.assertInHTML('<span class="label label-danger">1</span>', response.content.decode())
+        self.assertContains(response, 'this rental cannot be approved at the moment')
+
+        response = self.as_user.get('/rentals/%s/availability/' % rental.uuid)
+        self.assertEqual(response.json(), {
+            'approvable': False,
+            'items': [{'id': item.id, 'name': item.name, 'quantity': 2, 'available': 1}],
+        })
+
+    def test_availability_of_approved_rental_excludes_itself(self):
+        self.depot.manager_users.add(self.user)
+        rental = self.create_rental(Rental.STATE_APPROVED)
+        self.create_item_rental(rental, 2)
+
+        response = self.as_user.get('/rentals/%s/' % rental.uuid)
+        self.assertInHTML('<span class="label label-success">2</span>', response.content.decode())
+        self.assertNotContains(response, 'this rental cannot be approved at the moment')
+
+    def test_constant_queries_for_items(self):
+        self.depot.manager_users.add(self.user)
+        client = self.as_user
+        rental = self.create_rental(Rental.STATE_PENDING)
+        self.create_item_rental(rental, 1)
+
+        # Warm up the cached roles of the user
+        client.get('/rentals/%s/' % rental.uuid)
+
+        with CaptureQueriesContext(connection) as single_item_queries:
+            client.get('/rentals/%s/' % rental.uuid)
+
+        for i in range(10):
+            self.create_item_rental(rental, 1)
+
+        with CaptureQueriesContext(connection) as many_items_queries:
+            client.get('/rentals/%s/' % rental.uuid)
+
+        self.assertEqual(len(single_item_queries), len(many_items_queries))
+
+    def get_etag(self, client, rental):
+        response = client.get('/rentals/%s/' % rental.uuid)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def get_conditional(self, client, rental, etag):
+        return client.get('/rentals/%s/' % rental.uuid, HTTP_IF_NONE_MATCH=etag)
+
+    def test_not_modified(self):
+        rental = self.create_rental(Rental.STATE_PENDING)
+        self.create_item_rental(rental, 1)
+        client = self.as_guest
+        etag = self.get_etag(client, rental)
+
+        # The rental and the rows of its items, but neither the items nor the availability
+        with self.assertNumQueries(2):
+            response = self.get_conditional(client, rental, etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertNotIn('Last-Modified', response)
+        self.assertTemplateNotUsed(response, 'rental/detail.html')
+
+    def test_modification_date_is_ignored(self):
+        rental = self.create_rental(Rental.STATE_PENDING)
+        response = self.as_guest.get('/rentals/%s/' % rental.uuid,
+                                     HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+        self.assertEqual(response.status_code, 200)
+
+    def test_modified_by_state(self):
+        rental = self.create_rental(Rental.STATE_PENDING)
+        etag = self.get_etag(self.as_guest, rental)
+
+        rental.state = Rental.STATE_REVOKED
+        rental.save()
+        self.assertEqual(self.get_conditional(self.as_guest, rental, etag).status_code, 200)
+
+    def test_modified_by_item_rentals(self):
+        rental = self.create_rental(Rental.STATE_PENDING)
+        self.create_item_rental(rental, 1)
+        etag = self.get_etag(self.as_guest, rental)
+
+        ItemRental.objects.filter(rental=rental).update(returned=1)
+        self.assertEqual(self.get_conditional(self.as_guest, rental, etag).status_code, 200)
+
+    def test_modified_by_availability_for_managers(self):
+        self.depot.manager_users.add(self.user)
+        rental = self.create_rental(Rental.STATE_PENDING)
+        item = self.create_item_rental(rental, 1)
+        guest_etag = self.get_etag(self.as_guest, rental)
+        manager_etag = self.get_etag(self.as_user, rental)
+
+        other_rental = self.create_rental(Rental.STATE_APPROVED)
+        ItemRental.objects.create(rental=other_rental, item=item, quantity=1)
+
+        self.assertEqual(self.get_conditional(self.as_guest, rental, guest_etag).status_code, 304)
+        self.assertEqual(self.get_conditional(self.as_user, rental, manager_etag).status_code, 200)
@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta
+from depot.models import Depot, Item, Organization
+from django.test import TestCase
+from rental.models import ItemRental, Rental
+from rental.search import AvailabilitySearch
+
+
+class AvailabilitySearchTestCase(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.organization = Organization.objects.create()
+        self.depot = Depot.objects.create(
+            name='Search Depot',
+            organization=self.organization,
+            active=True
+        )
+        self.item = Item.objects.create(
+            depot=self.depot,
+            quantity=10,
+            visibility=Item.VISIBILITY_PUBLIC
+        )
+        self.other_item = Item.objects.create(
+            name='other item',
+            depot=self.depot,
+            quantity=2,
+            visibility=Item.VISIBILITY_PUBLIC
+        )
+        self.search = AvailabilitySearch(day(1), day(20), self.depot.id)
+
+    def create_rental(self, start, end, item, quantity):
+        rental = Rental.objects.create(
+            depot=self.depot,
+            start_date=start,
+            return_date=end,
+            state=Rental.STATE_APPROVED
+        )
+        ItemRental.objects.create(rental=rental, item=item, quantity=quantity)
+
+    def test_everything_available(self):
+        ranges = self.search.get_start_date_ranges(
+            [self.item], {self.item.id: 10}, timedelta(days=3)
+        )
+        self.assertEqual(ranges, [(day(1), day(20))])
+
+    def test_quantity_never_available(self):
+        ranges = self.search.get_start_date_ranges(
+            [self.item], {self.item.id: 11}, timedelta(days=3)
+        )
+        self.assertEqual(ranges, [])
+
+    def test_gaps_between_rentals_of_different_items(self):
+        self.create_rental(day(3), day(5), self.item, 8)
+        self.create_rental(day(7), day(8), self.other_item, 1)
+        self.create_rental(day(10), day(15), self.other_item, 2)
+
+        with self.assertNumQueries(1):
+            ranges = self.search.get_start_date_ranges(
+                [self.item, self.other_item],
+                {self.item.id: 3, self.other_item.id: 2},
+                timedelta(days=2)
+            )
+
+        self.assertEqual(ranges, [
+            (day(1), day(1)),
+            (day(5), day(5)),
+            (day(8), day(8)),
+            (day(15), day(20)),
+        ])
+
+    def test_suggestions_closest_to_desired_start(self):
+        self.create_rental(day(3), day(12), self.item, 8)
+
+        suggestions = self.search.get_suggestions(
+            [self.item], {self.item.id: 3}, timedelta(days=2), day(6)
+        )
+
+        self.assertEqual(suggestions, [
+            (day(1), day(3)),
+            (day(12), day(14)),
+        ])
+
+    def test_earliest_suggestions(self):
+        self.create_rental(day(3), day(12), self.item, 8)
+
+        suggestions = self.search.get_suggestions(
+            [self.item], {self.item.id: 3}, timedelta(days=2), day(1), limit=1
+        )
+
+        self.assertEqual(suggestions, [(day(1), day(3))])
+
+
+def day(number):
+    return datetime(2030, 1, number)
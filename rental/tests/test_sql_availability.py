@@ -0,0 +1,92 @@
+from datetime import datetime
+from depot.models import Depot, Item, Organization
+from django.test import TestCase, override_settings
+from rental.availability import Availability, Interval, get_availability
+from rental.models import ItemRental, Rental
+from rental.occupancy import OccupancyAvailability
+from rental.sql_availability import SqlAvailability
+
+
+class SqlAvailabilityTestCase(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.organization = Organization.objects.create()
+        self.depot = Depot.objects.create(
+            name='SQL Depot',
+            organization=self.organization,
+            active=True
+        )
+        self.item = Item.objects.create(
+            depot=self.depot,
+            quantity=10,
+            visibility=Item.VISIBILITY_PUBLIC
+        )
+        self.other_item = Item.objects.create(
+            name='other item',
+            depot=self.depot,
+            quantity=5,
+            visibility=Item.VISIBILITY_PUBLIC
+        )
+        self.start = datetime(2030, 1, 10)
+        self.end = datetime(2030, 1, 20)
+
+    def create_rental(self, start, end, item, quantity, state=Rental.STATE_APPROVED):
+        rental = Rental.objects.create(
+            depot=self.depot,
+            start_date=start,
+            return_date=end,
+            state=state
+        )
+        ItemRental.objects.create(rental=rental, item=item, quantity=quantity)
+        return rental
+
+    def test_no_rentals(self):
+        availability = SqlAvailability(self.start, self.end, self.depot.id)
+
+        with self.assertNumQueries(1):
+            intervals = availability.get_availability_intervals(self.item)
+            self.assertEqual(intervals, [Interval(self.start, self.end, 10)])
+
+    def test_overlapping_rentals(self):
+        self.create_rental(datetime(2030, 1, 5), datetime(2030, 1, 12), self.item, 3)
+        self.create_rental(datetime(2030, 1, 11), datetime(2030, 1, 25), self.item, 4)
+        self.create_rental(datetime(2030, 1, 12), datetime(2030, 1, 14), self.item, 3)
+        self.create_rental(datetime(2030, 1, 15), datetime(2030, 1, 16), self.item, 5,
+                           Rental.STATE_PENDING)
+
+        availability = SqlAvailability(self.start, self.end, self.depot.id)
+
+        with self.assertNumQueries(1):
+            intervals = availability.get_availability_intervals(self.item)
+
+        self.assertEqual(intervals, [
+            Interval(self.start, datetime(2030, 1, 11), 7),
+            Interval(datetime(2030, 1, 11), datetime(2030, 1, 14), 3),
+            Interval(datetime(2030, 1, 14), self.end, 6),
+        ])
+
+    def test_matches_other_backends(self):
+        dates = [datetime(2030, 1, day, hour) for day in (8, 10, 13, 17, 20, 22) for hour in (0, 9)]
+
+        for i, (start, end) in enumerate(zip(dates, dates[3:])):
+            self.create_rental(start, end, self.item, 1 + i % 3)
+            self.create_rental(start, end, self.other_item, 1, state=Rental.STATE_PENDING)
+
+        items = [self.item, self.other_item]
+
+        for conflicting_states in ([Rental.STATE_APPROVED], [Rental.STATE_PENDING],
+                                   [Rental.STATE_APPROVED, Rental.STATE_PENDING]):
+            args = (self.start, self.end, self.depot.id)
+            expected = Availability(*args, conflicting_states=conflicting_states)
+            expected = expected.get_availability_intervals_for_items(items)
+
+            for backend in (OccupancyAvailability, SqlAvailability):
+                availability = backend(*args, conflicting_states=conflicting_states)
+                self.assertEqual(availability.get_availability_intervals_for_items(items), expected)
+
+    @override_settings(AVAILABILITY_BACKEND='rental.sql_availability.SqlAvailability')
+    def test_backend_setting(self):
+        availability = get_availability(self.start, self.end, self.depot.id)
+        self.assertIsInstance(availability, SqlAvailability)
+        self.assertEqual(availability.conflicting_states, [Rental.STATE_APPROVED])
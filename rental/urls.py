@@ -1,11 +1,14 @@
 from django.urls import path
-from .views.rental_create_view import RentalCreateView
-from .views.rental_detail_view import RentalDetailView
+from .views.rental_create_view import RentalCreateApiView, RentalCreateView
+from .views.rental_detail_view import RentalAvailabilityView, RentalDetailView
 from .views.rental_state_view import RentalStateView
 
 app_name = 'rental'
 urlpatterns = [
     path('create/', RentalCreateView.as_view(), name='create'),
+    path('create/json/', RentalCreateApiView.as_view(), name='create_json'),
     path('<uuid:rental_uuid>/', RentalDetailView.as_view(), name='detail'),
+    path('<uuid:rental_uuid>/availability/', RentalAvailabilityView.as_view(),
+         name='availability'),
     path('<uuid:rental_uuid>/state/', RentalStateView.as_view(), name='state'),
 ]
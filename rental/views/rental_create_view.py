@@ -1,16 +1,39 @@
-import markdown
-import urllib
+import json
 from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.core.mail import EmailMultiAlternatives
 from django.db import transaction
+from django.db.models import prefetch_related_objects
+from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse
 from django.shortcuts import redirect
-from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.decorators import method_decorator
 from django.views import View
-from depot.helpers import extract_item_quantities
-from depot.models import Item
-from rental.availability import Availability
+from django.views.decorators.csrf import csrf_exempt
+from depot.helpers import extract_item_quantities, get_chart_time_frame, get_depot_if_allowed
+from depot.models import Depot, Item
+from depot.views.depot_create_rental_view import DepotCreateRentalView
+from rental.availability import get_availability, get_minimum_availability
+from rental.availability_cache import invalidate_depot
+from rental.digest import record_creation
 from rental.models import Rental, ItemRental
+from rental.outbox import queue_markdown_mail
+
+
+class ItemValidationError(ValidationError):
+    """
+    Validation errors of the single items of a rental
+
+    The errors are kept by item id in addition to the combined
+    message dictionary shown in the rental form.
+    """
+
+    def __init__(self, item_errors, item_names):
+        self.item_errors = item_errors
+        super().__init__({
+            '%s %s' % (item_names[item_id], key): messages
+            for item_id, errors in item_errors.items()
+            for key, messages in errors.items()
+        })
 
 
 class RentalCreateView(View):
@@ -19,13 +42,16 @@ class RentalCreateView(View):
 
     When the object is successfully created, the user is redirected
     to the detail view of the new rental.
-    If an error occurs, the message dictionary is stored in the
-    current session and the user gets back to the edit view to
+    If an error occurs, the rental form is shown again right away
+    with the errors and the submitted data, so that the user can
     correct their mistakes.
 
     :author: Florian Stamer
     """
 
+    chart_time_frame = None
+    chart_intervals = {}
+
     def post(self, request):
         data = request.POST
 
@@ -36,66 +62,106 @@ class RentalCreateView(View):
             # in the following block
             with transaction.atomic():
                 rental = self.create_rental(user, data)
-                self.create_items(rental, data)
-
-            # After transaction send a confirmation mail to the user
-            self.send_confirmation_mail(request, rental)
+                self.create_items(rental, extract_item_quantities(data))
+                # The confirmation mail is only sent if the rental is committed
+                self.queue_confirmation_mail(request, rental)
 
             # Finally redirect the user to the rental page
             return redirect('rental:detail', rental_uuid=rental.uuid)
         except ValidationError as e:
-            # Store the errors and the submitted data in the current session
-            request.session['errors'] = e.message_dict
-            request.session['data'] = data
-
-            # Redirect to the form where the errors are displayed
-            response = redirect('depot:create_rental', depot_id=data.get('depot_id'))
-            response['Location'] += '?' + urllib.parse.urlencode({
-                'start_date': data.get('start_date'),
-                'return_date': data.get('return_date')
-            })
+            return self.render_errors(request, data, e.message_dict)
+
+    def render_errors(self, request, data, errors):
+        """
+        Show the rental form again with the errors and the submitted data
+
+        The availability computed while validating the items is reused
+        if the form shows the same time frame.
+        """
+
+        form_view = DepotCreateRentalView()
+        depot = get_depot_if_allowed(data.get('depot_id'), request.user)
+        start_date, return_date = form_view.get_start_return_date(data)
 
-            return response
+        intervals_by_item = {}
+        if self.chart_time_frame == get_chart_time_frame(start_date, return_date):
+            intervals_by_item = self.chart_intervals
+
+        return form_view.render_form(
+            request, depot, start_date, return_date, errors, data, intervals_by_item
+        )
 
     def create_rental(self, user, data):
         keys = (
             'firstname', 'lastname', 'depot_id', 'email', 'purpose', 'start_date', 'return_date'
         )
         rental = Rental(user=user, **{key: data.get(key) for key in keys})
+        # Cleaning the fields converts the submitted values to their proper types
         rental.full_clean()
         rental.save()
-        # Refresh Rental object to fix issue with depot_id
-        rental.refresh_from_db()
+        record_creation(rental, user)
         return rental
 
-    def create_items(self, rental, data):
-        errors = {}
+    def create_items(self, rental, item_quantities):
+        """
+        Validate all selected items at once and insert them with a single query
 
-        item_quantities = extract_item_quantities(data)
+        The items, the depot and the permissions of the user are loaded
+        once for all items. As bulk_create bypasses the signals, the
+        availability cache of the depot is invalidated explicitly. New
+        rentals are pending and therefore have no occupancy to update.
+        """
+
+        item_errors = {}
+        item_rentals = []
 
         if not item_quantities:
             raise ValidationError({
                 'item_quantities': 'The rental cannot be submitted without any items.'
             })
 
-        item_list = Item.objects.filter(id__in=item_quantities.keys())
+        item_list = list(Item.objects.filter(id__in=item_quantities.keys()))
+        item_names = {item.id: item.name for item in item_list}
 
-        availability = Availability(rental.start_date, rental.return_date, rental.depot_id)
+        available_quantities = self.get_available_quantities(rental, item_list)
 
         for item in item_list:
-            intervals = availability.get_availability_intervals(item)
-
             try:
-                available = min(intervals).value
-                self.create_item_rental(rental, item, item_quantities[item.id], available)
+                available = available_quantities[item.id]
+                item_rentals.append(
+                    self.validate_item_rental(rental, item, item_quantities[item.id], available)
+                )
             except ValidationError as e:
-                for key, value in e:
-                    errors['%s %s' % (item.name, key)] = value
+                item_errors[item.id] = e.message_dict
 
-        if errors:
-            raise ValidationError(errors)
+        for item_id in item_quantities.keys() - item_names.keys():
+            item_errors[item_id] = {'item': ['The item does not exist.']}
+            item_names[item_id] = 'Item %d' % item_id
+
+        if item_errors:
+            raise ItemValidationError(item_errors, item_names)
+
+        ItemRental.objects.bulk_create(item_rentals)
+        invalidate_depot(rental.depot_id)
+
+    def get_available_quantities(self, rental, item_list):
+        """
+        Find the lowest availability of each item within the time frame of the rental
+
+        The availability is computed for the longer time frame shown in the
+        rental form and kept in case the form has to be shown again.
+        """
 
-    def create_item_rental(self, rental, item, quantity, available):
+        self.chart_time_frame = get_chart_time_frame(rental.start_date, rental.return_date)
+        availability = get_availability(*self.chart_time_frame, rental.depot_id)
+        self.chart_intervals = availability.get_availability_intervals_for_items(item_list)
+
+        return {
+            item_id: get_minimum_availability(intervals, rental.start_date, rental.return_date)
+            for item_id, intervals in self.chart_intervals.items()
+        }
+
+    def validate_item_rental(self, rental, item, quantity, available):
         if quantity > available:
             raise ValidationError({
                 'quantity': 'The quantity must not exceed the availability '
@@ -107,23 +173,106 @@ class RentalCreateView(View):
             item=item,
             quantity=quantity
         )
-        item_rental.full_clean()
-        item_rental.save()
+        # The rental and the item have just been loaded, so checking
+        # their existence again would only cost one query per item
+        item_rental.full_clean(exclude=['rental', 'item'])
+        return item_rental
+
+    def queue_confirmation_mail(self, request, rental):
+        """
+        Add the confirmation mail to the outbox, it is delivered by the send_mails command
+        """
+
+        prefetch_related_objects([rental], 'itemrental_set__item')
 
-    def send_confirmation_mail(self, request, rental):
         subject = ('[Verleihtool] Your rental request, %s %s' %
                    (rental.firstname, rental.lastname))
-        message = render_to_string('rental/mails/confirmation.md', {
+        queue_markdown_mail(subject, 'rental/mails/confirmation.md', {
             'rental': rental
-        }, request)
+        }, [rental.email], settings.CC_EMAIL, request)
 
-        email = EmailMultiAlternatives(
-            subject=subject,
-            body=message,
-            to=[rental.email],
-            cc=settings.CC_EMAIL,
-        )
 
-        email.attach_alternative(markdown.markdown(message), 'text/html')
+@method_decorator(csrf_exempt, name='dispatch')
+class RentalCreateApiView(RentalCreateView):
+    """
+    Create a new rental from a cart submitted as JSON
+
+    The request body has the form {depot_id, dates: {start_date,
+    return_date}, contact: {firstname, lastname, email, purpose},
+    items: [{id, quantity}]}. The response contains either the uuid
+    of the new rental or the errors of the rental and of each item.
 
-        email.send()
+    Browsers cannot send JSON to other sites without their consent,
+    so requiring the JSON content type replaces the CSRF token for
+    script and kiosk clients.
+    """
+
+    def post(self, request):
+        if request.content_type != 'application/json':
+            return HttpResponse('Expected a JSON request', status=415)
+
+        try:
+            data, item_quantities = self.parse_cart(json.loads(request.body.decode()))
+        except (KeyError, TypeError, ValueError, AttributeError):
+            return HttpResponseBadRequest('Invalid cart')
+
+        user = request.user if request.user.is_authenticated else None
+
+        try:
+            self.validate_cart(data)
+
+            with transaction.atomic():
+                rental = self.create_rental(user, data)
+                self.create_items(rental, item_quantities)
+                self.queue_confirmation_mail(request, rental)
+        except ItemValidationError as e:
+            return JsonResponse({
+                'errors': {},
+                'items': [{'id': item_id, 'errors': errors}
+                          for item_id, errors in sorted(e.item_errors.items())],
+            }, status=400)
+        except ValidationError as e:
+            return JsonResponse({'errors': e.message_dict, 'items': []}, status=400)
+
+        return JsonResponse({
+            'uuid': str(rental.uuid),
+            'url': request.build_absolute_uri(
+                reverse('rental:detail', kwargs={'rental_uuid': rental.uuid})
+            ),
+        }, status=201)
+
+    def parse_cart(self, cart):
+        """
+        Turn the cart into the data of the rental form and the item quantities
+        """
+
+        data = dict(cart['contact'], depot_id=int(cart['depot_id']), **cart['dates'])
+        item_quantities = {}
+
+        for item in cart['items']:
+            item_id, quantity = int(item['id']), int(item['quantity'])
+            item_quantities[item_id] = item_quantities.get(item_id, 0) + quantity
+
+        return data, item_quantities
+
+    def validate_cart(self, data):
+        """
+        Check the depot and the dates the validation of the rental relies on
+
+        Rental.clean reads the depot and compares the dates, which
+        requires an existing depot and two valid dates.
+        """
+
+        errors = {}
+
+        if not Depot.objects.filter(id=data['depot_id']).exists():
+            errors['depot'] = ['The depot does not exist.']
+
+        for key in ('start_date', 'return_date'):
+            try:
+                Rental._meta.get_field(key).clean(data.get(key), None)
+            except ValidationError as e:
+                errors[key] = e.messages
+
+        if errors:
+            raise ValidationError(errors)
@@ -1,6 +1,13 @@
+import hashlib
+from depot.catalog import get_catalog_version
+from django.http import HttpResponseForbidden, JsonResponse
 from django.shortcuts import render, get_object_or_404
-from django.utils.translation import ugettext as _
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from django.utils.translation import get_language, ugettext as _
 from django.views import View
+from rental.approval import get_item_availability
+from rental.availability_cache import get_depot_version
 from rental.models import Rental
 from rental.state_transitions import allowed_transitions
 
@@ -13,15 +20,64 @@ class RentalDetailView(View):
     an alert with information about the rentals state
     and a list of rented items.
 
+    Managers additionally see the availability of each item
+    to know in advance whether the rental can be approved.
+
+    The page is identified by the time of the last change of the rental,
+    its item rentals and the catalog version of the depot, for managers
+    also by the availability version. Reloads are answered with 304 Not
+    Modified before the items are loaded and the page is rendered.
+    The page has no Last-Modified date, since the catalog and the
+    availability it depends on are versioned without dates.
+
     :author: Florian Stamer
     """
 
     def get(self, request, rental_uuid):
-        rental = get_object_or_404(Rental, pk=rental_uuid)
+        rental = get_object_or_404(Rental.objects.select_related('depot'), pk=rental_uuid)
         managed_by_user = rental.depot.managed_by(request.user)
 
+        etag = self.get_etag(request, rental, managed_by_user)
+        response = get_conditional_response(request, etag=etag)
+
+        if response is None:
+            response = self.render_rental(request, rental, managed_by_user)
+
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+
+        return response
+
+    def get_etag(self, request, rental, managed_by_user):
+        item_rentals = rental.itemrental_set.order_by('id').values_list(
+            'id', 'item_id', 'quantity', 'returned'
+        )
+
+        stamp = '%s:%s:%d:%d:%s:%d' % (
+            rental.updated_at.isoformat(), list(item_rentals),
+            get_catalog_version(rental.depot_id), request.user.pk or 0,
+            get_language(), managed_by_user
+        )
+
+        if managed_by_user:
+            stamp += ':%d' % get_depot_version(rental.depot_id)
+
+        return quote_etag(hashlib.md5(stamp.encode()).hexdigest())
+
+    def render_rental(self, request, rental, managed_by_user):
+        item_rentals = list(rental.itemrental_set.select_related('item'))
+
         states = allowed_transitions(managed_by_user, rental.state)
 
+        if managed_by_user:
+            item_availability = get_item_availability(rental, item_rentals)
+        else:
+            item_availability = [(item_rental, None) for item_rental in item_rentals]
+
+        approval_blocked = Rental.STATE_APPROVED in states and any(
+            item_rental.quantity > available for item_rental, available in item_availability
+        )
+
         btn_texts = {
             Rental.STATE_PENDING: _('Reset'),
             Rental.STATE_REVOKED: _('Revoke'),
@@ -33,6 +89,37 @@ class RentalDetailView(View):
         return render(request, 'rental/detail.html', {
             'rental': rental,
             'managed_by_user': managed_by_user,
+            'item_availability': item_availability,
+            'approval_blocked': approval_blocked,
             'states': states,
             'btn_texts': btn_texts,
         })
+
+
+class RentalAvailabilityView(View):
+    """
+    Provide the availability of all items in a rental as JSON
+
+    This allows managers to check whether the pending rentals
+    can be approved. Other users are not allowed to see it.
+    """
+
+    def get(self, request, rental_uuid):
+        rental = get_object_or_404(Rental.objects.select_related('depot'), pk=rental_uuid)
+
+        if not rental.depot.managed_by(request.user):
+            return HttpResponseForbidden('Not a manager of this depot')
+
+        item_availability = get_item_availability(rental)
+
+        return JsonResponse({
+            'approvable': all(
+                item_rental.quantity <= available for item_rental, available in item_availability
+            ),
+            'items': [{
+                'id': item_rental.item_id,
+                'name': item_rental.item.name,
+                'quantity': item_rental.quantity,
+                'available': available,
+            } for item_rental, available in item_availability],
+        })
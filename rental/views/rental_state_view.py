@@ -1,8 +1,10 @@
 from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.http import HttpResponseForbidden
 from django.shortcuts import redirect, get_object_or_404
 from django.views import View
-from rental.availability import Availability
+from rental.approval import approve_rentals
+from rental.digest import record_state_changes
 from rental.state_transitions import allowed_transitions
 from rental.models import Rental
 
@@ -16,19 +18,6 @@ class RentalStateView(View):
     :author: Florian Stamer
     """
 
-    def check_availability(self, rental):
-        availability = Availability(rental.start_date, rental.return_date, rental.depot_id)
-
-        for item_rental in rental.itemrental_set.all():
-            intervals = availability.get_availability_intervals(item_rental.item)
-            available = min(intervals).value
-
-            if item_rental.quantity > available:
-                raise ValidationError({
-                    'quantity': 'The quantity must not exceed the availability '
-                                'of the item in the requested time frame.'
-                })
-
     def post(self, request, rental_uuid):
         rental = get_object_or_404(Rental, pk=rental_uuid)
         managed_by_user = rental.depot.managed_by(request.user)
@@ -44,10 +33,30 @@ class RentalStateView(View):
         if state not in allowed_transitions(managed_by_user, rental.state):
             return HttpResponseForbidden('Invalid state transition')
 
-        if state == Rental.STATE_APPROVED:
-            self.check_availability(rental)
+        with transaction.atomic():
+            if state == Rental.STATE_APPROVED:
+                approved, rejected = approve_rentals([rental])
+                conflicts = rejected.get(rental)
+
+                if conflicts:
+                    raise ValidationError({
+                        conflict.item.name: str(conflict) for conflict in conflicts
+                    })
+
+                changed = bool(approved)
+            else:
+                # Read the rental again, another manager may have changed it meanwhile
+                rental = Rental.objects.select_for_update().get(pk=rental.pk)
+                changed = rental.state == old_state
+
+                if changed:
+                    rental.state = state
+                    rental.save(update_fields=['state', 'updated_at'])
+
+            if not changed:
+                return HttpResponseForbidden('The state of the rental request has changed')
 
-        rental.state = state
-        rental.save()
+            # Notify the depot managers with the next digest
+            record_state_changes({rental.pk: old_state}, state, request.user)
 
         return redirect('rental:detail', rental_uuid=rental.uuid)
@@ -9,12 +9,25 @@ $('#availability-modal').on('show.bs.modal', (ev) => {
 })
 
 $('#availability-modal').on('shown.bs.modal', (ev) => {
-    let $chart = $('#availability-chart');
+    let $modal = $(ev.currentTarget)
     let name = $(ev.relatedTarget).data('name')
-    let intervals = $(ev.relatedTarget).data('intervals')
-    let maxAvailability = intervals.reduce(
-        (val, acc) => val.y > acc.y ? val.y : acc.y
-    )
+    let url = $(ev.relatedTarget).data('url')
+
+    // load the availability of the item only when it is requested
+    $.getJSON(url).done((data) => {
+        if ($modal.hasClass('in')) {
+            renderChart(name, data.intervals)
+        }
+    })
+})
+
+let renderChart = (name, intervals) => {
+    let $chart = $('#availability-chart');
+    let maxAvailability = Math.max(...intervals.map((point) => point.y))
+
+    if (availabilityChart !== null) {
+        availabilityChart.destroy()
+    }
 
     availabilityChart = new Chart($chart, {
         type: 'line',
@@ -53,10 +66,11 @@ $('#availability-modal').on('shown.bs.modal', (ev) => {
             }
         }
     })
-})
+}
 
 $('#availability-modal').on('hidden.bs.modal', (ev) => {
     if (availabilityChart !== null) {
         availabilityChart.destroy()
+        availabilityChart = null
     }
 })
@@ -29145,6 +29145,8 @@ __webpack_require__(143);
 "use strict";
 
 
+function _toConsumableArray(arr) { if (Array.isArray(arr)) { for (var i = 0, arr2 = Array(arr.length); i < arr.length; i++) { arr2[i] = arr[i]; } return arr2; } else { return Array.from(arr); } }
+
 var Chart = __webpack_require__(145);
 
 var availabilityChart = null;
@@ -29156,12 +29158,27 @@ $('#availability-modal').on('show.bs.modal', function (ev) {
 });
 
 $('#availability-modal').on('shown.bs.modal', function (ev) {
-    var $chart = $('#availability-chart');
+    var $modal = $(ev.currentTarget);
     var name = $(ev.relatedTarget).data('name');
-    var intervals = $(ev.relatedTarget).data('intervals');
-    var maxAvailability = intervals.reduce(function (val, acc) {
-        return val.y > acc.y ? val.y : acc.y;
+    var url = $(ev.relatedTarget).data('url');
+
+    // load the availability of the item only when it is requested
+    $.getJSON(url).done(function (data) {
+        if ($modal.hasClass('in')) {
+            renderChart(name, data.intervals);
+        }
     });
+});
+
+var renderChart = function renderChart(name, intervals) {
+    var $chart = $('#availability-chart');
+    var maxAvailability = Math.max.apply(Math, _toConsumableArray(intervals.map(function (point) {
+        return point.y;
+    })));
+
+    if (availabilityChart !== null) {
+        availabilityChart.destroy();
+    }
 
     availabilityChart = new Chart($chart, {
         type: 'line',
@@ -29200,11 +29217,12 @@ $('#availability-modal').on('shown.bs.modal', function (ev) {
             }
         }
     });
-});
+};
 
 $('#availability-modal').on('hidden.bs.modal', function (ev) {
     if (availabilityChart !== null) {
         availabilityChart.destroy();
+        availabilityChart = null;
     }
 });
 
@@ -93,6 +93,49 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+# Availability results and user roles are invalidated through version counters stored in the cache,
+# so production setups with several worker processes need a shared backend like memcached.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+AVAILABILITY_CACHE_TIMEOUT = 60 * 60
+
+PERMISSION_CACHE_TIMEOUT = 60 * 60
+
+# Rendered fragments of the depot pages, keyed by their catalog version
+CATALOG_CACHE_TIMEOUT = 60 * 60
+
+
+# Availability
+# The backend used to compute the availability of items, one of
+# - rental.availability.Availability to read the rental tables
+# - rental.occupancy.OccupancyAvailability to read the materialized occupancy events
+# - rental.sql_availability.SqlAvailability to compute it with window functions in the database
+# - rental.matrix.MatrixAvailability to read the memory-mapped availability matrix
+
+AVAILABILITY_BACKEND = 'rental.occupancy.OccupancyAvailability'
+
+
+# Availability matrix
+# The occupancy of all items in slots of the given length in seconds, covering the given
+# number of days. It is shared by all worker processes on a host and kept up to date when
+# rentals change. Build it with ./manage.py rebuild_availability_matrix and repeat this
+# daily to move the horizon forward, or add --verify to only rebuild it if it has drifted
+# from the database. Approvals always read the database instead.
+
+AVAILABILITY_MATRIX_PATH = os.path.join(BASE_DIR, 'availability.matrix')
+
+AVAILABILITY_MATRIX_SLOT_LENGTH = 60 * 60
+
+AVAILABILITY_MATRIX_HORIZON = 365
+
+
 # Password validation
 # https://docs.djangoproject.com/en/1.10/ref/settings/#auth-password-validators
 
@@ -162,3 +205,9 @@ GITHUB_URL = 'https://github.com/verleihtool/verleihtool/'
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 DEFAULT_FROM_EMAIL = 'verleih@tool.com'
 CC_EMAIL = []
+
+# Seconds until the connection to the mail server times out
+EMAIL_TIMEOUT = 30
+
+# URL of the site used for links in mails sent outside of a request
+BASE_URL = 'http://127.0.0.1:1337'
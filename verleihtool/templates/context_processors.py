@@ -6,4 +6,5 @@ def template_settings(request):
         'PRIVACY_URL': settings.PRIVACY_URL,
         'IMPRINT_URL': settings.IMPRINT_URL,
         'GITHUB_URL': settings.GITHUB_URL,
+        'CATALOG_CACHE_TIMEOUT': settings.CATALOG_CACHE_TIMEOUT,
     }
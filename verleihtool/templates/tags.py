@@ -1,5 +1,6 @@
 import json
 from django import template
+from django.conf import settings
 from django.urls import translate_url
 from depot.models import Item
 from rental.models import Rental
@@ -23,7 +24,19 @@ def current_app(context, app_name, content):
 
 @register.simple_tag(takes_context=True)
 def base_url(context):
-    return context['request'].build_absolute_uri('/')[:-1]
+    """
+    Return the URL of the site, e.g. for links in mails
+
+    Outside of a request, like in the mails rendered by management
+    commands, the configured BASE_URL is used.
+    """
+
+    request = context.get('request')
+
+    if request is None:
+        return settings.BASE_URL
+
+    return request.build_absolute_uri('/')[:-1]
 
 
 @register.simple_tag(takes_context=True)
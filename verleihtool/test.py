@@ -1,4 +1,5 @@
 from django.contrib.auth.models import User, Group
+from django.core.cache import cache
 from django.test import TestCase, Client
 
 
@@ -10,6 +11,9 @@ class ClientTestCase(TestCase):
     """
 
     def setUp(self):
+        # Start with an empty cache
+        cache.clear()
+
         # Create normal user
         self.user = User.objects.create_user(
             username='user',